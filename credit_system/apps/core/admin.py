@@ -1,3 +1,9 @@
 from django.contrib import admin
+from .models import ScoringRuleSet
 
-# Register your models here.
+@admin.register(ScoringRuleSet)
+class ScoringRuleSetAdmin(admin.ModelAdmin):
+    list_display = ['name', 'is_active', 'updated_at']
+    list_filter = ['is_active']
+    search_fields = ['name']
+    ordering = ['-updated_at']
@@ -0,0 +1,54 @@
+import math
+from functools import lru_cache
+from typing import Optional
+
+
+# Distinct (annual rate, tenure) pairs kept in the factor table. Live traffic only
+# uses a handful of rate slabs and standard tenures, so this is rarely filled.
+FACTOR_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=FACTOR_CACHE_SIZE)
+def annuity_factors(annual_rate, tenure):
+    """
+    Return (monthly_rate, growth, growth - 1) for an annual rate in percent, where
+    growth = (1 + monthly_rate) ** tenure. The terms are kept apart rather than folded
+    into a single factor so EMIs stay bit-identical to the textbook formula.
+    """
+    monthly_rate = float(annual_rate) / (12 * 100)
+    growth = (1 + monthly_rate) ** tenure
+    return monthly_rate, growth, growth - 1
+
+
+def monthly_installment(principal, annual_rate, tenure) -> float:
+    monthly_rate, growth, growth_less_one = annuity_factors(annual_rate, tenure)
+    if monthly_rate == 0:
+        return float(principal) / tenure
+    return float(principal) * monthly_rate * growth / growth_less_one
+
+
+def annuity_balance(principal: float, monthly_rate: float, emi: float, months: int) -> float:
+    if monthly_rate == 0:
+        return principal - emi * months
+    growth = (1 + monthly_rate) ** months
+    return principal * growth - emi * (growth - 1) / monthly_rate
+
+
+def annuity_payment(principal: float, monthly_rate: float, months: int) -> float:
+    if months <= 0:
+        return principal
+    if monthly_rate == 0:
+        return principal / months
+    growth = (1 + monthly_rate) ** months
+    return principal * monthly_rate * growth / (growth - 1)
+
+
+def annuity_term(principal: float, monthly_rate: float, emi: float) -> Optional[int]:
+    if principal <= 0:
+        return 0
+    if monthly_rate == 0:
+        return math.ceil(principal / emi - 1e-9) if emi > 0 else None
+    if emi <= principal * monthly_rate:
+        return None
+    term = -math.log(1 - principal * monthly_rate / emi) / math.log(1 + monthly_rate)
+    return max(1, math.ceil(term - 1e-9))
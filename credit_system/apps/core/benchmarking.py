@@ -0,0 +1,85 @@
+import json
+import math
+import time
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import RequestFactory
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize_latencies(samples, elapsed=None):
+    ordered = sorted(samples)
+    total = elapsed if elapsed is not None else sum(samples)
+    return {
+        'requests': len(ordered),
+        'mean_ms': round(1000 * sum(ordered) / len(ordered), 3) if ordered else 0.0,
+        'p50_ms': round(1000 * percentile(ordered, 50), 3),
+        'p95_ms': round(1000 * percentile(ordered, 95), 3),
+        'p99_ms': round(1000 * percentile(ordered, 99), 3),
+        'max_ms': round(1000 * ordered[-1], 3) if ordered else 0.0,
+        'throughput_rps': round(len(ordered) / total, 1) if total else 0.0,
+    }
+
+
+# Goes through the real WSGI handler so request_started/request_finished manage
+# database connections as in production; the test client keeps them open.
+class WSGIRequestRunner:
+
+    def __init__(self):
+        self.handler = WSGIHandler()
+        self.factory = RequestFactory()
+
+    def request(self, method, path, data=None, headers=None):
+        if data is None:
+            request = self.factory.generic(method, path, headers=headers)
+        else:
+            request = self.factory.generic(
+                method, path, json.dumps(data), content_type='application/json', headers=headers
+            )
+
+        response_status = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            response_status['code'] = int(status.split()[0])
+
+        response = self.handler(request.environ, start_response)
+        try:
+            body = b''.join(response)
+        finally:
+            response.close()
+        return response_status['code'], body
+
+    def timed(self, method, path, data=None, headers=None):
+        started = time.perf_counter()
+        status_code, body = self.request(method, path, data, headers)
+        return time.perf_counter() - started, status_code, body
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def find_regressions(baseline, results, tolerance=0.2, metrics=('p95_ms', 'queries_per_request')):
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in metrics:
+            before, after = previous.get(metric), current.get(metric)
+            if before is None or after is None:
+                continue
+            if after > before * (1 + tolerance) and after - before > 1e-9:
+                regressions.append(f'{name}: {metric} {before} -> {after}')
+    return regressions
@@ -0,0 +1,100 @@
+import zlib
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import decorator_from_middleware
+from django.utils.regex_helper import _lazy_re_compile
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+re_accepts_brotli = _lazy_re_compile(r'\bbr\b')
+re_accepts_gzip = _lazy_re_compile(r'\bgzip\b')
+
+
+def _stream_compressor(encoding, quality):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=quality)
+        return compressor.process, compressor.finish
+    # wbits=31 writes a gzip container
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+
+def _compress_stream(sequence, encoding, quality):
+    compress, finish = _stream_compressor(encoding, quality)
+    for item in sequence:
+        data = compress(item)
+        if data:
+            yield data
+    yield finish()
+
+
+async def _acompress_stream(sequence, encoding, quality):
+    compress, finish = _stream_compressor(encoding, quality)
+    async for item in sequence:
+        data = compress(item)
+        if data:
+            yield data
+    yield finish()
+
+
+class ResponseCompressionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware that leaves responses below RESPONSE_COMPRESSION['MIN_BYTES']
+    alone, prefers brotli when the package is installed and the client accepts it,
+    and compresses async streams as one gzip member instead of one per chunk.
+    Applied per view through compress_response rather than site-wide.
+    """
+
+    def process_response(self, request, response):
+        config = settings.RESPONSE_COMPRESSION
+        if not config['ENABLED'] or response.has_header('Content-Encoding'):
+            return response
+        if not response.streaming and len(response.content) < config['MIN_BYTES']:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is not None and re_accepts_brotli.search(accept_encoding):
+            encoding = 'br'
+        elif re_accepts_gzip.search(accept_encoding):
+            encoding = 'gzip'
+        else:
+            return response
+
+        quality = config['BROTLI_QUALITY']
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _acompress_stream(response.streaming_content, encoding, quality)
+            elif encoding == 'br':
+                response.streaming_content = _compress_stream(response.streaming_content, encoding, quality)
+            else:
+                response.streaming_content = compress_sequence(
+                    response.streaming_content,
+                    max_random_bytes=self.max_random_bytes,
+                )
+            del response.headers['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed_content = brotli.compress(response.content, quality=quality)
+            else:
+                compressed_content = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response.headers['Content-Length'] = str(len(response.content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+
+compress_response = decorator_from_middleware(ResponseCompressionMiddleware)
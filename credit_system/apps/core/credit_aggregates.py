@@ -0,0 +1,218 @@
+from dataclasses import dataclass
+from decimal import Decimal
+from django.db.models import Sum, Count, Q, F, OuterRef, Subquery
+from django.utils import timezone
+from apps.customers.models import Customer
+from apps.loans.models import Loan
+from .models import CustomerCreditAggregate
+from .score_cache import score_cache
+
+
+PROFILE_FIELDS = (
+    'total_tenure',
+    'emis_paid_on_time',
+    'loan_count',
+    'current_year_count',
+    'total_volume',
+    'active_debt',
+    'active_emi_sum',
+)
+
+@dataclass(frozen=True)
+class CustomerCreditProfile:
+    total_tenure: int = 0
+    emis_paid_on_time: int = 0
+    loan_count: int = 0
+    current_year_count: int = 0
+    total_volume: Decimal = Decimal('0')
+    active_debt: Decimal = Decimal('0')
+    active_emi_sum: Decimal = Decimal('0')
+
+    @staticmethod
+    def aggregates(now=None):
+        now = now or timezone.now()
+        return {
+            'total_tenure': Sum('tenure'),
+            'emis_paid_on_time': Sum('emis_paid_on_time'),
+            'loan_count': Count('loan_id'),
+            'current_year_count': Count('loan_id', filter=Q(start_date__year=now.year)),
+            'total_volume': Sum('loan_amount'),
+            'active_debt': Sum('outstanding_debt', filter=Q(active_now=True)),
+            'active_emi_sum': Sum('monthly_payment', filter=Q(active_now=True)),
+        }
+
+    @classmethod
+    def compute(cls, loans, now=None):
+        now = now or timezone.now()
+        return cls.from_row(loans.with_repayment_state(now).aggregate(**cls.aggregates(now)))
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(
+            total_tenure=row.get('total_tenure') or 0,
+            emis_paid_on_time=row.get('emis_paid_on_time') or 0,
+            loan_count=row.get('loan_count') or 0,
+            current_year_count=row.get('current_year_count') or 0,
+            total_volume=row.get('total_volume') or Decimal('0'),
+            active_debt=row.get('active_debt') or Decimal('0'),
+            active_emi_sum=row.get('active_emi_sum') or Decimal('0'),
+        )
+
+    @classmethod
+    def from_aggregate(cls, aggregate):
+        return cls(**{field: getattr(aggregate, field) for field in PROFILE_FIELDS})
+
+    @classmethod
+    def for_customer(cls, customer, now=None):
+        return cls.compute(Loan.objects.filter(customer=customer), now)
+
+
+def _store_profiles(profiles, today):
+    aggregates = [
+        CustomerCreditAggregate(
+            customer_id=customer_id,
+            computed_on=today,
+            **{field: getattr(profile, field) for field in PROFILE_FIELDS}
+        )
+        for customer_id, profile in profiles.items()
+    ]
+    CustomerCreditAggregate.objects.bulk_create(
+        aggregates,
+        update_conflicts=True,
+        unique_fields=['customer'],
+        update_fields=[*PROFILE_FIELDS, 'computed_on', 'updated_at'],
+    )
+    Customer.objects.filter(customer_id__in=profiles).update(
+        current_debt=Subquery(
+            CustomerCreditAggregate.objects.filter(customer_id=OuterRef('customer_id')).values('active_debt')[:1]
+        )
+    )
+    score_cache.invalidate(*profiles)
+
+
+def refresh_customer_aggregate(customer_id, now=None):
+    now = now or timezone.now()
+    profile = CustomerCreditProfile.compute(Loan.objects.filter(customer_id=customer_id), now)
+    _store_profiles({customer_id: profile}, timezone.localdate(now))
+    return profile
+
+
+def _fresh_aggregate(customer, now):
+    try:
+        aggregate = customer.credit_aggregate
+    except CustomerCreditAggregate.DoesNotExist:
+        return None
+    if aggregate.computed_on != timezone.localdate(now):
+        return None
+    return aggregate
+
+
+# Reads never write: a missing or out-of-date aggregate (active debt and the
+# current-year count depend on the date) is recomputed from the loans for this
+# read only, and persisted by the loan write paths or the nightly rebuild.
+async def aload_credit_profile(customer, now=None):
+    now = now or timezone.now()
+    aggregate = _fresh_aggregate(customer, now)
+    if aggregate is not None:
+        return CustomerCreditProfile.from_aggregate(aggregate)
+    row = await (
+        Loan.objects.filter(customer_id=customer.customer_id)
+        .with_repayment_state(now)
+        .aaggregate(**CustomerCreditProfile.aggregates(now))
+    )
+    return CustomerCreditProfile.from_row(row)
+
+
+def load_credit_profile(customer, now=None):
+    now = now or timezone.now()
+    aggregate = _fresh_aggregate(customer, now)
+    if aggregate is not None:
+        return CustomerCreditProfile.from_aggregate(aggregate)
+    return CustomerCreditProfile.for_customer(customer, now)
+
+
+def load_credit_profiles(customers, now=None, batch_size=2000):
+    now = now or timezone.now()
+
+    profiles = {}
+    stale = []
+    for customer in customers:
+        aggregate = _fresh_aggregate(customer, now)
+        if aggregate is not None:
+            profiles[customer.customer_id] = CustomerCreditProfile.from_aggregate(aggregate)
+        else:
+            stale.append(customer.customer_id)
+
+    for start in range(0, len(stale), batch_size):
+        profiles.update(_compute_batch(stale[start:start + batch_size], now))
+    return profiles
+
+
+# Loan.save/delete and LoanQuerySet.update/delete keep the aggregates current.
+# Deleting a customer cascades to its aggregate row. Writers that bypass those
+# (bulk_create in the ingest, raw SQL) must call rebuild_credit_aggregates.
+def record_loan_saved(loan, created):
+    if not created:
+        refresh_customer_aggregate(loan.customer_id)
+        return
+
+    now = timezone.now()
+    delta = CustomerCreditProfile.compute(Loan.objects.filter(pk=loan.pk), now)
+    updated = CustomerCreditAggregate.objects.filter(
+        customer_id=loan.customer_id,
+        computed_on=timezone.localdate(now),
+    ).update(
+        updated_at=now,
+        **{field: F(field) + getattr(delta, field) for field in PROFILE_FIELDS}
+    )
+    if not updated:
+        refresh_customer_aggregate(loan.customer_id, now)
+    elif delta.active_debt:
+        Customer.objects.filter(customer_id=loan.customer_id).update(
+            current_debt=F('current_debt') + delta.active_debt
+        )
+
+
+def record_loan_deleted(loan):
+    refresh_customer_aggregate(loan.customer_id)
+
+
+def rebuild_credit_aggregates(customer_ids=None, batch_size=2000, now=None):
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+
+    if customer_ids is None:
+        customer_ids = Customer.objects.order_by('customer_id').values_list(
+            'customer_id', flat=True
+        ).iterator(chunk_size=batch_size)
+
+    rebuilt = 0
+    batch = []
+    for customer_id in customer_ids:
+        batch.append(customer_id)
+        if len(batch) >= batch_size:
+            rebuilt += len(_rebuild_batch(batch, now, today))
+            batch = []
+    if batch:
+        rebuilt += len(_rebuild_batch(batch, now, today))
+    return rebuilt
+
+
+def _compute_batch(customer_ids, now):
+    profiles = {customer_id: CustomerCreditProfile() for customer_id in customer_ids}
+    rows = (
+        Loan.objects.filter(customer_id__in=customer_ids)
+        .with_repayment_state(now)
+        .values('customer_id')
+        .annotate(**CustomerCreditProfile.aggregates(now))
+        .order_by()
+    )
+    for row in rows:
+        profiles[row['customer_id']] = CustomerCreditProfile.from_row(row)
+    return profiles
+
+
+def _rebuild_batch(customer_ids, now, today):
+    profiles = _compute_batch(customer_ids, now)
+    _store_profiles(profiles, today)
+    return profiles
@@ -1,124 +1,105 @@
-from datetime import datetime, timedelta
-from django.db.models import Sum, Count, Q
-from apps.customers.models import Customer
-from apps.loans.models import Loan
+from apps.core.annuity import monthly_installment
+from apps.core.instrumentation import timed
+from apps.core.loaders import get_loader
+from apps.core.score_cache import score_cache
+from apps.core.scoring_rules import aget_rules, get_rules
 
 
 class CreditScoring:
 
-    def __init__(self, customer_id):
-        self.customer = Customer.objects.get(customer_id=customer_id)
-        self.loans = Loan.objects.filter(customer=self.customer)
-        
+    def __init__(self, customer_id, customer=None, profile=None, rules=None, loans=None):
+        self.rules = rules or get_rules()
+        loader = get_loader()
+        if customer is None or profile is None:
+            customer = customer if customer is not None else loader.customer(customer_id)
+            profile = profile if profile is not None else loader.profile(customer)
+        self.customer = customer
+        self.profile = profile
+        self._loans = loans
+        self._credit_score = None
+        self._score_generation = loader.score_generation(customer_id)
+        
+    @classmethod
+    async def acreate(cls, customer_id):
+        loader = get_loader()
+        customer = await loader.acustomer(customer_id)
+        return cls(
+            customer_id,
+            customer=customer,
+            profile=await loader.aprofile(customer),
+            rules=await aget_rules(),
+        )
+
+    @classmethod
+    def for_customers(cls, customer_ids):
+        loader = get_loader()
+        customers = loader.customers(customer_ids)
+        profiles = loader.profiles(list(customers.values()))
+        return {
+            customer_id: cls(customer_id, customer=customer, profile=profiles[customer_id])
+            for customer_id, customer in customers.items()
+        }
+
+    @property
+    def loans(self):
+        if self._loans is None:
+            self._loans = get_loader().customer_loans(self.customer.customer_id)
+        return self._loans
+
+    @classmethod
+    def prime_scores(cls, scorers):
+        pending = {scorer.customer.customer_id: scorer for scorer in scorers if scorer._credit_score is None}
+        with timed('scoring'):
+            scores = score_cache.get_many_or_compute(
+                {customer_id: scorer._compute_credit_score for customer_id, scorer in pending.items()},
+                {customer_id: scorer._score_generation for customer_id, scorer in pending.items()},
+            )
+        for customer_id, score in scores.items():
+            pending[customer_id]._credit_score = score
+
     def calculate_credit_score(self):
-        
-        current_debt = self.get_current_debt()
-        if current_debt > self.customer.approved_limit:
-            return 0
-        
-        score = 0
-        
-        score += self._calculate_payment_history_score() * 0.30
-        score += self._calculate_loan_count_score() * 0.20
-        score += self._calculate_current_year_activity_score() * 0.25
-        score += self._calculate_loan_volume_score() * 0.25
-        
-        return min(100, max(0, round(score)))
-    
-    def _calculate_payment_history_score(self):
-        total_emis = 0
-        paid_on_time = 0
-        
-        for loan in self.loans:
-            total_emis += loan.tenure
-            paid_on_time += loan.emis_paid_on_time
-        
-        if total_emis == 0:
-            return 50
-        
-        payment_ratio = paid_on_time / total_emis
-        return payment_ratio * 100
-    
-    def _calculate_loan_count_score(self):
-        loan_count = self.loans.count()
-        
-        if loan_count == 0:
-            return 80
-        elif loan_count <= 2:
-            return 90
-        elif loan_count <= 5:
-            return 70
-        elif loan_count <= 10:
-            return 50
-        else:
-            return 20
-    
-    def _calculate_current_year_activity_score(self):
-        current_year = datetime.now().year
-        current_year_loans = self.loans.filter(
-            start_date__year=current_year
-        ).count()
-        
-        if current_year_loans == 0:
-            return 80
-        elif current_year_loans <= 1:
-            return 90
-        elif current_year_loans <= 2:
-            return 60
-        elif current_year_loans <= 3:
-            return 30
-        else:
-            return 10
-    
-    def _calculate_loan_volume_score(self):
-        total_loan_amount = self.loans.aggregate(
-            total=Sum('loan_amount')
-        )['total'] or 0
-        
-        if self.customer.approved_limit == 0:
-            return 50
-        
-        volume_ratio = float(total_loan_amount) / self.customer.approved_limit
-        
-        if volume_ratio <= 0.3:
-            return 100
-        elif volume_ratio <= 0.5:
-            return 80
-        elif volume_ratio <= 0.7:
-            return 60
-        elif volume_ratio <= 1.0:
-            return 40
-        else:
-            return 10
+        if self._credit_score is None:
+            self._credit_score = score_cache.get_or_compute(
+                self.customer.customer_id, self._compute_credit_score, self._score_generation
+            )
+        return self._credit_score
+
+    def recalculate_credit_score(self):
+        self._credit_score = self._compute_credit_score()
+        return self._credit_score
+
+    async def acalculate_credit_score(self):
+        if self._credit_score is None:
+            self._credit_score = await score_cache.aget_or_compute(
+                self.customer.customer_id, self._compute_credit_score, self._score_generation
+            )
+        return self._credit_score
+
+    def _compute_credit_score(self):
+        return self.rules.score_profile(self.profile, self.customer.approved_limit)
     
     def get_current_debt(self):
-        current_debt = 0
-        for loan in self.loans:
-            if loan.is_active:
-                current_debt += loan.current_debt
-        return current_debt
+        return self.profile.active_debt
     
     def get_current_emi_sum(self):
-        current_emis = 0
-        for loan in self.loans:
-            if loan.is_active:
-                current_emis += loan.monthly_payment
-        return current_emis
+        return self.profile.active_emi_sum
     
+    async def acheck_eligibility(self, loan_amount, interest_rate, tenure):
+        await self.acalculate_credit_score()
+        return self.check_eligibility(loan_amount, interest_rate, tenure)
+
     def check_eligibility(self, loan_amount, interest_rate, tenure):
+        with timed('scoring'):
+            return self._check_eligibility(loan_amount, interest_rate, tenure)
+
+    def _check_eligibility(self, loan_amount, interest_rate, tenure):
         credit_score = self.calculate_credit_score()
         
-        principal = float(loan_amount)
-        monthly_rate = float(interest_rate) / (12 * 100)
-        
-        if monthly_rate == 0:
-            monthly_emi = principal / tenure
-        else:
-            monthly_emi = principal * monthly_rate * (1 + monthly_rate) ** tenure / ((1 + monthly_rate) ** tenure - 1)
+        monthly_emi = monthly_installment(loan_amount, interest_rate, tenure)
         
-        current_emis = self.get_current_emi_sum()
+        current_emis = float(self.get_current_emi_sum())
         total_emis = current_emis + monthly_emi
-        max_allowed_emi = self.customer.monthly_salary * 0.5
+        max_allowed_emi = self.customer.monthly_salary * self.rules.max_emi_ratio
         
         if total_emis > max_allowed_emi:
             return {
@@ -126,45 +107,26 @@ class CreditScoring:
                 'credit_score': credit_score,
                 'corrected_interest_rate': interest_rate,
                 'monthly_installment': monthly_emi,
-                'reason': 'EMI exceeds 50% of monthly salary'
+                'reason': f'EMI exceeds {self.rules.max_emi_ratio:.0%} of monthly salary'
             }
         
-        if credit_score > 50:
-            return {
-                'approved': True,
-                'credit_score': credit_score,
-                'corrected_interest_rate': interest_rate,
-                'monthly_installment': monthly_emi
-            }
-        elif credit_score > 30:
-            corrected_rate = max(interest_rate, 12.0)
-            if corrected_rate != interest_rate:
-                corrected_monthly_rate = corrected_rate / (12 * 100)
-                monthly_emi = principal * corrected_monthly_rate * (1 + corrected_monthly_rate) ** tenure / ((1 + corrected_monthly_rate) ** tenure - 1)
-            
-            return {
-                'approved': True,
-                'credit_score': credit_score,
-                'corrected_interest_rate': corrected_rate,
-                'monthly_installment': monthly_emi
-            }
-        elif credit_score > 10:
-            corrected_rate = max(interest_rate, 16.0)
-            if corrected_rate != interest_rate:
-                corrected_monthly_rate = corrected_rate / (12 * 100)
-                monthly_emi = principal * corrected_monthly_rate * (1 + corrected_monthly_rate) ** tenure / ((1 + corrected_monthly_rate) ** tenure - 1)
-            
-            return {
-                'approved': True,
-                'credit_score': credit_score,
-                'corrected_interest_rate': corrected_rate,
-                'monthly_installment': monthly_emi
-            }
-        else:
+        min_rate = self.rules.min_interest_rate(credit_score)
+        if min_rate is None:
             return {
                 'approved': False,
                 'credit_score': credit_score,
                 'corrected_interest_rate': interest_rate,
                 'monthly_installment': monthly_emi,
                 'reason': 'Credit score too low'
-            }
\ No newline at end of file
+            }
+        
+        corrected_rate = max(interest_rate, min_rate)
+        if corrected_rate != interest_rate:
+            monthly_emi = monthly_installment(loan_amount, corrected_rate, tenure)
+        
+        return {
+            'approved': True,
+            'credit_score': credit_score,
+            'corrected_interest_rate': corrected_rate,
+            'monthly_installment': monthly_emi
+        }
@@ -0,0 +1,18 @@
+import json
+from django.http import HttpResponse
+from .renderers import dumps
+
+
+class InvalidJSONBody(ValueError):
+    pass
+
+
+def parse_json_body(request):
+    try:
+        return json.loads(request.body or b'null')
+    except ValueError as e:
+        raise InvalidJSONBody(f'JSON parse error - {str(e)}')
+
+
+def json_response(data, status=200):
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
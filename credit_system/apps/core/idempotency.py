@@ -0,0 +1,151 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+from asgiref.sync import async_to_sync, sync_to_async, iscoroutinefunction
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from .http import InvalidJSONBody, json_response, parse_json_body
+from .models import IdempotencyKey
+
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+
+
+class IdempotencyKeyReused(Exception):
+    pass
+
+
+def request_fingerprint(payload):
+    encoded = json.dumps(payload, sort_keys=True, cls=JSONEncoder).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def run_idempotent(scope, key, payload, handler):
+    """
+    Run handler() -> (status_code, body) at most once per (scope, key).
+
+    The key row is inserted in the same transaction as the handler's writes, so
+    a concurrent retry blocks on the unique constraint until the first attempt
+    commits and then replays its stored response. 5xx responses are rolled back
+    so the client can retry them.
+    """
+    fingerprint = request_fingerprint(payload)
+    now = timezone.now()
+
+    with transaction.atomic():
+        record, created = IdempotencyKey.objects.select_for_update().get_or_create(
+            scope=scope,
+            key=key,
+            defaults={'request_hash': fingerprint, 'created_at': now},
+        )
+        if not created and record.created_at < now - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL):
+            record.request_hash = fingerprint
+            record.created_at = now
+            created = True
+
+        if not created:
+            if record.request_hash != fingerprint:
+                raise IdempotencyKeyReused(
+                    f'{IDEMPOTENCY_HEADER} has already been used with a different request'
+                )
+            return record.response_status, record.response_body, True
+
+        status_code, body = handler()
+        if status_code >= 500:
+            transaction.set_rollback(True)
+        else:
+            record.response_status = status_code
+            record.response_body = body
+            record.save()
+        return status_code, body, False
+
+
+def purge_expired_keys(now=None, batch_size=10000):
+    """Delete keys older than IDEMPOTENCY_KEY_TTL, batch_size rows at a time. Returns the number deleted."""
+    cutoff = (now or timezone.now()) - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+    deleted = 0
+    while True:
+        expired = list(
+            IdempotencyKey.objects.filter(created_at__lt=cutoff).values_list('pk', flat=True)[:batch_size]
+        )
+        if not expired:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(pk__in=expired).delete()[0]
+
+
+def _invalid_key_error(key):
+    if len(key) > MAX_KEY_LENGTH:
+        return f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters'
+    return None
+
+
+def idempotent(scope):
+    """
+    Replay the stored response when a request repeats an Idempotency-Key.
+
+    Wraps DRF function views (place it below @api_view) and plain async views
+    that take a JSON body.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                key = request.headers.get(IDEMPOTENCY_HEADER)
+                if not key:
+                    return await view(request, *args, **kwargs)
+                error = _invalid_key_error(key)
+                if error:
+                    return json_response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+                try:
+                    payload = parse_json_body(request)
+                except InvalidJSONBody:
+                    return await view(request, *args, **kwargs)
+
+                def handler():
+                    response = async_to_sync(view)(request, *args, **kwargs)
+                    return response.status_code, json.loads(response.content)
+
+                try:
+                    status_code, body, replayed = await sync_to_async(run_idempotent)(
+                        scope, key, payload, handler
+                    )
+                except IdempotencyKeyReused as e:
+                    return json_response({'error': str(e)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+                response = json_response(body, status=status_code)
+                if replayed:
+                    response[REPLAYED_HEADER] = 'true'
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key:
+                return view(request, *args, **kwargs)
+            error = _invalid_key_error(key)
+            if error:
+                return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+            def handler():
+                response = view(request, *args, **kwargs)
+                return response.status_code, response.data
+
+            try:
+                status_code, body, replayed = run_idempotent(scope, key, request.data, handler)
+            except IdempotencyKeyReused as e:
+                return Response({'error': str(e)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+            response = Response(body, status=status_code)
+            if replayed:
+                response[REPLAYED_HEADER] = 'true'
+            return response
+        return wrapper
+    return decorator
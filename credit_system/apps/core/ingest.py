@@ -0,0 +1,612 @@
+import hashlib
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+from dateutil.relativedelta import relativedelta
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from apps.customers.models import Customer
+from apps.loans.models import Loan
+from .credit_aggregates import rebuild_credit_aggregates
+from .models import ImportedFile
+from .score_cache import score_cache
+from .upsert import upsert
+
+
+CUSTOMER_UPDATE_FIELDS = [
+    'first_name',
+    'last_name',
+    'age',
+    'phone_number',
+    'monthly_salary',
+    'approved_limit',
+    'source_hash',
+    'updated_at',
+]
+
+LOAN_UPDATE_FIELDS = [
+    'customer',
+    'loan_amount',
+    'tenure',
+    'interest_rate',
+    'monthly_payment',
+    'emis_paid_on_time',
+    'start_date',
+    'end_date',
+    'source_hash',
+    'updated_at',
+]
+
+# Source columns and their types; CSV and Parquet files are read with exactly these.
+CUSTOMER_COLUMNS = {
+    'Customer ID': 'int',
+    'First Name': 'str',
+    'Last Name': 'str',
+    'Age': 'int',
+    'Phone Number': 'int',
+    'Monthly Salary': 'int',
+    'Approved Limit': 'float',
+}
+
+LOAN_COLUMNS = {
+    'Customer ID': 'int',
+    'Loan ID': 'int',
+    'Loan Amount': 'float',
+    'Tenure': 'int',
+    'Interest Rate': 'float',
+    'Monthly payment': 'float',
+    'EMIs paid on Time': 'int',
+    'Date of Approval': 'datetime',
+    'End Date': 'datetime',
+}
+
+PANDAS_DTYPES = {'int': 'Int64', 'float': 'float64', 'str': 'string'}
+ARROW_TYPES = {'int': pa.int64(), 'float': pa.float64(), 'str': pa.string(), 'datetime': pa.timestamp('us')}
+
+# Extensions tried, fastest to parse first, when a data set has several copies.
+FORMAT_EXTENSIONS = {'parquet': ('.parquet', '.pq'), 'csv': ('.csv',), 'excel': ('.xlsx',)}
+
+CUSTOMER_FINGERPRINT_FIELDS = [field for field in CUSTOMER_UPDATE_FIELDS if field not in ('source_hash', 'updated_at')]
+LOAN_FINGERPRINT_FIELDS = [field for field in LOAN_UPDATE_FIELDS if field not in ('source_hash', 'updated_at')]
+
+
+def file_fingerprint(file_path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as source:
+        for block in iter(lambda: source.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_imported(name, content_hash):
+    return ImportedFile.objects.filter(name=name, content_hash=content_hash).exists()
+
+
+def record_import(name, content_hash, result):
+    # Files whose chunks failed to write are re-read on the next run; rows rejected
+    # by validation would be rejected again, so they don't block the skip.
+    if result.get('status') != 'success' or result.get('failed_chunks'):
+        return
+    ImportedFile.objects.update_or_create(
+        name=name,
+        defaults={
+            'content_hash': content_hash,
+            'rows': result['total_processed'],
+            'errors': result['errors'],
+            'imported_at': timezone.now(),
+        },
+    )
+
+
+def forget_import(name):
+    ImportedFile.objects.filter(name=name).delete()
+
+
+def skipped_file_result(name):
+    return {'status': 'skipped', 'reason': f'{name} is unchanged since the last import'}
+
+
+def row_fingerprint(instance, fields):
+    values = [instance.pk]
+    for name in fields:
+        field = instance._meta.get_field(name)
+        values.append(field.to_python(field.value_from_object(instance)))
+    return hashlib.blake2b(repr(values).encode(), digest_size=16).hexdigest()
+
+
+def detect_format(file_path):
+    extension = os.path.splitext(file_path)[1].lower()
+    for file_format, extensions in FORMAT_EXTENSIONS.items():
+        if extension in extensions:
+            return file_format
+    with open(file_path, 'rb') as source:
+        magic = source.read(4)
+    if magic == b'PAR1':
+        return 'parquet'
+    if magic == b'PK\x03\x04':
+        return 'excel'
+    return 'csv'
+
+
+def find_data_file(directory, name):
+    """
+    Path of data set name in directory. Of several copies the fastest to parse is
+    read, unless another copy was modified after it: a spreadsheet refreshed since
+    convert_data_files ran is read instead of its stale conversion.
+    """
+    candidates = []
+    for extensions in FORMAT_EXTENSIONS.values():
+        for extension in extensions:
+            file_path = os.path.join(directory, name + extension)
+            if os.path.exists(file_path):
+                candidates.append(file_path)
+    if not candidates:
+        raise FileNotFoundError(f"File not found: {os.path.join(directory, name)}.{{parquet,csv,xlsx}}")
+
+    newest = max(os.path.getmtime(file_path) for file_path in candidates)
+    file_path = next(file_path for file_path in candidates if os.path.getmtime(file_path) >= newest)
+    if file_path != candidates[0]:
+        print(f"{candidates[0]} is older than {file_path}, reading {file_path}; re-run convert_data_files")
+    return file_path
+
+
+def arrow_schema(columns):
+    return pa.schema([(name, ARROW_TYPES[kind]) for name, kind in columns.items()])
+
+
+def count_rows(file_path):
+    file_format = detect_format(file_path)
+    if file_format == 'parquet':
+        return pq.ParquetFile(file_path).metadata.num_rows
+    if file_format == 'csv':
+        lines = 0
+        last = b'\n'
+        with open(file_path, 'rb') as source:
+            for block in iter(lambda: source.read(1 << 20), b''):
+                lines += block.count(b'\n')
+                last = block[-1:]
+        return max(lines + (last != b'\n') - 1, 0)
+    return count_excel_rows(file_path)
+
+
+def count_excel_rows(file_path):
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        if sheet.max_row is not None:
+            return max(sheet.max_row - 1, 0)
+        return max(sum(1 for _ in sheet.iter_rows(values_only=True)) - 1, 0)
+    finally:
+        workbook.close()
+
+
+def partition_ranges(total_rows, partitions):
+    partitions = max(1, min(partitions, total_rows or 1))
+    size, remainder = divmod(total_rows, partitions)
+    ranges = []
+    start = 0
+    for index in range(partitions):
+        stop = start + size + (1 if index < remainder else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def iter_excel_chunks(file_path, chunk_size, start_row=0, stop_row=None):
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        header = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), None)
+        if header is None:
+            return
+
+        rows = sheet.iter_rows(
+            min_row=start_row + 2,
+            max_row=None if stop_row is None else stop_row + 1,
+            values_only=True
+        )
+        offset = start_row
+        batch = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                yield pd.DataFrame(batch, columns=header, index=range(offset, offset + len(batch)))
+                offset += len(batch)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header, index=range(offset, offset + len(batch)))
+    finally:
+        workbook.close()
+
+
+def iter_csv_chunks(file_path, chunk_size, start_row=0, stop_row=None, columns=None):
+    dtypes = {}
+    dates = []
+    for name, kind in (columns or {}).items():
+        if kind == 'datetime':
+            dates.append(name)
+        else:
+            dtypes[name] = PANDAS_DTYPES[kind]
+
+    reader = pd.read_csv(
+        file_path,
+        dtype=dtypes or None,
+        parse_dates=dates or False,
+        skiprows=range(1, start_row + 1),
+        nrows=None if stop_row is None else stop_row - start_row,
+        chunksize=chunk_size,
+    )
+    offset = start_row
+    with reader:
+        for chunk in reader:
+            chunk.index = range(offset, offset + len(chunk))
+            offset += len(chunk)
+            chunk = chunk.dropna(how='all')
+            if len(chunk):
+                yield chunk
+
+
+def iter_parquet_chunks(file_path, chunk_size, start_row=0, stop_row=None, columns=None):
+    parquet = pq.ParquetFile(file_path)
+    total_rows = parquet.metadata.num_rows
+    stop_row = total_rows if stop_row is None else min(stop_row, total_rows)
+
+    # Only decode the row groups that overlap [start_row, stop_row).
+    row_groups = []
+    position = None
+    offset = 0
+    for index in range(parquet.num_row_groups):
+        rows = parquet.metadata.row_group(index).num_rows
+        if offset + rows > start_row and offset < stop_row:
+            row_groups.append(index)
+            position = offset if position is None else position
+        offset += rows
+    if not row_groups:
+        return
+
+    batches = parquet.iter_batches(
+        batch_size=chunk_size,
+        row_groups=row_groups,
+        columns=list(columns) if columns else None,
+    )
+    for batch in batches:
+        low = max(start_row - position, 0)
+        high = min(stop_row - position, batch.num_rows)
+        if low < high:
+            chunk = batch.slice(low, high - low).to_pandas()
+            chunk.index = range(position + low, position + high)
+            chunk = chunk.dropna(how='all')
+            if len(chunk):
+                yield chunk
+        position += batch.num_rows
+        if position >= stop_row:
+            break
+
+
+def iter_chunks(file_path, chunk_size, start_row=0, stop_row=None, columns=None):
+    file_format = detect_format(file_path)
+    if file_format == 'parquet':
+        return iter_parquet_chunks(file_path, chunk_size, start_row, stop_row, columns)
+    if file_format == 'csv':
+        return iter_csv_chunks(file_path, chunk_size, start_row, stop_row, columns)
+    return iter_excel_chunks(file_path, chunk_size, start_row, stop_row)
+
+
+def last_rows_by_key(file_path, key_column, columns=None, chunk_size=10000):
+    """Map each key that appears on more than one row of file_path to the index of its last row."""
+    read_columns = {key_column: columns[key_column]} if columns else None
+    last_rows = {}
+    repeated = set()
+    for chunk in iter_chunks(file_path, chunk_size, columns=read_columns):
+        for index, key in zip(chunk.index, chunk[key_column].tolist()):
+            if pd.isna(key):
+                continue
+            key = int(key)
+            if key in last_rows:
+                repeated.add(key)
+            last_rows[key] = int(index)
+    return {key: last_rows[key] for key in repeated}
+
+
+def coerce_columns(df, columns):
+    df = df[list(columns)].copy()
+    for name, kind in columns.items():
+        if kind == 'datetime':
+            df[name] = pd.to_datetime(df[name])
+        elif kind == 'str':
+            df[name] = df[name].astype('string')
+        else:
+            df[name] = pd.to_numeric(df[name]).astype(PANDAS_DTYPES[kind])
+    return df
+
+
+def convert_file(source_path, target_path, columns, chunk_size):
+    """
+    Rewrite a data file as Parquet or CSV (chosen by target_path's extension) with
+    the given column types. Parquet row groups hold chunk_size rows so partitioned
+    loads can skip straight to their range.
+    """
+    target_format = detect_format(target_path)
+    if target_format == 'excel':
+        raise ValueError('Conversion target must be a .parquet or .csv file')
+
+    rows = 0
+    writer = None
+    schema = arrow_schema(columns)
+    try:
+        for chunk in iter_chunks(source_path, chunk_size, columns=columns):
+            chunk = coerce_columns(chunk, columns)
+            if target_format == 'parquet':
+                if writer is None:
+                    writer = pq.ParquetWriter(target_path, schema, compression='zstd')
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            else:
+                chunk.to_csv(target_path, mode='w' if rows == 0 else 'a', header=rows == 0, index=False)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if rows == 0 and target_format == 'parquet':
+        pq.write_table(schema.empty_table(), target_path)
+    return rows
+
+
+def _to_datetime(value):
+    value = pd.Timestamp(value).to_pydatetime()
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def build_customer(row):
+    customer = Customer(
+        customer_id=int(row['Customer ID']),
+        first_name=str(row['First Name']),
+        last_name=str(row['Last Name']),
+        age=int(row['Age']),
+        phone_number=int(row['Phone Number']),
+        monthly_salary=int(row['Monthly Salary']),
+        approved_limit=0 if pd.isna(row['Approved Limit']) else int(row['Approved Limit']),
+    )
+    if not customer.approved_limit:
+        customer.approved_limit = customer.calculate_approved_limit()
+    customer.source_hash = row_fingerprint(customer, CUSTOMER_FINGERPRINT_FIELDS)
+    return customer
+
+
+def build_loan(row):
+    loan = Loan(
+        loan_id=int(row['Loan ID']),
+        customer_id=int(row['Customer ID']),
+        loan_amount=row['Loan Amount'],
+        tenure=int(row['Tenure']),
+        interest_rate=row['Interest Rate'],
+        monthly_payment=None if pd.isna(row['Monthly payment']) else row['Monthly payment'],
+        emis_paid_on_time=int(row['EMIs paid on Time']),
+        start_date=_to_datetime(row['Date of Approval']),
+        end_date=None if pd.isna(row['End Date']) else _to_datetime(row['End Date']),
+    )
+    if not loan.monthly_payment:
+        loan.monthly_payment = loan.calculate_monthly_payment()
+    if not loan.end_date:
+        loan.end_date = loan.start_date + relativedelta(months=loan.tenure)
+    loan.source_hash = row_fingerprint(loan, LOAN_FINGERPRINT_FIELDS)
+    return loan
+
+
+def _keep_last(kind, rows, index, instance):
+    # A key repeated in a chunk is written once, from its last row, as a row-by-row
+    # import would leave it; returns whether an earlier row was superseded.
+    superseded = rows.get(instance.pk)
+    if superseded is not None:
+        print(f"{kind} {instance.pk} at row {superseded[0]} is superseded by row {index}")
+    rows[instance.pk] = (index, instance)
+    return superseded is not None
+
+
+def _chunk_result(total, existing_hashes, rows, errors, force=False, duplicates=0):
+    changed = rows if force else [row for row in rows if existing_hashes.get(row.pk) != row.source_hash]
+    created = sum(1 for row in changed if row.pk not in existing_hashes)
+    return changed, {
+        'created': created,
+        'updated': len(changed) - created,
+        'skipped': len(rows) - len(changed),
+        'duplicates': duplicates,
+        'errors': errors,
+        'failed_chunks': 0,
+        'total_processed': total,
+    }
+
+
+def _failed_chunk_result(total):
+    return {
+        'created': 0,
+        'updated': 0,
+        'skipped': 0,
+        'duplicates': 0,
+        'errors': total,
+        'failed_chunks': 1,
+        'total_processed': total,
+    }
+
+
+def _drop_phone_conflicts(customers):
+    # Phone numbers are unique but the upsert only resolves primary key conflicts,
+    # so one row whose number belongs to another customer (say, one registered
+    # through the API) would fail the whole chunk. Such rows become row errors.
+    owners = dict(
+        Customer.objects.filter(phone_number__in={customer.phone_number for _, customer in customers.values()})
+        .values_list('phone_number', 'customer_id')
+    )
+    conflicts = 0
+    for customer_id, (index, customer) in list(customers.items()):
+        owner = owners.setdefault(customer.phone_number, customer_id)
+        if owner != customer_id:
+            print(f"Phone number {customer.phone_number} of customer {customer_id} at row {index} "
+                  f"belongs to customer {owner}")
+            del customers[customer_id]
+            conflicts += 1
+    return conflicts
+
+
+def ingest_customer_chunk(df, force=False, backend=None, last_rows=None):
+    """
+    Upsert one chunk of customer rows. last_rows (see last_rows_by_key) names the
+    row each repeated customer ID is taken from, so parallel partitions agree on it.
+    """
+    customers = {}
+    error_count = 0
+    duplicates = 0
+    
+    for index, row in zip(df.index, df.to_dict('records')):
+        try:
+            customer = build_customer(row)
+        except Exception as e:
+            error_count += 1
+            print(f"Error processing customer row {index}: {str(e)}")
+            continue
+        last_row = (last_rows or {}).get(customer.customer_id, index)
+        if last_row != index:
+            duplicates += 1
+            print(f"Customer {customer.customer_id} at row {index} is superseded by row {last_row}")
+            continue
+        duplicates += _keep_last('Customer', customers, index, customer)
+
+    try:
+        with transaction.atomic():
+            error_count += _drop_phone_conflicts(customers)
+            existing = dict(
+                Customer.objects.filter(customer_id__in=customers).values_list('customer_id', 'source_hash')
+            )
+            changed, result = _chunk_result(
+                len(df), existing, [customer for _, customer in customers.values()], error_count, force, duplicates
+            )
+            if changed:
+                upsert(Customer, changed, CUSTOMER_UPDATE_FIELDS, backend)
+    except Exception as e:
+        print(f"Error writing customer rows {df.index[0]}-{df.index[-1]}: {str(e)}")
+        return _failed_chunk_result(len(df))
+
+    score_cache.invalidate(*(customer.customer_id for customer in changed))
+    return result
+
+
+def ingest_loan_chunk(df, force=False, backend=None, last_rows=None, affected_customers=None):
+    """
+    Upsert one chunk of loan rows. last_rows (see last_rows_by_key) names the row
+    each repeated loan ID is taken from, so parallel partitions agree on it. With
+    an affected_customers set, the customers of written loans are added to it and
+    their credit aggregates are left for the caller to rebuild.
+    """
+    candidates = []
+    error_count = 0
+    duplicates = 0
+    
+    for index, row in zip(df.index, df.to_dict('records')):
+        try:
+            loan = build_loan(row)
+        except Exception as e:
+            error_count += 1
+            print(f"Error processing loan row {index}: {str(e)}")
+            continue
+        last_row = (last_rows or {}).get(loan.loan_id, index)
+        if last_row != index:
+            duplicates += 1
+            print(f"Loan {loan.loan_id} at row {index} is superseded by row {last_row}")
+            continue
+        candidates.append((index, loan))
+
+    try:
+        with transaction.atomic():
+            customers = Customer.objects.only('customer_id').in_bulk(
+                {loan.customer_id for _, loan in candidates}
+            )
+            
+            loans = {}
+            for index, loan in candidates:
+                if loan.customer_id not in customers:
+                    error_count += 1
+                    print(f"Customer {loan.customer_id} not found for loan {loan.loan_id}")
+                    continue
+                duplicates += _keep_last('Loan', loans, index, loan)
+            
+            existing = dict(Loan.objects.filter(loan_id__in=loans).values_list('loan_id', 'source_hash'))
+            changed, result = _chunk_result(
+                len(df), existing, [loan for _, loan in loans.values()], error_count, force, duplicates
+            )
+            if changed:
+                upsert(Loan, changed, LOAN_UPDATE_FIELDS, backend)
+                customer_ids = {loan.customer_id for loan in changed}
+                if affected_customers is None:
+                    rebuild_credit_aggregates(sorted(customer_ids))
+                else:
+                    affected_customers.update(customer_ids)
+    except Exception as e:
+        print(f"Error writing loan rows {df.index[0]}-{df.index[-1]}: {str(e)}")
+        return _failed_chunk_result(len(df))
+
+    return result
+
+
+def reset_primary_key_sequence(model):
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    if statements:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+
+def merge_results(results):
+    merged = {
+        'status': 'success',
+        'created': 0,
+        'updated': 0,
+        'skipped': 0,
+        'duplicates': 0,
+        'errors': 0,
+        'failed_chunks': 0,
+        'total_processed': 0,
+        'chunks': 0,
+    }
+    failures = []
+    for result in results:
+        if 'error' in result:
+            failures.append(result['error'])
+            continue
+        for key in ('created', 'updated', 'skipped', 'duplicates', 'errors', 'failed_chunks', 'total_processed', 'chunks'):
+            merged[key] += result.get(key, 0)
+    if failures:
+        merged['status'] = 'partial' if len(failures) < len(results) else 'failed'
+        merged['failures'] = failures
+    return merged
+
+
+def ingest_file(file_path, ingest_chunk, model, chunk_size, start_row=0, stop_row=None,
+                reset_sequence=True, on_chunk=None, force=False, columns=None, backend=None):
+    result = {
+        'created': 0,
+        'updated': 0,
+        'skipped': 0,
+        'duplicates': 0,
+        'errors': 0,
+        'failed_chunks': 0,
+        'total_processed': 0,
+        'chunks': 0,
+    }
+    
+    for chunk in iter_chunks(file_path, chunk_size, start_row, stop_row, columns):
+        chunk_result = ingest_chunk(chunk, force=force, backend=backend)
+        for key, value in chunk_result.items():
+            result[key] += value
+        result['chunks'] += 1
+        if on_chunk is not None:
+            on_chunk(result)
+    
+    if reset_sequence:
+        reset_primary_key_sequence(model)
+    return {'status': 'success', **result}
@@ -0,0 +1,214 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from django.conf import settings
+
+
+logger = logging.getLogger('apps.core.instrumentation')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current_metrics = ContextVar('request_metrics', default=None)
+
+
+@dataclass
+class RequestMetrics:
+    queries: int = 0
+    db_time: float = 0.0
+    timings: dict = field(default_factory=dict)
+
+    def add_timing(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+
+def current_metrics():
+    return _current_metrics.get()
+
+
+@contextmanager
+def collect_metrics():
+    metrics = RequestMetrics()
+    token = _current_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current_metrics.reset(token)
+
+
+@contextmanager
+def timed(name):
+    metrics = _current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_timing(name, time.perf_counter() - started)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def query_budget(endpoint):
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    return budgets.get(endpoint, budgets.get('default'))
+
+
+def server_timing_header(metrics, total):
+    entries = [f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.queries} queries"']
+    entries += [f'{name};dur={seconds * 1000:.2f}' for name, seconds in sorted(metrics.timings.items())]
+    entries.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(entries)
+
+
+class EndpointStats:
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.duration_seconds = 0.0
+        self.phase_seconds = {}
+        self.budget_exceeded = 0
+        self.statuses = {}
+        self.buckets = [0] * len(DURATION_BUCKETS)
+
+
+class MetricsRegistry:
+    """In-process per-endpoint request metrics, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._collectors = []
+
+    def register_collector(self, collect):
+        """Render collect() -> [(name, kind, description, samples)] after the request metrics."""
+        with self._lock:
+            if collect not in self._collectors:
+                self._collectors.append(collect)
+
+    def observe(self, endpoint, method, status_code, metrics, total):
+        budget = query_budget(endpoint)
+        exceeded = budget is not None and metrics.queries > budget
+        with self._lock:
+            stats = self._endpoints.setdefault((endpoint, method), EndpointStats())
+            stats.requests += 1
+            stats.queries += metrics.queries
+            stats.db_seconds += metrics.db_time
+            stats.duration_seconds += total
+            for name, seconds in metrics.timings.items():
+                stats.phase_seconds[name] = stats.phase_seconds.get(name, 0.0) + seconds
+            stats.statuses[status_code] = stats.statuses.get(status_code, 0) + 1
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if total <= bound:
+                    stats.buckets[index] += 1
+            if exceeded:
+                stats.budget_exceeded += 1
+
+        if exceeded:
+            logger.warning(
+                'Query budget exceeded for %s %s: %d queries (budget %d)',
+                method, endpoint, metrics.queries, budget
+            )
+        return exceeded
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                key: {
+                    'requests': stats.requests,
+                    'queries': stats.queries,
+                    'db_seconds': stats.db_seconds,
+                    'duration_seconds': stats.duration_seconds,
+                    'phase_seconds': dict(stats.phase_seconds),
+                    'budget_exceeded': stats.budget_exceeded,
+                    'statuses': dict(stats.statuses),
+                    'buckets': list(stats.buckets),
+                }
+                for key, stats in self._endpoints.items()
+            }
+
+    def render_prometheus(self):
+        snapshot = self.snapshot()
+        lines = []
+
+        def family(name, kind, description, samples):
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(samples)
+
+        def labels(endpoint, method, **extra):
+            pairs = {'endpoint': endpoint, 'method': method, **extra}
+            escaped = (f'{key}="{_escape(str(value))}"' for key, value in pairs.items())
+            return '{' + ','.join(escaped) + '}'
+
+        family('credit_http_requests_total', 'counter', 'Requests handled per endpoint and status.', [
+            f'credit_http_requests_total{labels(endpoint, method, status=status)} {count}'
+            for (endpoint, method), stats in snapshot.items()
+            for status, count in sorted(stats['statuses'].items())
+        ])
+
+        duration = []
+        for (endpoint, method), stats in snapshot.items():
+            for bound, count in zip(DURATION_BUCKETS, stats['buckets']):
+                duration.append(f'credit_http_request_duration_seconds_bucket{labels(endpoint, method, le=bound)} {count}')
+            duration.append(f'credit_http_request_duration_seconds_bucket{labels(endpoint, method, le="+Inf")} {stats["requests"]}')
+            duration.append(f'credit_http_request_duration_seconds_sum{labels(endpoint, method)} {stats["duration_seconds"]:.6f}')
+            duration.append(f'credit_http_request_duration_seconds_count{labels(endpoint, method)} {stats["requests"]}')
+        family('credit_http_request_duration_seconds', 'histogram', 'Request latency per endpoint.', duration)
+
+        family('credit_db_queries_total', 'counter', 'SQL queries issued per endpoint.', [
+            f'credit_db_queries_total{labels(endpoint, method)} {stats["queries"]}'
+            for (endpoint, method), stats in snapshot.items()
+        ])
+        family('credit_db_query_seconds_total', 'counter', 'Time spent in SQL per endpoint.', [
+            f'credit_db_query_seconds_total{labels(endpoint, method)} {stats["db_seconds"]:.6f}'
+            for (endpoint, method), stats in snapshot.items()
+        ])
+        family('credit_phase_seconds_total', 'counter', 'Time spent per request phase (scoring, serialize, render).', [
+            f'credit_phase_seconds_total{labels(endpoint, method, phase=phase)} {seconds:.6f}'
+            for (endpoint, method), stats in snapshot.items()
+            for phase, seconds in sorted(stats['phase_seconds'].items())
+        ])
+        family('credit_query_budget_exceeded_total', 'counter', 'Requests that issued more SQL queries than their budget.', [
+            f'credit_query_budget_exceeded_total{labels(endpoint, method)} {stats["budget_exceeded"]}'
+            for (endpoint, method), stats in snapshot.items()
+        ])
+
+        with self._lock:
+            collectors = list(self._collectors)
+        for collect in collectors:
+            for name, kind, description, samples in collect():
+                family(name, kind, description, samples)
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics_registry = MetricsRegistry()
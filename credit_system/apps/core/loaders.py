@@ -0,0 +1,139 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from apps.customers.models import Customer
+from apps.loans.models import Loan
+from .credit_aggregates import aload_credit_profile, load_credit_profiles
+from .score_cache import score_cache
+
+
+_current_loader = ContextVar('request_loader', default=None)
+
+
+class RequestLoader:
+    """
+    Per-request identity map for customers, loans and credit profiles. Lookups are
+    batched by key and memoized, so each customer (with its credit aggregate), each
+    loan and each customer's loan list is read at most once per request.
+    """
+
+    def __init__(self):
+        self._customers = {}
+        self._loans = {}
+        self._customer_loans = {}
+        self._profiles = {}
+        self._score_generations = {}
+
+    def prime(self, *objects):
+        for obj in objects:
+            if isinstance(obj, Customer):
+                self._customers[obj.customer_id] = obj
+            elif isinstance(obj, Loan):
+                self._loans[obj.loan_id] = obj
+
+    def forget_customer(self, customer_id):
+        self._customers.pop(customer_id, None)
+        self._customer_loans.pop(customer_id, None)
+        self._profiles.pop(customer_id, None)
+        self._score_generations.pop(customer_id, None)
+
+    def _customer_query(self):
+        return Customer.objects.select_related('credit_aggregate')
+
+    def _remember_customers(self, customer_ids, found):
+        for customer_id in customer_ids:
+            self._customers[customer_id] = found.get(customer_id)
+
+    def _known_customers(self, customer_ids):
+        return {
+            customer_id: self._customers[customer_id]
+            for customer_id in customer_ids if self._customers.get(customer_id) is not None
+        }
+
+    def customers(self, customer_ids):
+        missing = {customer_id for customer_id in customer_ids if customer_id not in self._customers}
+        if missing:
+            # Snapshot the score cache generations before reading the rows scores are computed from.
+            self._score_generations.update(score_cache.generations(missing))
+            self._remember_customers(missing, self._customer_query().in_bulk(missing))
+        return self._known_customers(customer_ids)
+
+    async def acustomers(self, customer_ids):
+        missing = {customer_id for customer_id in customer_ids if customer_id not in self._customers}
+        if missing:
+            self._score_generations.update(await score_cache.agenerations(missing))
+            self._remember_customers(missing, await self._customer_query().ain_bulk(missing))
+        return self._known_customers(customer_ids)
+
+    def customer(self, customer_id):
+        customer = self.customers([customer_id]).get(customer_id)
+        if customer is None:
+            raise Customer.DoesNotExist(f'Customer {customer_id} does not exist')
+        return customer
+
+    async def acustomer(self, customer_id):
+        customer = (await self.acustomers([customer_id])).get(customer_id)
+        if customer is None:
+            raise Customer.DoesNotExist(f'Customer {customer_id} does not exist')
+        return customer
+
+    def score_generation(self, customer_id):
+        """The score cache generation read before this customer was loaded, or None for primed rows."""
+        return self._score_generations.get(customer_id)
+
+    def loans(self, loan_ids):
+        missing = {loan_id for loan_id in loan_ids if loan_id not in self._loans}
+        if missing:
+            found = Loan.objects.with_repayment_state().in_bulk(missing)
+            for loan_id in missing:
+                self._loans[loan_id] = found.get(loan_id)
+            self.customers({loan.customer_id for loan in found.values()})
+            for loan in found.values():
+                loan.customer = self._customers[loan.customer_id]
+        return {loan_id: self._loans[loan_id] for loan_id in loan_ids if self._loans.get(loan_id) is not None}
+
+    def loan(self, loan_id):
+        loan = self.loans([loan_id]).get(loan_id)
+        if loan is None:
+            raise Loan.DoesNotExist(f'Loan {loan_id} does not exist')
+        return loan
+
+    def customer_loans(self, customer_id):
+        if customer_id not in self._customer_loans:
+            loans = list(Loan.objects.filter(customer_id=customer_id).with_repayment_state())
+            customer = self._customers.get(customer_id)
+            for loan in loans:
+                if customer is not None:
+                    loan.customer = customer
+                self._loans[loan.loan_id] = loan
+            self._customer_loans[customer_id] = loans
+        return self._customer_loans[customer_id]
+
+    def profiles(self, customers):
+        missing = [customer for customer in customers if customer.customer_id not in self._profiles]
+        if missing:
+            self._profiles.update(load_credit_profiles(missing))
+        return {customer.customer_id: self._profiles[customer.customer_id] for customer in customers}
+
+    def profile(self, customer):
+        return self.profiles([customer])[customer.customer_id]
+
+    async def aprofile(self, customer):
+        if customer.customer_id not in self._profiles:
+            self._profiles[customer.customer_id] = await aload_credit_profile(customer)
+        return self._profiles[customer.customer_id]
+
+
+def get_loader():
+    """The loader of the current request, or a throwaway one outside a request."""
+    loader = _current_loader.get()
+    return loader if loader is not None else RequestLoader()
+
+
+@contextmanager
+def request_loader():
+    loader = RequestLoader()
+    token = _current_loader.set(loader)
+    try:
+        yield loader
+    finally:
+        _current_loader.reset(token)
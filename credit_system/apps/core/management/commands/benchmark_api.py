@@ -0,0 +1,156 @@
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.utils import timezone
+from apps.customers.models import Customer
+from apps.loans.models import Loan
+from apps.core.benchmarking import QueryCounter, WSGIRequestRunner, find_regressions, summarize_latencies
+
+
+SCENARIOS = {
+    'register': 201,
+    'check-eligibility': 200,
+    'create-loan': 201,
+    'view-loan': 200,
+    'view-loans': 200,
+    'view-loans-page': 200,
+}
+
+
+def _sample_ids(model, field, size, rng):
+    bounds = model.objects.order_by(field).values_list(field, flat=True)
+    first, last = bounds.first(), bounds.last()
+    if first is None:
+        return []
+    candidates = {rng.randint(first, last) for _ in range(size * 2)}
+    found = list(model.objects.filter(**{f'{field}__in': candidates}).values_list(field, flat=True)[:size])
+    return found or [first]
+
+
+class Command(BaseCommand):
+    help = 'Measure latency, queries per request and throughput of the public API endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            dest='scenarios',
+            choices=sorted(SCENARIOS),
+            help='Endpoint to benchmark (can be repeated, defaults to all)'
+        )
+        parser.add_argument('--requests', type=int, default=200, help='Measured requests per scenario')
+        parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=1, help='Requests in flight at once')
+        parser.add_argument('--sample-size', type=int, default=1000, help='Customers and loans to draw requests from')
+        parser.add_argument('--prefix', default='', help='URL prefix, e.g. /async to benchmark the ASGI views')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the results as JSON to this path')
+        parser.add_argument('--baseline', help='Earlier --output file to compare against')
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='Relative increase over the baseline reported as a regression'
+        )
+        parser.add_argument(
+            '--fail-on-regression',
+            action='store_true',
+            help='Exit with an error when a regression against the baseline is found'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        customer_ids = _sample_ids(Customer, 'customer_id', options['sample_size'], rng)
+        loan_ids = _sample_ids(Loan, 'loan_id', options['sample_size'], rng)
+        if not customer_ids or not loan_ids:
+            raise CommandError('Benchmarks need customers and loans; run generate_synthetic_data first')
+
+        phone_base = 5_000_000_000 + rng.randrange(0, 900_000_000, 1_000_000)
+        prefix = options['prefix'].rstrip('/')
+        sequence = iter(range(10 ** 9))
+
+        def build_request(scenario):
+            customer_id = rng.choice(customer_ids)
+            if scenario == 'register':
+                return 'POST', '/register/', {
+                    'first_name': 'Bench',
+                    'last_name': 'Mark',
+                    'age': rng.randint(21, 65),
+                    'monthly_income': rng.randrange(20000, 200000, 1000),
+                    'phone_number': phone_base + next(sequence),
+                }
+            if scenario in ('check-eligibility', 'create-loan'):
+                return 'POST', f'/{scenario}/', {
+                    'customer_id': customer_id,
+                    'loan_amount': rng.randrange(10000, 500000, 1000),
+                    'interest_rate': round(rng.uniform(8, 18), 2),
+                    'tenure': rng.choice([6, 12, 24, 36]),
+                }
+            if scenario == 'view-loan':
+                return 'GET', f'/view-loan/{rng.choice(loan_ids)}/', None
+            if scenario == 'view-loans':
+                return 'GET', f'/view-loans/{customer_id}/', None
+            return 'GET', f'/view-loans/{customer_id}/?page_size=50', None
+
+        runner = WSGIRequestRunner()
+
+        def send(job):
+            scenario, (method, path, data) = job
+            counter = QueryCounter()
+            try:
+                with connection.execute_wrapper(counter):
+                    elapsed, status_code, _ = runner.timed(method, prefix + path, data)
+            finally:
+                connections.close_all()
+            return elapsed, status_code == SCENARIOS[scenario], counter.count
+
+        results = {}
+        scenarios = options['scenarios'] or list(SCENARIOS)
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            for scenario in scenarios:
+                warmup = [(scenario, build_request(scenario)) for _ in range(options['warmup'])]
+                list(executor.map(send, warmup))
+
+                jobs = [(scenario, build_request(scenario)) for _ in range(options['requests'])]
+                started = time.perf_counter()
+                samples = list(executor.map(send, jobs))
+                elapsed = time.perf_counter() - started
+
+                queries = [count for _, _, count in samples]
+                results[scenario] = {
+                    **summarize_latencies([sample for sample, _, _ in samples], elapsed),
+                    'errors': sum(1 for _, ok, _ in samples if not ok),
+                    'queries_per_request': round(sum(queries) / len(queries), 2) if queries else 0.0,
+                    'max_queries': max(queries, default=0),
+                }
+                self.stdout.write(f'{scenario}: {json.dumps(results[scenario])}')
+
+        report = {
+            'benchmark': 'api',
+            'vendor': connection.vendor,
+            'recorded_at': timezone.now().isoformat(),
+            'dataset': {'customers': Customer.objects.count(), 'loans': Loan.objects.count()},
+            'options': {
+                key: options[key]
+                for key in ('requests', 'warmup', 'concurrency', 'sample_size', 'prefix', 'seed')
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+            regressions = find_regressions(baseline.get('results', {}), results, options['tolerance'])
+            for regression in regressions:
+                self.stdout.write(self.style.WARNING(f'Regression: {regression}'))
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
+            elif options['fail_on_regression']:
+                raise CommandError(f'{len(regressions)} regression(s) against {options["baseline"]}')
@@ -0,0 +1,94 @@
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+from apps.customers.models import Customer
+from apps.core.benchmarking import WSGIRequestRunner, summarize_latencies
+
+
+MODES = {
+    'no-reuse': {'CONN_MAX_AGE': 0, 'pool': None},
+    'persistent': {'CONN_MAX_AGE': 600, 'pool': None},
+    'pool': {'CONN_MAX_AGE': 0, 'pool': {'min_size': 1, 'max_size': 4}},
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare /check-eligibility/ latency with and without database connection reuse'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per mode')
+        parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per mode')
+        parser.add_argument('--customer-id', type=int, help='Customer to score (defaults to the first one)')
+        parser.add_argument(
+            '--mode',
+            action='append',
+            dest='modes',
+            choices=sorted(MODES),
+            help='Connection mode to benchmark (can be repeated, defaults to all supported modes)'
+        )
+        parser.add_argument('--output', help='Write the results as JSON to this path')
+
+    def handle(self, *args, **options):
+        customer_id = options['customer_id'] or Customer.objects.values_list('customer_id', flat=True).first()
+        if customer_id is None:
+            raise CommandError('No customers found; load or generate data first')
+
+        modes = options['modes'] or [
+            mode for mode in MODES if mode != 'pool' or connection.vendor == 'postgresql'
+        ]
+        if 'pool' in modes and connection.vendor != 'postgresql':
+            raise CommandError('Connection pooling is only available on PostgreSQL')
+
+        payload = {'customer_id': customer_id, 'loan_amount': 100000, 'interest_rate': 12, 'tenure': 12}
+        original = {
+            'CONN_MAX_AGE': connection.settings_dict['CONN_MAX_AGE'],
+            'pool': connection.settings_dict['OPTIONS'].get('pool'),
+        }
+        opened = []
+
+        def count_connection(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        connection_created.connect(count_connection)
+        runner = WSGIRequestRunner()
+        results = {}
+        try:
+            for mode in modes:
+                self._configure(MODES[mode])
+                for _ in range(options['warmup']):
+                    runner.request('POST', '/check-eligibility/', payload)
+
+                opened.clear()
+                samples = []
+                started = time.perf_counter()
+                for _ in range(options['requests']):
+                    elapsed, status_code, _ = runner.timed('POST', '/check-eligibility/', payload)
+                    if status_code != 200:
+                        raise CommandError(f'/check-eligibility/ returned {status_code} in mode {mode}')
+                    samples.append(elapsed)
+
+                results[mode] = {
+                    **summarize_latencies(samples, time.perf_counter() - started),
+                    'connections_opened': len(opened),
+                }
+                self.stdout.write(f'{mode}: {json.dumps(results[mode])}')
+        finally:
+            connection_created.disconnect(count_connection)
+            self._configure(original)
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump({'benchmark': 'db_connections', 'vendor': connection.vendor, 'results': results}, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def _configure(self, mode):
+        if connection.vendor == 'postgresql':
+            connection.close_pool()
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = mode['CONN_MAX_AGE']
+        if mode['pool']:
+            connection.settings_dict['OPTIONS']['pool'] = mode['pool']
+        else:
+            connection.settings_dict['OPTIONS'].pop('pool', None)
@@ -0,0 +1,77 @@
+import json
+import random
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from apps.core.annuity import annuity_factors, monthly_installment
+
+
+RATES = ('10.00', '10.50', '12.00', '14.00', '16.00')
+TENURES = (6, 12, 24, 36, 48, 60, 120, 240)
+
+
+def uncached_installment(principal, annual_rate, tenure):
+    principal = float(principal)
+    monthly_rate = float(annual_rate) / (12 * 100)
+    if monthly_rate == 0:
+        return principal / tenure
+    return principal * monthly_rate * (1 + monthly_rate) ** tenure / ((1 + monthly_rate) ** tenure - 1)
+
+
+def _per_call_ns(function, samples, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for principal, rate, tenure in samples:
+            function(principal, rate, tenure)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(samples) * 1e9
+
+
+class Command(BaseCommand):
+    help = 'Compare cached annuity-factor EMIs with the uncached formula for speed and exact agreement'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=200000, help='Random (principal, rate, tenure) inputs')
+        parser.add_argument('--repeat', type=int, default=5, help='Timing runs per implementation (best is kept)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the results as JSON to this path')
+
+    def handle(self, *args, **options):
+        generator = random.Random(options['seed'])
+        samples = [
+            (
+                Decimal(generator.randint(10000, 5000000)),
+                Decimal(generator.choice(RATES)),
+                generator.choice(TENURES),
+            )
+            for _ in range(options['samples'])
+        ]
+
+        mismatches = sum(
+            uncached_installment(*sample) != monthly_installment(*sample)
+            for sample in samples
+        )
+
+        annuity_factors.cache_clear()
+        uncached = _per_call_ns(uncached_installment, samples, options['repeat'])
+        cached = _per_call_ns(monthly_installment, samples, options['repeat'])
+        cache = annuity_factors.cache_info()
+
+        results = {
+            'samples': len(samples),
+            'mismatches': mismatches,
+            'uncached_ns_per_call': round(uncached, 1),
+            'cached_ns_per_call': round(cached, 1),
+            'speedup': round(uncached / cached, 2),
+            'factor_table_entries': cache.currsize,
+            'cache_hits': cache.hits,
+            'cache_misses': cache.misses,
+        }
+        self.stdout.write(json.dumps(results, indent=2))
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
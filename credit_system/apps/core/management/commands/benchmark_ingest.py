@@ -0,0 +1,115 @@
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from apps.customers.models import Customer
+from apps.loans.models import Loan
+from apps.core.ingest import (
+    CUSTOMER_COLUMNS,
+    LOAN_COLUMNS,
+    convert_file,
+    find_data_file,
+    ingest_customer_chunk,
+    ingest_file,
+    ingest_loan_chunk,
+    iter_chunks,
+)
+from apps.core.upsert import INGEST_BACKENDS
+
+
+DATA_SETS = {
+    'customer_data': (CUSTOMER_COLUMNS, ingest_customer_chunk, Customer),
+    'loan_data': (LOAN_COLUMNS, ingest_loan_chunk, Loan),
+}
+
+EXTENSIONS = {'excel': 'xlsx', 'csv': 'csv', 'parquet': 'parquet'}
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _measure(name, file_path, chunk_size, load, backend, results):
+    columns, ingest_chunk, model = DATA_SETS[name]
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+    if load:
+        rows = ingest_file(
+            file_path, ingest_chunk, model, chunk_size, force=True, columns=columns, backend=backend
+        )['total_processed']
+    else:
+        rows = sum(len(chunk) for chunk in iter_chunks(file_path, chunk_size, columns=columns))
+    elapsed = time.perf_counter() - started
+    connections.close_all()
+    results.put({
+        'rows': rows,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed) if elapsed else None,
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'peak_rss_growth_mb': round(_peak_rss_mb() - baseline, 1),
+    })
+
+
+class Command(BaseCommand):
+    help = 'Compare read (or full load) time and peak RSS of the Excel, CSV and Parquet ingest paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            action='append',
+            dest='formats',
+            choices=sorted(EXTENSIONS),
+            help='Format to benchmark (can be repeated, defaults to all)'
+        )
+        parser.add_argument('--load', action='store_true', help='Write every row to the database, not just parse the file')
+        parser.add_argument('--backend', choices=INGEST_BACKENDS, help='Write backend for --load (defaults to INGEST_BACKEND)')
+        parser.add_argument('--chunk-size', type=int, help='Rows per chunk (defaults to INGEST_CHUNK_SIZE)')
+        parser.add_argument('--output', help='Write the results as JSON to this path')
+
+    def handle(self, *args, **options):
+        formats = options['formats'] or ['excel', 'csv', 'parquet']
+        chunk_size = options['chunk_size'] or settings.INGEST_CHUNK_SIZE
+        # Each measurement runs in a forked child so peak RSS is per format.
+        context = multiprocessing.get_context('fork')
+
+        results = {}
+        with tempfile.TemporaryDirectory() as scratch:
+            for name, (columns, _, _) in DATA_SETS.items():
+                try:
+                    source_path = find_data_file(settings.DATA_PATH, name)
+                except FileNotFoundError as e:
+                    raise CommandError(str(e))
+
+                results[name] = {}
+                for file_format in formats:
+                    file_path = os.path.join(settings.DATA_PATH, f'{name}.{EXTENSIONS[file_format]}')
+                    if not os.path.exists(file_path):
+                        if file_format == 'excel':
+                            self.stdout.write(self.style.WARNING(f'{file_path} not found, skipping excel'))
+                            continue
+                        file_path = os.path.join(scratch, f'{name}.{EXTENSIONS[file_format]}')
+                        convert_file(source_path, file_path, columns, chunk_size)
+
+                    connections.close_all()
+                    queue = context.Queue()
+                    child = context.Process(target=_measure, args=(name, file_path, chunk_size, options['load'], options['backend'], queue))
+                    child.start()
+                    measurement = queue.get()
+                    child.join()
+
+                    measurement['file_mb'] = round(os.path.getsize(file_path) / 1e6, 2)
+                    results[name][file_format] = measurement
+                    self.stdout.write(f'{name} {file_format}: {json.dumps(measurement)}')
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
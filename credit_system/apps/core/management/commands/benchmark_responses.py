@@ -0,0 +1,146 @@
+import json
+import random
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+from django.core.management.base import BaseCommand
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+from apps.core.annuity import monthly_installment
+from apps.core.compression import brotli
+from apps.core.renderers import ORJSONRenderer
+from apps.loans.responses import eligibility_response, loan_approved_response
+from apps.loans.serializers import LoanCreateResponseSerializer, LoanEligibilityResponseSerializer
+
+
+RATES = ('10.00', '10.50', '12.00', '14.00', '16.00')
+TENURES = (6, 12, 24, 36, 48, 60, 120, 240)
+
+
+def legacy_eligibility(customer_id, interest_rate, tenure, eligibility):
+    data = {
+        'customer_id': customer_id,
+        'approval': eligibility['approved'],
+        'interest_rate': float(interest_rate),
+        'corrected_interest_rate': float(eligibility['corrected_interest_rate']),
+        'tenure': tenure,
+        'monthly_installment': round(float(eligibility['monthly_installment']), 2)
+    }
+    serializer = LoanEligibilityResponseSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    return serializer.data
+
+
+def legacy_loan_approved(customer_id, loan):
+    data = {
+        'loan_id': loan.loan_id,
+        'customer_id': customer_id,
+        'loan_approved': True,
+        'message': 'Loan approved successfully',
+        'monthly_installment': round(float(loan.monthly_payment), 2)
+    }
+    serializer = LoanCreateResponseSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    return serializer.data
+
+
+def _cpu_us_per_request(function, samples, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.process_time()
+        for sample in samples:
+            function(*sample)
+        elapsed = time.process_time() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(samples) * 1e6
+
+
+def _compare(legacy, lean, samples, repeat):
+    mismatches = sum(json.loads(legacy(*sample)) != json.loads(lean(*sample)) for sample in samples)
+    legacy_us = _cpu_us_per_request(legacy, samples, repeat)
+    lean_us = _cpu_us_per_request(lean, samples, repeat)
+    return {
+        'mismatches': mismatches,
+        'legacy_cpu_us_per_request': round(legacy_us, 2),
+        'lean_cpu_us_per_request': round(lean_us, 2),
+        'cpu_us_saved_per_request': round(legacy_us - lean_us, 2),
+        'speedup': round(legacy_us / lean_us, 2),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure per-request CPU of building and rendering loan responses: serializer re-validation '
+        'with the stock JSONRenderer against the typed builders with the orjson renderer'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=5000, help='Random responses per endpoint')
+        parser.add_argument('--loans', type=int, default=500, help='Loans in the simulated view-loans payload')
+        parser.add_argument('--repeat', type=int, default=5, help='Timing runs per implementation (best is kept)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the results as JSON to this path')
+
+    def handle(self, *args, **options):
+        generator = random.Random(options['seed'])
+        stock, lean = JSONRenderer(), ORJSONRenderer()
+
+        eligibility_samples = []
+        create_samples = []
+        for customer_id in range(1, options['samples'] + 1):
+            principal = Decimal(generator.randint(10000, 5000000))
+            rate = Decimal(generator.choice(RATES))
+            tenure = generator.choice(TENURES)
+            corrected = max(rate, Decimal(generator.choice(RATES)))
+            eligibility = {
+                'approved': generator.random() < 0.7,
+                'corrected_interest_rate': corrected,
+                'monthly_installment': monthly_installment(principal, corrected, tenure),
+            }
+            eligibility_samples.append((customer_id, rate, tenure, eligibility))
+            loan = SimpleNamespace(loan_id=customer_id, monthly_payment=eligibility['monthly_installment'])
+            create_samples.append((customer_id, loan))
+
+        results = {
+            'check-eligibility': _compare(
+                lambda *sample: stock.render(legacy_eligibility(*sample)),
+                lambda *sample: lean.render(eligibility_response(*sample)),
+                eligibility_samples,
+                options['repeat'],
+            ),
+            'create-loan': _compare(
+                lambda *sample: stock.render(legacy_loan_approved(*sample)),
+                lambda *sample: lean.render(loan_approved_response(*sample)),
+                create_samples,
+                options['repeat'],
+            ),
+        }
+
+        loans = [
+            {
+                'loan_id': loan_id,
+                'loan_amount': f'{generator.randint(10000, 5000000)}.00',
+                'interest_rate': generator.choice(RATES),
+                'monthly_installment': f'{generator.uniform(500, 200000):.2f}',
+                'repayments_left': generator.randint(0, 240),
+            }
+            for loan_id in range(options['loans'])
+        ]
+        view_loans = _compare(stock.render, lean.render, [(loans,)], options['repeat'] * 20)
+        body = lean.render(loans)
+        view_loans['body_bytes'] = len(body)
+        view_loans['gzip_bytes'] = len(compress_string(body))
+        view_loans['gzip_cpu_us'] = round(_cpu_us_per_request(compress_string, [(body,)], options['repeat'] * 20), 2)
+        if brotli is not None:
+            view_loans['brotli_bytes'] = len(brotli.compress(body, quality=4))
+            view_loans['brotli_cpu_us'] = round(
+                _cpu_us_per_request(lambda data: brotli.compress(data, quality=4), [(body,)], options['repeat'] * 20), 2
+            )
+        results['view-loans'] = view_loans
+
+        self.stdout.write(json.dumps(results, indent=2))
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,126 @@
+import json
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from apps.customers.models import Customer
+from apps.loans.models import Loan
+from apps.core.ingest import CUSTOMER_UPDATE_FIELDS, LOAN_UPDATE_FIELDS
+from apps.core.upsert import INGEST_BACKENDS, upsert
+
+
+WRITERS = ('update_or_create',) + INGEST_BACKENDS
+
+
+def update_or_create_loop(model, objs, update_fields):
+    fields = [model._meta.get_field(name) for name in update_fields if name != 'updated_at']
+    for obj in objs:
+        model.objects.update_or_create(
+            pk=obj.pk,
+            defaults={field.attname: getattr(obj, field.attname) for field in fields},
+        )
+
+
+def _write(writer, model, objs, update_fields, chunk_size):
+    for start in range(0, len(objs), chunk_size):
+        batch = objs[start:start + chunk_size]
+        with transaction.atomic():
+            if writer == 'update_or_create':
+                update_or_create_loop(model, batch, update_fields)
+            else:
+                upsert(model, batch, update_fields, writer)
+
+
+def _build_rows(generator, rows, first_customer_id, first_loan_id, revision):
+    now = timezone.now()
+    customers = []
+    loans = []
+    for offset in range(rows):
+        salary = generator.randint(20000, 300000)
+        customers.append(Customer(
+            customer_id=first_customer_id + offset,
+            first_name=f'First{offset}',
+            last_name=f'Last{revision}',
+            age=generator.randint(21, 65),
+            phone_number=9_000_000_000 + first_customer_id + offset,
+            monthly_salary=salary,
+            approved_limit=round(36 * salary / 100000) * 100000,
+        ))
+        start_date = now - timedelta(days=generator.randint(0, 1800))
+        tenure = generator.choice((12, 24, 36, 60))
+        loans.append(Loan(
+            loan_id=first_loan_id + offset,
+            customer_id=first_customer_id + offset,
+            loan_amount=Decimal(generator.randint(10000, 2000000)),
+            tenure=tenure,
+            interest_rate=Decimal(generator.choice(('10.00', '12.00', '14.50'))),
+            monthly_payment=Decimal(generator.randint(1000, 90000)),
+            emis_paid_on_time=generator.randint(0, tenure),
+            start_date=start_date,
+            end_date=start_date + timedelta(days=30 * tenure),
+        ))
+    return customers, loans
+
+
+def _rows_per_second(rows, seconds):
+    return round(rows / seconds) if seconds else None
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare rows/second of the update_or_create loop with the orm and copy ingest backends, '
+        'inserting and then updating customers and loans. Every run is rolled back'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Customers (and as many loans) per run')
+        parser.add_argument(
+            '--writer',
+            action='append',
+            dest='writers',
+            choices=WRITERS,
+            help='Writer to benchmark (can be repeated, defaults to all)'
+        )
+        parser.add_argument('--chunk-size', type=int, help='Rows per transaction (defaults to INGEST_CHUNK_SIZE)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the results as JSON to this path')
+
+    def handle(self, *args, **options):
+        writers = options['writers'] or list(WRITERS)
+        chunk_size = options['chunk_size'] or settings.INGEST_CHUNK_SIZE
+        rows = options['rows']
+        # Fresh keys above the current maximum, so the first pass inserts and the second updates.
+        first_customer_id = (Customer.objects.aggregate(top=Max('customer_id'))['top'] or 0) + 1
+        first_loan_id = (Loan.objects.aggregate(top=Max('loan_id'))['top'] or 0) + 1
+
+        results = {'vendor': connection.vendor, 'rows': rows, 'chunk_size': chunk_size}
+        for writer in writers:
+            generator = random.Random(options['seed'])
+            measurement = {}
+            with transaction.atomic():
+                for phase, revision in (('insert', 0), ('update', 1)):
+                    customers, loans = _build_rows(generator, rows, first_customer_id, first_loan_id, revision)
+                    for name, model, objs, update_fields in (
+                        ('customers', Customer, customers, CUSTOMER_UPDATE_FIELDS),
+                        ('loans', Loan, loans, LOAN_UPDATE_FIELDS),
+                    ):
+                        started = time.perf_counter()
+                        _write(writer, model, objs, update_fields, chunk_size)
+                        elapsed = time.perf_counter() - started
+                        measurement[f'{name}_{phase}_rows_per_second'] = _rows_per_second(rows, elapsed)
+                transaction.set_rollback(True)
+
+            results[writer] = measurement
+            self.stdout.write(f'{writer}: {json.dumps(measurement)}')
+
+        self.stdout.write(json.dumps(results, indent=2))
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
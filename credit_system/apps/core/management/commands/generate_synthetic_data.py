@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from apps.core.synthetic import DISTRIBUTIONS, generate_synthetic_data
+
+
+class Command(BaseCommand):
+    help = 'Append synthetic customers and loan histories for load testing and benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=10000, help='Number of customers to create')
+        parser.add_argument(
+            '--loans-per-customer',
+            type=float,
+            default=5.0,
+            help='Mean number of loans per customer'
+        )
+        parser.add_argument(
+            '--distribution',
+            choices=DISTRIBUTIONS,
+            default='poisson',
+            help='Distribution of the number of loans per customer'
+        )
+        parser.add_argument('--history-years', type=float, default=5, help='How far back loan start dates go')
+        parser.add_argument(
+            '--on-time-alpha',
+            type=float,
+            default=8.0,
+            help='Alpha of the Beta distribution of per-customer on-time repayment rates'
+        )
+        parser.add_argument(
+            '--on-time-beta',
+            type=float,
+            default=2.0,
+            help='Beta of the Beta distribution of per-customer on-time repayment rates'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000, help='Customers written per transaction')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Generating synthetic data...'))
+
+        def report(progress):
+            self.stdout.write(f"{progress['customers']} customers, {progress['loans']} loans written")
+
+        result = generate_synthetic_data(
+            options['customers'],
+            loans_per_customer=options['loans_per_customer'],
+            distribution=options['distribution'],
+            history_years=options['history_years'],
+            on_time_alpha=options['on_time_alpha'],
+            on_time_beta=options['on_time_beta'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            on_batch=report,
+        )
+
+        self.stdout.write(self.style.SUCCESS(f'Synthetic data generated: {result}'))
@@ -0,0 +1,103 @@
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Sum
+from apps.customers.models import Customer
+from apps.loans.models import Loan
+from apps.core.benchmarking import WSGIRequestRunner, summarize_latencies
+
+
+class Command(BaseCommand):
+    help = 'Fire concurrent /create-loan/ requests at one customer and check that it is never over-committed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customer-id', type=int, help='Customer to borrow for (defaults to the first one)')
+        parser.add_argument('--requests', type=int, default=200, help='Distinct loan applications to send')
+        parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight at once')
+        parser.add_argument(
+            '--attempts',
+            type=int,
+            default=2,
+            help='Times each application is sent with the same Idempotency-Key'
+        )
+        parser.add_argument('--loan-amount', type=float, default=50000)
+        parser.add_argument('--interest-rate', type=float, default=12)
+        parser.add_argument('--tenure', type=int, default=12)
+        parser.add_argument('--path', default='/create-loan/', help='Endpoint to load, e.g. /async/create-loan/')
+        parser.add_argument('--output', help='Write the results as JSON to this path')
+
+    def handle(self, *args, **options):
+        customer_id = options['customer_id'] or Customer.objects.values_list('customer_id', flat=True).first()
+        if customer_id is None:
+            raise CommandError('No customers found; load or generate data first')
+        if connection.vendor == 'sqlite' and options['concurrency'] > 1:
+            self.stdout.write(self.style.WARNING('SQLite ignores select_for_update; run against PostgreSQL'))
+
+        payload = {
+            'customer_id': customer_id,
+            'loan_amount': options['loan_amount'],
+            'interest_rate': options['interest_rate'],
+            'tenure': options['tenure'],
+        }
+        run_id = uuid.uuid4().hex[:12]
+        jobs = [
+            f'loadtest-{run_id}-{index}'
+            for index in range(options['requests'])
+            for _ in range(options['attempts'])
+        ]
+        existing_loans = set(Loan.objects.filter(customer_id=customer_id).values_list('loan_id', flat=True))
+
+        runner = WSGIRequestRunner()
+
+        def send(key):
+            try:
+                elapsed, status_code, body = runner.timed(
+                    'POST', options['path'], payload, headers={'Idempotency-Key': key}
+                )
+                return key, elapsed, status_code, json.loads(body)
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            responses = list(executor.map(send, jobs))
+        elapsed = time.perf_counter() - started
+
+        status_counts = {}
+        loan_ids_by_key = {}
+        for key, _, status_code, body in responses:
+            status_counts[status_code] = status_counts.get(status_code, 0) + 1
+            if status_code == 201:
+                loan_ids_by_key.setdefault(key, set()).add(body.get('loan_id'))
+
+        customer = Customer.objects.get(customer_id=customer_id)
+        active_loans = Loan.objects.filter(customer_id=customer_id).active()
+        new_loans = Loan.objects.filter(customer_id=customer_id).exclude(loan_id__in=existing_loans)
+        active_emi_sum = float(active_loans.aggregate(total=Sum('monthly_payment'))['total'] or 0)
+        approved_ids = {loan_id for ids in loan_ids_by_key.values() for loan_id in ids if loan_id}
+        max_allowed_emi = customer.monthly_salary * 0.5
+        loans_created = new_loans.count()
+
+        results = {
+            **summarize_latencies([sample for _, sample, _, _ in responses], elapsed),
+            'status_counts': {str(code): count for code, count in sorted(status_counts.items())},
+            'loans_created': loans_created,
+            'loans_approved_in_responses': len(approved_ids),
+            'inconsistent_replays': sum(1 for ids in loan_ids_by_key.values() if len(ids) > 1),
+            'active_emi_sum': round(active_emi_sum, 2),
+            'max_allowed_emi': max_allowed_emi,
+            'over_committed': loans_created > 0 and active_emi_sum > max_allowed_emi,
+        }
+        self.stdout.write(json.dumps(results, indent=2))
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump({'benchmark': 'create_loan_contention', 'vendor': connection.vendor, 'results': results}, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if results['over_committed'] or results['inconsistent_replays'] or results['loans_created'] != len(approved_ids):
+            raise CommandError('Concurrent loan creation produced inconsistent results')
+        self.stdout.write(self.style.SUCCESS('No over-commitment or duplicate loans detected'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from apps.core.credit_aggregates import rebuild_credit_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the materialized per-customer credit aggregates from the loans table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--customer-id',
+            type=int,
+            action='append',
+            dest='customer_ids',
+            help='Only rebuild the given customer (can be repeated)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Number of customers aggregated per query'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Rebuilding credit aggregates...'))
+        
+        rebuilt = rebuild_credit_aggregates(
+            customer_ids=options['customer_ids'],
+            batch_size=options['batch_size']
+        )
+        
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt credit aggregates for {rebuilt} customers'))
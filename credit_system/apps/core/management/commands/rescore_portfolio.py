@@ -0,0 +1,48 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from apps.core.portfolio import rescore_portfolio
+from apps.core.tasks import rescore_all_customers
+
+
+class Command(BaseCommand):
+    help = 'Score every customer and write the results to the credit score snapshot table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20000,
+            help='Customers scored per batch'
+        )
+        parser.add_argument(
+            '--date',
+            type=date.fromisoformat,
+            help='Snapshot date (YYYY-MM-DD), defaults to today'
+        )
+        parser.add_argument(
+            '--background',
+            action='store_true',
+            help='Dispatch the Celery task instead of scoring in this process'
+        )
+
+    def handle(self, *args, **options):
+        if options['background']:
+            task = rescore_all_customers.delay(
+                batch_size=options['batch_size'],
+                snapshot_date=options['date'].isoformat() if options['date'] else None,
+            )
+            self.stdout.write(self.style.SUCCESS(f'Re-scoring task started with ID: {task.id}'))
+            return
+
+        self.stdout.write(self.style.SUCCESS('Re-scoring portfolio...'))
+
+        def report(progress):
+            self.stdout.write(f"{progress['customers']} customers, {progress['loans']} loans scored")
+
+        result = rescore_portfolio(
+            snapshot_date=options['date'],
+            batch_size=options['batch_size'],
+            on_batch=report,
+        )
+
+        self.stdout.write(self.style.SUCCESS(f'Portfolio re-scoring result: {result}'))
@@ -0,0 +1,64 @@
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from .instrumentation import collect_metrics, metrics_registry, server_timing_header
+from .loaders import request_loader
+
+
+class RequestInstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with collect_metrics() as metrics:
+            started = time.perf_counter()
+            response = self.get_response(request)
+            return self._finish(request, response, metrics, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        with collect_metrics() as metrics:
+            started = time.perf_counter()
+            response = await self.get_response(request)
+            return self._finish(request, response, metrics, time.perf_counter() - started)
+
+    def _finish(self, request, response, metrics, total):
+        match = getattr(request, 'resolver_match', None)
+        endpoint = match.route if match is not None else 'unmatched'
+        exceeded = metrics_registry.observe(endpoint, request.method, response.status_code, metrics, total)
+
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = server_timing_header(metrics, total)
+            if exceeded:
+                response['X-Query-Budget-Exceeded'] = str(metrics.queries)
+        return response
+
+
+class RequestLoaderMiddleware:
+    """Give each request its own RequestLoader so views and CreditScoring share fetched rows."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with request_loader():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with request_loader():
+            return await self.get_response(request)
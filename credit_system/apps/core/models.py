@@ -1,3 +1,119 @@
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
+from apps.customers.models import Customer
 
-# Create your models here.
+
+class CustomerCreditAggregate(models.Model):
+    customer = models.OneToOneField(
+        Customer,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='credit_aggregate'
+    )
+    active_debt = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    active_emi_sum = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    loan_count = models.PositiveIntegerField(default=0)
+    current_year_count = models.PositiveIntegerField(default=0)
+    total_volume = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_tenure = models.PositiveIntegerField(default=0)
+    emis_paid_on_time = models.PositiveIntegerField(default=0)
+    computed_on = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'customer_credit_aggregates'
+
+    def __str__(self):
+        return f"Credit aggregate for customer {self.customer_id}"
+
+    @property
+    def on_time_ratio(self):
+        if self.total_tenure == 0:
+            return None
+        return self.emis_paid_on_time / self.total_tenure
+
+
+class CreditScoreSnapshot(models.Model):
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='score_snapshots')
+    snapshot_date = models.DateField()
+    credit_score = models.PositiveSmallIntegerField()
+    risk_category = models.CharField(max_length=20)
+    rules_version = models.CharField(max_length=12)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'credit_score_snapshots'
+        constraints = [
+            models.UniqueConstraint(fields=['customer', 'snapshot_date'], name='unique_score_snapshot_per_day'),
+        ]
+        indexes = [
+            models.Index(fields=['snapshot_date', 'risk_category']),
+        ]
+
+    def __str__(self):
+        return f"Credit score {self.credit_score} for customer {self.customer_id} on {self.snapshot_date}"
+
+
+class ImportedFile(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    content_hash = models.CharField(max_length=64)
+    rows = models.PositiveIntegerField(default=0)
+    errors = models.PositiveIntegerField(default=0)
+    imported_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'imported_files'
+
+    def __str__(self):
+        return f"{self.name} ({self.content_hash[:12]})"
+
+
+class IdempotencyKey(models.Model):
+    scope = models.CharField(max_length=50)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'idempotency_keys'
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='unique_idempotency_key_per_scope'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.key}"
+
+
+class ScoringRuleSet(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    rules = models.JSONField()
+    is_active = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'scoring_rule_sets'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['is_active'],
+                condition=models.Q(is_active=True),
+                name='single_active_scoring_rule_set'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name}{' (active)' if self.is_active else ''}"
+
+    def clean(self):
+        from .scoring_rules import RuleTableError, compile_rules
+        try:
+            compile_rules(self.rules)
+        except RuleTableError as e:
+            raise ValidationError({'rules': str(e)})
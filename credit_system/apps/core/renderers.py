@@ -0,0 +1,31 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+from .instrumentation import timed
+
+
+# Datetimes go through DRF's encoder so timestamps keep the trailing 'Z'.
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+_fallback_encoder = JSONEncoder()
+
+
+def dumps(data):
+    """
+    Serialize data to JSON bytes with orjson. Types orjson does not handle natively
+    (Decimal, date/time, lazy strings, querysets) fall back to DRF's JSONEncoder,
+    so the output matches the stock JSONRenderer (U+2028/U+2029 are left unescaped,
+    which is still valid JSON).
+    """
+    return orjson.dumps(data, default=_fallback_encoder.default, option=ORJSON_OPTIONS)
+
+
+class ORJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        with timed('render'):
+            if self.get_indent(accepted_media_type, renderer_context or {}):
+                return super().render(data, accepted_media_type, renderer_context)
+            return dumps(data)
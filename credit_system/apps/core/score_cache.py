@@ -0,0 +1,251 @@
+import threading
+import uuid
+from cachetools import TTLCache
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.db import transaction
+from .instrumentation import metrics_registry
+
+
+class LocalScoreBackend:
+
+    def __init__(self, ttl, maxsize):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generations = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._cache.get(key)
+
+    def get_many(self, keys):
+        with self._lock:
+            return {key: self._cache[key] for key in keys if key in self._cache}
+
+    def set(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+
+    def set_many(self, mapping):
+        with self._lock:
+            self._cache.update(mapping)
+
+    async def aget(self, key):
+        return self.get(key)
+
+    async def aset(self, key, value):
+        self.set(key, value)
+
+    def get_generations(self, keys):
+        with self._lock:
+            return {key: self._generations[key] for key in keys if key in self._generations}
+
+    async def aget_generations(self, keys):
+        return self.get_generations(keys)
+
+    def set_generations(self, mapping):
+        with self._lock:
+            self._generations.update(mapping)
+
+    def add_generations(self, mapping):
+        with self._lock:
+            return {key: self._generations.setdefault(key, value) for key, value in mapping.items()}
+
+    async def aadd_generations(self, mapping):
+        return self.add_generations(mapping)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._generations.clear()
+
+
+class DjangoScoreBackend:
+
+    def __init__(self, alias, ttl):
+        self._cache = caches[alias]
+        self._ttl = ttl
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def get_many(self, keys):
+        return self._cache.get_many(keys)
+
+    def set(self, key, value):
+        self._cache.set(key, value, self._ttl)
+
+    def set_many(self, mapping):
+        self._cache.set_many(mapping, self._ttl)
+
+    async def aget(self, key):
+        return await self._cache.aget(key)
+
+    async def aset(self, key, value):
+        await self._cache.aset(key, value, self._ttl)
+
+    def get_generations(self, keys):
+        return self._cache.get_many(keys)
+
+    async def aget_generations(self, keys):
+        return await self._cache.aget_many(keys)
+
+    # Generations have no timeout; one evicted under memory pressure is replaced
+    # with a new generation by ScoreCache.generations, so the lookup misses.
+    def set_generations(self, mapping):
+        self._cache.set_many(mapping, None)
+
+    def add_generations(self, mapping):
+        for key, value in mapping.items():
+            self._cache.add(key, value, None)
+        return {**mapping, **self._cache.get_many(list(mapping))}
+
+    async def aadd_generations(self, mapping):
+        for key, value in mapping.items():
+            await self._cache.aadd(key, value, None)
+        return {**mapping, **await self._cache.aget_many(list(mapping))}
+
+    def clear(self):
+        self._cache.clear()
+
+
+class ScoreCache:
+    key_prefix = 'credit_score'
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # The version names the scoring rules in force, so a policy change never
+    # serves scores computed under the previous rules. The generation is the
+    # customer's, replaced on every invalidation: a score computed from data read
+    # before an invalidation is written under the old generation, where no later
+    # reader looks, instead of overwriting the invalidation. A customer without a
+    # generation (never seen, or evicted) is given a new one, so the lookup misses.
+    def _key(self, customer_id, generation):
+        return f'{self.key_prefix}:{self.version}:{customer_id}:{generation}'
+
+    def _generation_key(self, customer_id):
+        return f'{self.key_prefix}:generation:{customer_id}'
+
+    def _record(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def _missing_generations(self, keys, found):
+        return {key: uuid.uuid4().hex for key in keys.values() if key not in found}
+
+    def generations(self, customer_ids):
+        """
+        The current generation of each customer. Read it before the data a score
+        is computed from, and pass it to get_or_compute.
+        """
+        keys = {customer_id: self._generation_key(customer_id) for customer_id in customer_ids}
+        found = self.backend.get_generations(list(keys.values()))
+        missing = self._missing_generations(keys, found)
+        if missing:
+            found.update(self.backend.add_generations(missing))
+        return {customer_id: found[key] for customer_id, key in keys.items()}
+
+    async def agenerations(self, customer_ids):
+        keys = {customer_id: self._generation_key(customer_id) for customer_id in customer_ids}
+        found = await self.backend.aget_generations(list(keys.values()))
+        missing = self._missing_generations(keys, found)
+        if missing:
+            found.update(await self.backend.aadd_generations(missing))
+        return {customer_id: found[key] for customer_id, key in keys.items()}
+
+    def get_or_compute(self, customer_id, compute, generation=None):
+        return self.get_many_or_compute({customer_id: compute}, {customer_id: generation})[customer_id]
+
+    def get_many_or_compute(self, computes, generations=None):
+        """Map each customer_id in computes to its cached score, or to computes[customer_id]()."""
+        generations = {
+            customer_id: generation
+            for customer_id, generation in (generations or {}).items() if generation is not None
+        }
+        unknown = [customer_id for customer_id in computes if customer_id not in generations]
+        if unknown:
+            generations.update(self.generations(unknown))
+
+        keys = {customer_id: self._key(customer_id, generations[customer_id]) for customer_id in computes}
+        found = self.backend.get_many(list(keys.values()))
+        self._record(len(found), len(keys) - len(found))
+
+        scores = {}
+        computed = {}
+        for customer_id, key in keys.items():
+            if key in found:
+                scores[customer_id] = found[key]
+            else:
+                scores[customer_id] = computed[key] = computes[customer_id]()
+        if computed:
+            self.backend.set_many(computed)
+        return scores
+
+    async def aget_or_compute(self, customer_id, compute, generation=None):
+        if generation is None:
+            generation = (await self.agenerations([customer_id]))[customer_id]
+        key = self._key(customer_id, generation)
+        score = await self.backend.aget(key)
+        self._record(score is not None, score is None)
+        if score is None:
+            score = compute()
+            await self.backend.aset(key, score)
+        return score
+
+    def invalidate(self, *customer_ids):
+        if customer_ids:
+            transaction.on_commit(lambda: self.backend.set_generations({
+                self._generation_key(customer_id): uuid.uuid4().hex for customer_id in customer_ids
+            }))
+
+    def clear(self):
+        self.backend.clear()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': type(self.backend).__name__,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+    def metric_families(self):
+        stats = self.stats()
+        labels = f'{{backend="{stats["backend"]}"}}'
+        return [
+            ('credit_score_cache_hits_total', 'counter', 'Credit score lookups served from the cache.',
+             [f'credit_score_cache_hits_total{labels} {stats["hits"]}']),
+            ('credit_score_cache_misses_total', 'counter', 'Credit score lookups that computed the score.',
+             [f'credit_score_cache_misses_total{labels} {stats["misses"]}']),
+        ]
+
+
+def build_score_cache():
+    config = getattr(settings, 'CREDIT_SCORE_CACHE', {})
+    ttl = config.get('TTL', 300)
+    alias = config.get('ALIAS', 'default')
+
+    if isinstance(caches[alias], RedisCache):
+        backend = DjangoScoreBackend(alias, ttl)
+    else:
+        backend = LocalScoreBackend(ttl, config.get('MAXSIZE', 10000))
+    return ScoreCache(backend)
+
+
+score_cache = build_score_cache()
+metrics_registry.register_collector(score_cache.metric_families)
@@ -0,0 +1,231 @@
+import copy
+import hashlib
+import json
+import threading
+import time
+from bisect import bisect_left
+from asgiref.sync import sync_to_async
+import numpy as np
+from django.conf import settings
+from .score_cache import score_cache
+
+
+FACTORS = ('payment_history', 'loan_count', 'current_year_activity', 'loan_volume')
+BANDED_FACTORS = ('loan_count', 'current_year_activity', 'loan_volume')
+
+# A value v falls in band i when upper_bounds[i - 1] < v <= upper_bounds[i]; values
+# above the last bound take the final score.
+DEFAULT_RULES = {
+    'weights': {
+        'payment_history': 0.30,
+        'loan_count': 0.20,
+        'current_year_activity': 0.25,
+        'loan_volume': 0.25,
+    },
+    'payment_history': {'no_history_score': 50},
+    'bands': {
+        'loan_count': {'upper_bounds': [0, 2, 5, 10], 'scores': [80, 90, 70, 50, 20]},
+        'current_year_activity': {'upper_bounds': [0, 1, 2, 3], 'scores': [80, 90, 60, 30, 10]},
+        'loan_volume': {
+            'upper_bounds': [0.3, 0.5, 0.7, 1.0],
+            'scores': [100, 80, 60, 40, 10],
+            'no_limit_score': 50,
+        },
+    },
+    'max_emi_ratio': 0.5,
+    # Minimum interest rate per credit score band; null rejects the application.
+    'rate_slabs': {'upper_bounds': [10, 30, 50], 'min_rates': [None, 16.0, 12.0, 0.0]},
+    'recommended_rates': {'upper_bounds': [10, 30, 50], 'rates': [0.0, 16.0, 12.0, 10.0]},
+}
+
+
+class RuleTableError(ValueError):
+    pass
+
+
+def _bands(table, name, values_key):
+    try:
+        bounds = [float(bound) for bound in table['upper_bounds']]
+        values = list(table[values_key])
+    except (KeyError, TypeError, ValueError) as e:
+        raise RuleTableError(f'{name}: expected upper_bounds and {values_key} lists ({e})')
+    if bounds != sorted(bounds):
+        raise RuleTableError(f'{name}: upper_bounds must be ascending')
+    if len(values) != len(bounds) + 1:
+        raise RuleTableError(f'{name}: expected {len(bounds) + 1} {values_key} for {len(bounds)} bounds')
+    return bounds, values
+
+
+class CompiledRules:
+    """A rule table compiled into sorted bound arrays for bisect/searchsorted lookups."""
+
+    def __init__(self, table):
+        self.table = table
+        self.version = hashlib.sha256(json.dumps(table, sort_keys=True).encode()).hexdigest()[:12]
+
+        try:
+            weights = table['weights']
+            self.weights = tuple(float(weights[factor]) for factor in FACTORS)
+            self.no_history_score = float(table['payment_history']['no_history_score'])
+            self.no_limit_score = float(table['bands']['loan_volume']['no_limit_score'])
+            self.max_emi_ratio = float(table['max_emi_ratio'])
+            bands = {factor: table['bands'][factor] for factor in BANDED_FACTORS}
+        except (KeyError, TypeError, ValueError) as e:
+            raise RuleTableError(f'Incomplete rule table: {e!r}')
+
+        self.bounds = {}
+        self.scores = {}
+        self.bound_arrays = {}
+        self.score_arrays = {}
+        for factor, band in bands.items():
+            bounds, scores = _bands(band, factor, 'scores')
+            self.bounds[factor] = bounds
+            self.scores[factor] = [float(score) for score in scores]
+            self.bound_arrays[factor] = np.array(bounds)
+            self.score_arrays[factor] = np.array(self.scores[factor])
+
+        self.rate_bounds, self.min_rates = _bands(table.get('rate_slabs'), 'rate_slabs', 'min_rates')
+        self.rate_bound_array = np.array(self.rate_bounds)
+        self.min_rate_array = np.array([np.nan if rate is None else float(rate) for rate in self.min_rates])
+        self.recommended_bounds, self.recommended_rates = _bands(
+            table.get('recommended_rates'), 'recommended_rates', 'rates'
+        )
+
+    def band_score(self, factor, value):
+        return self.scores[factor][bisect_left(self.bounds[factor], value)]
+
+    def score(self, total_tenure, emis_paid_on_time, loan_count, current_year_count,
+              total_volume, active_debt, approved_limit):
+        if active_debt > approved_limit:
+            return 0
+
+        if total_tenure == 0:
+            payment_history = self.no_history_score
+        else:
+            payment_history = emis_paid_on_time / total_tenure * 100
+
+        if approved_limit == 0:
+            loan_volume = self.no_limit_score
+        else:
+            loan_volume = self.band_score('loan_volume', float(total_volume) / approved_limit)
+
+        w_history, w_count, w_activity, w_volume = self.weights
+        score = 0
+        score += payment_history * w_history
+        score += self.band_score('loan_count', loan_count) * w_count
+        score += self.band_score('current_year_activity', current_year_count) * w_activity
+        score += loan_volume * w_volume
+        return min(100, max(0, round(score)))
+
+    def score_profile(self, profile, approved_limit):
+        return self.score(
+            profile.total_tenure,
+            profile.emis_paid_on_time,
+            profile.loan_count,
+            profile.current_year_count,
+            profile.total_volume,
+            profile.active_debt,
+            approved_limit,
+        )
+
+    def score_array(self, total_tenure, emis_paid_on_time, loan_count, current_year_count,
+                    total_volume, active_debt, approved_limit):
+        total_tenure = np.asarray(total_tenure, dtype=float)
+        emis_paid_on_time = np.asarray(emis_paid_on_time, dtype=float)
+        total_volume = np.asarray(total_volume, dtype=float)
+        active_debt = np.asarray(active_debt, dtype=float)
+        approved_limit = np.asarray(approved_limit, dtype=float)
+
+        def lookup(factor, values):
+            indexes = np.searchsorted(self.bound_arrays[factor], values, side='left')
+            return self.score_arrays[factor][indexes]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            payment_history = np.where(
+                total_tenure == 0, self.no_history_score, emis_paid_on_time / total_tenure * 100
+            )
+            volume_ratio = np.where(approved_limit == 0, 0.0, total_volume / approved_limit)
+        loan_volume = np.where(approved_limit == 0, self.no_limit_score, lookup('loan_volume', volume_ratio))
+
+        w_history, w_count, w_activity, w_volume = self.weights
+        score = payment_history * w_history
+        score = score + lookup('loan_count', np.asarray(loan_count, dtype=float)) * w_count
+        score = score + lookup('current_year_activity', np.asarray(current_year_count, dtype=float)) * w_activity
+        score = score + loan_volume * w_volume
+        score = np.clip(np.round(score), 0, 100).astype(np.int64)
+        return np.where(active_debt > approved_limit, 0, score)
+
+    def min_interest_rate(self, credit_score):
+        return self.min_rates[bisect_left(self.rate_bounds, credit_score)]
+
+    def min_interest_rate_array(self, credit_scores):
+        return self.min_rate_array[np.searchsorted(self.rate_bound_array, credit_scores, side='left')]
+
+    def recommended_interest_rate(self, credit_score):
+        return self.recommended_rates[bisect_left(self.recommended_bounds, credit_score)]
+
+
+def compile_rules(table=None):
+    return CompiledRules(copy.deepcopy(DEFAULT_RULES if table is None else table))
+
+
+def load_rule_table(source=None):
+    source = source or settings.CREDIT_SCORING_RULES.get('SOURCE', 'default')
+    if source == 'default':
+        return DEFAULT_RULES
+    if source == 'db':
+        from .models import ScoringRuleSet
+        rules = ScoringRuleSet.objects.filter(is_active=True).values_list('rules', flat=True).first()
+        return DEFAULT_RULES if rules is None else rules
+    try:
+        with open(source) as rule_file:
+            return json.load(rule_file)
+    except (OSError, ValueError) as e:
+        raise RuleTableError(f'Could not read rule table {source}: {e}')
+
+
+class RuleRegistry:
+    """Process-wide compiled rules, re-read from the configured source at most every RELOAD_SECONDS."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rules = None
+        self._checked_at = 0.0
+
+    def get(self):
+        reload_seconds = settings.CREDIT_SCORING_RULES.get('RELOAD_SECONDS', 60)
+        if self._rules is not None and time.monotonic() - self._checked_at < reload_seconds:
+            return self._rules
+
+        with self._lock:
+            if self._rules is None or time.monotonic() - self._checked_at >= reload_seconds:
+                table = load_rule_table()
+                if self._rules is None or table != self._rules.table:
+                    self._rules = compile_rules(table)
+                    score_cache.version = self._rules.version
+                self._checked_at = time.monotonic()
+        return self._rules
+
+    async def aget(self):
+        reload_seconds = settings.CREDIT_SCORING_RULES.get('RELOAD_SECONDS', 60)
+        if self._rules is not None and time.monotonic() - self._checked_at < reload_seconds:
+            return self._rules
+        # A reload may query ScoringRuleSet, which the ORM refuses inside the event loop.
+        return await sync_to_async(self.get)()
+
+    def reset(self):
+        with self._lock:
+            self._rules = None
+            self._checked_at = 0.0
+
+
+rule_registry = RuleRegistry()
+
+
+def get_rules():
+    return rule_registry.get()
+
+
+async def aget_rules():
+    return await rule_registry.aget()
+
@@ -0,0 +1,20 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.customers.models import Customer
+from apps.loans.models import Loan
+from .instrumentation import install_query_recorder
+from .score_cache import score_cache
+
+
+@receiver([post_save, post_delete], sender=Loan)
+def invalidate_loan_customer_score(sender, instance, **kwargs):
+    score_cache.invalidate(instance.customer_id)
+
+
+@receiver([post_save, post_delete], sender=Customer)
+def invalidate_customer_score(sender, instance, **kwargs):
+    score_cache.invalidate(instance.customer_id)
+
+
+connection_created.connect(install_query_recorder, dispatch_uid='core_install_query_recorder')
@@ -0,0 +1,166 @@
+from .annuity import annuity_balance, annuity_payment, annuity_term, monthly_installment
+
+
+REDUCE_TENURE = 'reduce_tenure'
+REDUCE_EMI = 'reduce_emi'
+KEEP_EMI = 'keep_emi'
+KEEP_TENURE = 'keep_tenure'
+
+# Same-month events apply in this order, after that month's instalment.
+EVENT_ORDER = {'rate_change': 0, 'tenure_change': 1, 'prepayment': 2}
+
+
+class SimulationError(ValueError):
+    pass
+
+
+class _Schedule:
+
+    def __init__(self, principal, annual_rate, tenure, emi):
+        self.balance = float(principal)
+        self.annual_rate = float(annual_rate)
+        self.emi = float(emi)
+        self.month = 0
+        self.end_month = int(tenure)
+        self.interest = 0.0
+        self.paid = 0.0
+        self.segments = []
+        self._open_segment()
+
+    @property
+    def monthly_rate(self):
+        return self.annual_rate / (12 * 100)
+
+    def _open_segment(self):
+        self.segments.append({
+            'from_month': self.month + 1,
+            'opening_balance': round(self.balance, 2),
+            'interest_rate': self.annual_rate,
+            'monthly_installment': round(self.emi, 2),
+        })
+
+    def _pay(self, months, final_payment=None):
+        closing = annuity_balance(self.balance, self.monthly_rate, self.emi, months)
+        paid = self.emi * months
+        if final_payment is not None:
+            paid += final_payment - self.emi
+            closing = 0.0
+        self.interest += paid - (self.balance - closing)
+        self.paid += paid
+        self.balance = closing
+        self.month += months
+
+    def advance_to(self, month):
+        if self.balance <= 0:
+            return
+        if month < self.end_month:
+            self._pay(month - self.month)
+            return
+        remaining = self.end_month - self.month
+        before_last = annuity_balance(self.balance, self.monthly_rate, self.emi, remaining - 1)
+        self._pay(remaining, final_payment=before_last * (1 + self.monthly_rate))
+
+    def reschedule(self, keep):
+        if self.balance <= 0:
+            return
+        remaining = self.end_month - self.month
+        if keep == KEEP_TENURE:
+            if remaining <= 0:
+                raise SimulationError(f'No instalments left after month {self.month} to spread the balance over')
+            self.emi = round(annuity_payment(self.balance, self.monthly_rate, remaining), 2)
+        else:
+            term = annuity_term(self.balance, self.monthly_rate, self.emi)
+            if term is None:
+                raise SimulationError(
+                    f'An instalment of {self.emi:.2f} no longer covers the interest after month {self.month}'
+                )
+            self.end_month = self.month + term
+        self._open_segment()
+
+    def prepay(self, amount):
+        applied = min(float(amount), self.balance)
+        self.balance -= applied
+        self.paid += applied
+        return applied
+
+
+def _events(prepayments, rate_changes, tenure_changes):
+    events = [('prepayment', event) for event in prepayments]
+    events += [('rate_change', event) for event in rate_changes]
+    events += [('tenure_change', event) for event in tenure_changes]
+    return sorted(events, key=lambda item: (item[1]['month'], EVENT_ORDER[item[0]]))
+
+
+def _describe(kind):
+    return kind.replace('_', ' ').capitalize()
+
+
+def simulate_loan(principal, annual_rate, tenure, emi=None, prepayments=(), rate_changes=(), tenure_changes=(),
+                  months_paid=0):
+    """
+    Replay a loan with prepayments, rate changes and tenure changes, each applied
+    after the instalment of its month. Balances between events use the closed-form
+    annuity formulas, so the cost grows with the number of events, not the tenure.
+    Events dated before months_paid, the instalments already behind the loan, or
+    in or after the last month of the tenure (or of the longest tenure change)
+    are rejected.
+    Events that an earlier event made unreachable by closing the loan sooner are
+    returned in skipped_events.
+    """
+    events = _events(prepayments, rate_changes, tenure_changes)
+    if events and events[0][1]['month'] < months_paid:
+        kind, event = events[0]
+        raise SimulationError(
+            f"{_describe(kind)} in month {event['month']} is before month {months_paid}, "
+            f"the last instalment already paid"
+        )
+    last_month = max([int(tenure), *(int(event['tenure']) for event in tenure_changes)])
+    if events and events[-1][1]['month'] >= last_month:
+        kind, event = events[-1]
+        raise SimulationError(
+            f"{_describe(kind)} in month {event['month']} is not before month {last_month}, the last instalment"
+        )
+
+    emi = emi if emi is not None else round(monthly_installment(principal, annual_rate, tenure), 2)
+    schedule = _Schedule(principal, annual_rate, tenure, emi)
+    baseline = _Schedule(principal, annual_rate, tenure, emi)
+    baseline.advance_to(baseline.end_month)
+
+    prepaid = 0.0
+    skipped = []
+    for kind, event in events:
+        if event['month'] >= schedule.end_month or schedule.balance <= 0:
+            skipped.append({'type': kind, **event})
+            continue
+        schedule.advance_to(event['month'])
+
+        if kind == 'prepayment':
+            prepaid += schedule.prepay(event['amount'])
+            schedule.reschedule(KEEP_TENURE if event.get('strategy') == REDUCE_EMI else KEEP_EMI)
+        elif kind == 'rate_change':
+            schedule.annual_rate = float(event['interest_rate'])
+            schedule.reschedule(KEEP_EMI if event.get('strategy') == KEEP_EMI else KEEP_TENURE)
+        else:
+            if event['tenure'] <= schedule.month:
+                raise SimulationError(f"Tenure {event['tenure']} ends before month {schedule.month}")
+            schedule.end_month = int(event['tenure'])
+            schedule.reschedule(KEEP_TENURE)
+
+    schedule.advance_to(schedule.end_month)
+
+    return {
+        'tenure_months': schedule.month,
+        'months_saved': baseline.month - schedule.month,
+        'total_payment': round(schedule.paid, 2),
+        'total_interest': round(schedule.interest, 2),
+        'interest_saved': round(baseline.interest - schedule.interest, 2),
+        'total_prepaid': round(prepaid, 2),
+        'segments': schedule.segments,
+        'skipped_events': skipped,
+        'baseline': {
+            'tenure_months': baseline.month,
+            'monthly_installment': round(emi, 2),
+            'total_payment': round(baseline.paid, 2),
+            'total_interest': round(baseline.interest, 2),
+        },
+    }
@@ -0,0 +1,131 @@
+import time
+import numpy as np
+from datetime import timedelta
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from apps.customers.models import Customer
+from apps.loans.models import Loan
+from .credit_aggregates import rebuild_credit_aggregates
+from .ingest import reset_primary_key_sequence
+from .utils import calculate_emi_array
+
+
+DISTRIBUTIONS = ('poisson', 'geometric', 'uniform', 'fixed')
+TENURES = np.array([6, 12, 18, 24, 36, 48, 60, 84, 120])
+SYNTHETIC_PHONE_BASE = 6_000_000_000
+
+
+def sample_loan_counts(rng, size, mean, distribution):
+    if distribution == 'poisson':
+        return rng.poisson(mean, size)
+    if distribution == 'geometric':
+        return rng.geometric(1 / (mean + 1), size) - 1
+    if distribution == 'uniform':
+        return rng.integers(0, int(round(2 * mean)) + 1, size)
+    if distribution == 'fixed':
+        return np.full(size, int(round(mean)))
+    raise ValueError(f'Unknown loan count distribution: {distribution}')
+
+
+def _build_customers(rng, customer_ids):
+    count = len(customer_ids)
+    salaries = np.maximum(np.round(rng.lognormal(np.log(50000), 0.6, count), -3), 5000).astype(np.int64)
+    approved_limits = (np.round(36 * salaries / 100000) * 100000).astype(np.int64)
+    ages = rng.integers(21, 66, count)
+    return [
+        Customer(
+            customer_id=int(customer_id),
+            first_name='Synthetic',
+            last_name=f'Customer{customer_id}',
+            age=int(age),
+            phone_number=SYNTHETIC_PHONE_BASE + int(customer_id),
+            monthly_salary=int(salary),
+            approved_limit=int(limit),
+        )
+        for customer_id, age, salary, limit in zip(customer_ids, ages, salaries, approved_limits)
+    ], salaries
+
+
+def _build_loans(rng, customer_ids, salaries, loan_counts, first_loan_id, now, history_days,
+                 on_time_alpha, on_time_beta):
+    owners = np.repeat(customer_ids, loan_counts)
+    count = len(owners)
+    if not count:
+        return []
+
+    owner_salaries = np.repeat(salaries, loan_counts)
+    on_time_rates = np.repeat(rng.beta(on_time_alpha, on_time_beta, len(customer_ids)), loan_counts)
+
+    amounts = np.maximum(np.round(owner_salaries * rng.uniform(1, 24, count), -3), 10000)
+    rates = np.round(rng.uniform(8, 20, count), 2)
+    tenures = rng.choice(TENURES, count)
+    payments = calculate_emi_array(amounts, rates, tenures)
+    age_days = rng.integers(0, history_days + 1, count)
+    months_elapsed = np.minimum(age_days * 12 // 365, tenures)
+    paid_on_time = rng.binomial(months_elapsed, on_time_rates)
+
+    loans = []
+    for offset in range(count):
+        start_date = now - timedelta(days=int(age_days[offset]))
+        tenure = int(tenures[offset])
+        loans.append(Loan(
+            loan_id=first_loan_id + offset,
+            customer_id=int(owners[offset]),
+            loan_amount=float(amounts[offset]),
+            tenure=tenure,
+            interest_rate=float(rates[offset]),
+            monthly_payment=float(payments[offset]),
+            emis_paid_on_time=int(paid_on_time[offset]),
+            start_date=start_date,
+            end_date=start_date + relativedelta(months=tenure),
+        ))
+    return loans
+
+
+def generate_synthetic_data(customers, loans_per_customer=5.0, distribution='poisson', history_years=5,
+                            on_time_alpha=8.0, on_time_beta=2.0, seed=0, batch_size=5000, on_batch=None):
+    """
+    Append `customers` synthetic customers and their loan histories.
+
+    Loan counts per customer follow `distribution` with the given mean, and each
+    customer's on-time repayment rate is drawn from Beta(on_time_alpha, on_time_beta).
+    Rows are written with bulk inserts and the credit aggregates are rebuilt per batch.
+    """
+    rng = np.random.default_rng(seed)
+    now = timezone.now()
+    history_days = int(history_years * 365)
+    next_customer_id = (Customer.objects.aggregate(last=Max('customer_id'))['last'] or 0) + 1
+    next_loan_id = (Loan.objects.aggregate(last=Max('loan_id'))['last'] or 0) + 1
+
+    started = time.perf_counter()
+    result = {'customers': 0, 'loans': 0, 'first_customer_id': next_customer_id, 'first_loan_id': next_loan_id}
+    remaining = customers
+    while remaining > 0:
+        size = min(batch_size, remaining)
+        customer_ids = np.arange(next_customer_id, next_customer_id + size)
+        customer_rows, salaries = _build_customers(rng, customer_ids)
+        loan_counts = sample_loan_counts(rng, size, loans_per_customer, distribution)
+        loan_rows = _build_loans(
+            rng, customer_ids, salaries, loan_counts, next_loan_id, now, history_days,
+            on_time_alpha, on_time_beta
+        )
+
+        with transaction.atomic():
+            Customer.objects.bulk_create(customer_rows, batch_size=batch_size)
+            Loan.objects.bulk_create(loan_rows, batch_size=batch_size)
+            rebuild_credit_aggregates([int(customer_id) for customer_id in customer_ids], batch_size, now)
+
+        next_customer_id += size
+        next_loan_id += len(loan_rows)
+        remaining -= size
+        result['customers'] += size
+        result['loans'] += len(loan_rows)
+        if on_batch is not None:
+            on_batch(result)
+
+    reset_primary_key_sequence(Customer)
+    reset_primary_key_sequence(Loan)
+    result['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+    return result
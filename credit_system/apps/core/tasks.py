@@ -1,141 +1,284 @@
-from celery import shared_task
-import pandas as pd
-import os
-from datetime import datetime
+from celery import shared_task, chord, group, signature
+from celery.utils import uuid
+from datetime import date
+from functools import partial
 from django.conf import settings
 from apps.customers.models import Customer
 from apps.loans.models import Loan
+from apps.core.credit_aggregates import rebuild_credit_aggregates
+from apps.core.idempotency import purge_expired_keys
+from apps.core.portfolio import rescore_portfolio
+from apps.core.ingest import (
+    CUSTOMER_COLUMNS,
+    LOAN_COLUMNS,
+    count_rows,
+    file_fingerprint,
+    find_data_file,
+    ingest_customer_chunk,
+    ingest_file,
+    ingest_loan_chunk,
+    forget_import,
+    is_imported,
+    last_rows_by_key,
+    merge_results,
+    partition_ranges,
+    record_import,
+    reset_primary_key_sequence,
+    skipped_file_result,
+)
+
+
+# Data set names; the file may be .parquet, .csv or .xlsx (see find_data_file).
+CUSTOMER_FILE = 'customer_data'
+LOAN_FILE = 'loan_data'
+
+
+def _progress_callback(task, total_rows):
+    if not task.request.id or task.request.is_eager:
+        return None
+
+    def report(result):
+        task.update_state(
+            state='PROGRESS',
+            meta={'processed': result['total_processed'], 'total': total_rows}
+        )
+    return report
+
+
+def _load_file(file_name, ingest_chunk, model, columns, force, backend):
+    try:
+        file_path = find_data_file(settings.DATA_PATH, file_name)
+    except FileNotFoundError as e:
+        return {'error': str(e)}
+    
+    content_hash = file_fingerprint(file_path)
+    if not force and is_imported(file_name, content_hash):
+        return skipped_file_result(file_name)
+    
+    result = ingest_file(
+        file_path, ingest_chunk, model, settings.INGEST_CHUNK_SIZE, force=force, columns=columns, backend=backend
+    )
+    record_import(file_name, content_hash, result)
+    return result
 
 
 @shared_task
-def load_customer_data():
+def load_customer_data(force=False, backend=None):
     try:
-        file_path = os.path.join(settings.DATA_PATH, 'customer_data.xlsx')
-        
-        if not os.path.exists(file_path):
-            return {'error': f'File not found: {file_path}'}
-        
-        df = pd.read_excel(file_path)
-        
-        created_count = 0
-        updated_count = 0
-        error_count = 0
-        
-        for index, row in df.iterrows():
-            try:
-                customer_data = {
-                    'customer_id': row['Customer ID'],
-                    'first_name': row['First Name'],
-                    'last_name': row['Last Name'],
-                    'age': row['Age'],
-                    'phone_number': row['Phone Number'],
-                    'monthly_salary': row['Monthly Salary'],
-                    'approved_limit': row['Approved Limit'],
-                }
-                
-                customer, created = Customer.objects.update_or_create(
-                    customer_id=customer_data['customer_id'],
-                    defaults=customer_data
-                )
-                
-                if created:
-                    created_count += 1
-                else:
-                    updated_count += 1
-                    
-            except Exception as e:
-                error_count += 1
-                print(f"Error processing customer row {index}: {str(e)}")
-                continue
-        
-        return {
-            'status': 'success',
-            'created': created_count,
-            'updated': updated_count,
-            'errors': error_count,
-            'total_processed': len(df)
-        }
-        
+        result = _load_file(CUSTOMER_FILE, ingest_customer_chunk, Customer, CUSTOMER_COLUMNS, force, backend)
+        if result.get('status') == 'success':
+            # Loan rows rejected for a missing customer may load now.
+            forget_import(LOAN_FILE)
+        return result
     except Exception as e:
         return {'error': f'Failed to load customer data: {str(e)}'}
 
 
 @shared_task
-def load_loan_data():
+def load_loan_data(force=False, backend=None):
     try:
-        file_path = os.path.join(settings.DATA_PATH, 'loan_data.xlsx')
-        
-        if not os.path.exists(file_path):
-            return {'error': f'File not found: {file_path}'}
-        
-        df = pd.read_excel(file_path)
-        
-        created_count = 0
-        updated_count = 0
-        error_count = 0
-        
-        for index, row in df.iterrows():
-            try:
-                try:
-                    customer = Customer.objects.get(customer_id=row['Customer ID'])
-                except Customer.DoesNotExist:
-                    error_count += 1
-                    print(f"Customer {row['Customer ID']} not found for loan {row['Loan ID']}")
-                    continue
-                
-                start_date = pd.to_datetime(row['Date of Approval'])
-                end_date = pd.to_datetime(row['End Date'])
-                
-                loan_data = {
-                    'loan_id': row['Loan ID'],
-                    'customer': customer,
-                    'loan_amount': row['Loan Amount'],
-                    'tenure': row['Tenure'],
-                    'interest_rate': row['Interest Rate'],
-                    'monthly_payment': row['Monthly payment'],
-                    'emis_paid_on_time': row['EMIs paid on Time'],
-                    'start_date': start_date,
-                    'end_date': end_date,
-                }
-                
-                loan, created = Loan.objects.update_or_create(
-                    loan_id=loan_data['loan_id'],
-                    defaults=loan_data
-                )
-                
-                if created:
-                    created_count += 1
-                else:
-                    updated_count += 1
-                    
-            except Exception as e:
-                error_count += 1
-                print(f"Error processing loan row {index}: {str(e)}")
-                continue
-        
-        return {
-            'status': 'success',
-            'created': created_count,
-            'updated': updated_count,
-            'errors': error_count,
-            'total_processed': len(df)
-        }
-        
+        return _load_file(LOAN_FILE, ingest_loan_chunk, Loan, LOAN_COLUMNS, force, backend)
     except Exception as e:
         return {'error': f'Failed to load loan data: {str(e)}'}
 
 
+@shared_task(bind=True)
+def load_customer_partition(self, start_row, stop_row, force=False, backend=None, last_rows=()):
+    try:
+        return ingest_file(
+            find_data_file(settings.DATA_PATH, CUSTOMER_FILE),
+            partial(ingest_customer_chunk, last_rows=dict(last_rows)),
+            Customer,
+            settings.INGEST_CHUNK_SIZE,
+            start_row=start_row,
+            stop_row=stop_row,
+            reset_sequence=False,
+            on_chunk=_progress_callback(self, stop_row - start_row),
+            force=force,
+            columns=CUSTOMER_COLUMNS,
+            backend=backend,
+        )
+    except Exception as e:
+        return {'error': f'Failed to load customer rows {start_row}-{stop_row}: {str(e)}'}
+
+
+@shared_task(bind=True)
+def load_loan_partition(self, start_row, stop_row, force=False, backend=None, last_rows=()):
+    # Partitions commit concurrently, so a credit aggregate rebuilt here could miss
+    # another partition's loans; finish_partitioned_load rebuilds the customers
+    # reported in customer_ids once every partition has committed.
+    affected_customers = set()
+    try:
+        result = ingest_file(
+            find_data_file(settings.DATA_PATH, LOAN_FILE),
+            partial(ingest_loan_chunk, last_rows=dict(last_rows), affected_customers=affected_customers),
+            Loan,
+            settings.INGEST_CHUNK_SIZE,
+            start_row=start_row,
+            stop_row=stop_row,
+            reset_sequence=False,
+            on_chunk=_progress_callback(self, stop_row - start_row),
+            force=force,
+            columns=LOAN_COLUMNS,
+            backend=backend,
+        )
+    except Exception as e:
+        return {
+            'error': f'Failed to load loan rows {start_row}-{stop_row}: {str(e)}',
+            'customer_ids': sorted(affected_customers),
+        }
+    return {**result, 'customer_ids': sorted(affected_customers)}
+
+
+def _merge_file_results(file_name, results, fingerprints):
+    if file_name not in fingerprints:
+        return skipped_file_result(file_name)
+    result = merge_results(results)
+    record_import(file_name, fingerprints[file_name], result)
+    return result
+
+
+@shared_task(bind=True)
+def start_loan_partitions(self, customer_results, loan_partitions, fingerprints):
+    if CUSTOMER_FILE in fingerprints:
+        reset_primary_key_sequence(Customer)
+    customer_result = _merge_file_results(CUSTOMER_FILE, customer_results, fingerprints)
+    print(f"Customer data loading result: {customer_result}")
+
+    if not loan_partitions:
+        return finish_partitioned_load([], customer_result, fingerprints)
+    return self.replace(chord(
+        group(signature(partition) for partition in loan_partitions),
+        finish_partitioned_load.s(customer_result, fingerprints),
+    ))
+
+
 @shared_task
-def load_all_data():
+def finish_partitioned_load(loan_results, customer_result, fingerprints):
+    if LOAN_FILE in fingerprints:
+        reset_primary_key_sequence(Loan)
+    customer_ids = set()
+    for result in loan_results:
+        customer_ids.update(result.pop('customer_ids', ()))
+    rebuild_credit_aggregates(sorted(customer_ids))
+    loan_result = _merge_file_results(LOAN_FILE, loan_results, fingerprints)
+    print(f"Loan data loading result: {loan_result}")
+
+    return {
+        'customer_data': customer_result,
+        'loan_data': loan_result
+    }
+
+
+def build_partitioned_load(partitions, force=False, backend=None):
+    customer_path = find_data_file(settings.DATA_PATH, CUSTOMER_FILE)
+    loan_path = find_data_file(settings.DATA_PATH, LOAN_FILE)
+
+    fingerprints = {}
+    for file_name, file_path in ((CUSTOMER_FILE, customer_path), (LOAN_FILE, loan_path)):
+        content_hash = file_fingerprint(file_path)
+        # A customer re-import can make previously rejected loan rows loadable.
+        if force or fingerprints or not is_imported(file_name, content_hash):
+            fingerprints[file_name] = content_hash
+
+    if not fingerprints:
+        return None, None
+
+    # Repeated IDs are written from their last row only, as a sequential load leaves them.
+    customer_partitions = []
+    if CUSTOMER_FILE in fingerprints:
+        last_rows = sorted(last_rows_by_key(customer_path, 'Customer ID', CUSTOMER_COLUMNS).items())
+        customer_partitions = [
+            load_customer_partition.si(start, stop, force, backend, last_rows).set(task_id=uuid())
+            for start, stop in partition_ranges(count_rows(customer_path), partitions)
+        ]
+    loan_partitions = []
+    if LOAN_FILE in fingerprints:
+        last_rows = sorted(last_rows_by_key(loan_path, 'Loan ID', LOAN_COLUMNS).items())
+        loan_partitions = [
+            load_loan_partition.si(start, stop, force, backend, last_rows).set(task_id=uuid())
+            for start, stop in partition_ranges(count_rows(loan_path), partitions)
+        ]
+
+    if customer_partitions:
+        workflow = chord(
+            group(customer_partitions),
+            start_loan_partitions.s(loan_partitions, fingerprints).set(task_id=uuid()),
+        )
+    else:
+        workflow = start_loan_partitions.si([], loan_partitions, fingerprints).set(task_id=uuid())
+
+    partition_ids = {
+        'customers': [(partition.id, partition.args[1] - partition.args[0]) for partition in customer_partitions],
+        'loans': [(partition.id, partition.args[1] - partition.args[0]) for partition in loan_partitions],
+    }
+    return workflow, partition_ids
+
+
+@shared_task
+def load_all_data(partitions=1, force=False, backend=None):
     print("Starting data loading process...")
-    
-    customer_result = load_customer_data()
+
+    if partitions > 1:
+        try:
+            workflow, partition_ids = build_partitioned_load(partitions, force=force, backend=backend)
+        except FileNotFoundError as e:
+            return {'error': str(e)}
+
+        if workflow is None:
+            return {
+                'customer_data': skipped_file_result(CUSTOMER_FILE),
+                'loan_data': skipped_file_result(LOAN_FILE),
+            }
+
+        result = workflow.apply_async()
+        print(f"Dispatched {len(partition_ids['customers'])} customer and "
+              f"{len(partition_ids['loans'])} loan partitions")
+        return {
+            'status': 'dispatched',
+            'result_id': result.id,
+            'partitions': partition_ids,
+        }
+
+    customer_result = load_customer_data(force=force, backend=backend)
     print(f"Customer data loading result: {customer_result}")
     
-    loan_result = load_loan_data()
+    loan_result = load_loan_data(force=force, backend=backend)
     print(f"Loan data loading result: {loan_result}")
     
     return {
         'customer_data': customer_result,
         'loan_data': loan_result
-    }
\ No newline at end of file
+    }
+
+
+@shared_task(bind=True)
+def rescore_all_customers(self, batch_size=None, snapshot_date=None):
+    def report(result):
+        if self.request.id and not self.request.is_eager:
+            self.update_state(state='PROGRESS', meta={'processed': result['customers']})
+
+    try:
+        return rescore_portfolio(
+            snapshot_date=date.fromisoformat(snapshot_date) if snapshot_date else None,
+            batch_size=batch_size or settings.RESCORE_BATCH_SIZE,
+            on_batch=report,
+        )
+    except Exception as e:
+        return {'error': f'Failed to rescore customers: {str(e)}'}
+
+
+@shared_task
+def rebuild_all_credit_aggregates(batch_size=2000):
+    try:
+        return {'customers': rebuild_credit_aggregates(batch_size=batch_size)}
+    except Exception as e:
+        return {'error': f'Failed to rebuild credit aggregates: {str(e)}'}
+
+
+@shared_task
+def purge_idempotency_keys(batch_size=10000):
+    try:
+        return {'deleted': purge_expired_keys(batch_size=batch_size)}
+    except Exception as e:
+        return {'error': f'Failed to purge idempotency keys: {str(e)}'}
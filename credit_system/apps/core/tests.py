@@ -1,3 +1,1059 @@
-from django.test import TestCase
+import copy
+import io
+import json
+import os
+import random
+import runpy
+import shutil
+import tempfile
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from celery import signature
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from apps.core.annuity import annuity_factors, monthly_installment
+from apps.core.benchmarking import find_regressions, summarize_latencies
+from apps.core.credit_aggregates import CustomerCreditProfile, load_credit_profile
+from apps.core.credit_scoring import CreditScoring
+from apps.core.loaders import RequestLoader, get_loader, request_loader
+from apps.core.renderers import ORJSONRenderer
+from apps.core.paginators import EstimatedCountPaginator
+from apps.core.models import CreditScoreSnapshot, CustomerCreditAggregate, IdempotencyKey, ScoringRuleSet
+from apps.core.portfolio import rescore_portfolio
+from apps.core.ingest import (
+    CUSTOMER_COLUMNS,
+    CUSTOMER_UPDATE_FIELDS,
+    LOAN_COLUMNS,
+    coerce_columns,
+    convert_file,
+    count_rows,
+    detect_format,
+    find_data_file,
+    ingest_customer_chunk,
+    ingest_file,
+    ingest_loan_chunk,
+    iter_chunks,
+)
+from apps.core.instrumentation import metrics_registry
+from apps.core.simulation import REDUCE_EMI, SimulationError, simulate_loan
+from apps.core.synthetic import generate_synthetic_data, sample_loan_counts
+from apps.core.scoring_rules import DEFAULT_RULES, RuleTableError, compile_rules, rule_registry
+from apps.core.score_cache import DjangoScoreBackend, LocalScoreBackend, ScoreCache, score_cache
+from apps.core.tasks import (
+    CUSTOMER_FILE,
+    LOAN_FILE,
+    build_partitioned_load,
+    finish_partitioned_load,
+    load_customer_data,
+    load_loan_data,
+    purge_idempotency_keys,
+    rebuild_all_credit_aggregates,
+)
+from apps.core.upsert import INGEST_BACKENDS, copy_upsert, upsert
+from apps.core.utils import LoanCalculator, calculate_emi, calculate_emi_array
+from apps.customers.models import Customer
+from apps.loans.models import Loan
 
-# Create your tests here.
+
+def iterative_schedule(principal, annual_rate, tenure_months):
+    # The month-by-month loop get_amortization_schedule replaced.
+    emi = calculate_emi(principal, annual_rate, tenure_months)
+    monthly_rate = annual_rate / (12 * 100)
+    balance = principal
+    schedule = []
+    for month in range(1, tenure_months + 1):
+        interest_payment = balance * monthly_rate
+        principal_payment = emi - interest_payment
+        balance -= principal_payment
+        schedule.append({
+            'month': month,
+            'emi': round(emi, 2),
+            'principal': round(principal_payment, 2),
+            'interest': round(interest_payment, 2),
+            'balance': round(max(0, balance), 2)
+        })
+    return schedule
+
+
+class EMITests(SimpleTestCase):
+
+    def test_array_matches_scalar_emi(self):
+        generator = random.Random(0)
+        loans = [
+            (float(generator.randint(10000, 5000000)), generator.choice((0.0, 8.5, 12.0, 14.5)), generator.choice((1, 12, 60, 240)))
+            for _ in range(500)
+        ]
+        principals, rates, tenures = zip(*loans)
+
+        emis = calculate_emi_array(principals, rates, tenures)
+
+        self.assertEqual(emis.tolist(), [calculate_emi(*loan) for loan in loans])
+
+    def test_non_positive_principal_or_tenure_has_no_emi(self):
+        self.assertEqual(calculate_emi_array([0, 100000, -5], [12, 12, 12], [12, 0, 12]).tolist(), [0.0, 0.0, 0.0])
+
+    def test_memoized_installment_matches_annuity_formula(self):
+        monthly_rate = 12 / (12 * 100)
+        growth = (1 + monthly_rate) ** 24
+        expected = 250000 * monthly_rate * growth / (growth - 1)
+
+        self.assertEqual(monthly_installment(250000, 12, 24), expected)
+        hits = annuity_factors.cache_info().hits
+        self.assertEqual(monthly_installment(250000, 12, 24), expected)
+        self.assertEqual(annuity_factors.cache_info().hits, hits + 1)
+        self.assertEqual(monthly_installment(120000, 0, 24), 5000.0)
+
+
+class AmortizationScheduleTests(SimpleTestCase):
+
+    def test_matches_iterative_schedule_within_a_cent(self):
+        # The closed-form balance of an interest-bearing loan adds the same terms in a
+        # different order than the loop, so a cell that lands on a half cent can round
+        # the other way. That one-cent difference (a few cells per million) is
+        # accepted; EMIs and interest-free schedules match exactly.
+        generator = random.Random(0)
+        cells = differing = 0
+        for _ in range(300):
+            principal = float(generator.randint(10000, 5000000))
+            annual_rate = generator.choice((0.0, 8.5, 10.0, 12.0, 14.5, 18.0))
+            tenure = generator.choice((1, 6, 12, 36, 60, 120, 240))
+            expected = iterative_schedule(principal, annual_rate, tenure)
+            actual = LoanCalculator.get_amortization_schedule(principal, annual_rate, tenure)
+            self.assertEqual(len(actual), len(expected))
+            for row, expected_row in zip(actual, expected):
+                self.assertEqual(row['month'], expected_row['month'])
+                self.assertEqual(row['emi'], expected_row['emi'])
+                for column in ('principal', 'interest', 'balance'):
+                    difference = abs(row[column] - expected_row[column])
+                    self.assertLessEqual(difference, 0.01 + 1e-9, (principal, annual_rate, tenure, row['month'], column))
+                    cells += 1
+                    differing += difference > 0
+        self.assertLess(differing / cells, 0.0001)
+
+    def test_interest_free_schedule_matches_iterative_schedule(self):
+        # 1716366 / 240 is a half-cent EMI, so every balance sits on a rounding tie.
+        self.assertEqual(
+            LoanCalculator.get_amortization_schedule(1716366.0, 0.0, 240),
+            iterative_schedule(1716366.0, 0.0, 240),
+        )
+
+    def test_empty_schedule_for_non_positive_tenure(self):
+        self.assertEqual(LoanCalculator.get_amortization_schedule(100000, 10, 0), [])
+
+
+def create_customer(customer_id=1, monthly_salary=100000):
+    return Customer.objects.create(
+        customer_id=customer_id,
+        first_name='Asha',
+        last_name='Rao',
+        age=30,
+        phone_number=9000000000 + customer_id,
+        monthly_salary=monthly_salary,
+        approved_limit=36 * monthly_salary,
+    )
+
+
+def create_loan(customer, start_date, loan_amount=Decimal('100000'), tenure=24, emis_paid_on_time=0):
+    return Loan.objects.create(
+        customer=customer,
+        loan_amount=loan_amount,
+        tenure=tenure,
+        interest_rate=Decimal('12.00'),
+        emis_paid_on_time=emis_paid_on_time,
+        start_date=start_date,
+    )
+
+
+def create_loan_history(customer, now=None):
+    now = now or timezone.now()
+    create_loan(customer, now - timedelta(days=900), tenure=12, emis_paid_on_time=12)
+    create_loan(customer, now - timedelta(days=400), Decimal('250000'), tenure=36, emis_paid_on_time=10)
+    create_loan(customer, now - timedelta(days=20), Decimal('50000'), tenure=6)
+    return list(Loan.objects.filter(customer=customer))
+
+
+def expected_profile(loans, now=None):
+    now = now or timezone.now()
+    return CustomerCreditProfile(
+        total_tenure=sum(loan.tenure for loan in loans),
+        emis_paid_on_time=sum(loan.emis_paid_on_time for loan in loans),
+        loan_count=len(loans),
+        current_year_count=sum(loan.start_date.year == now.year for loan in loans),
+        total_volume=sum(loan.loan_amount for loan in loans),
+        active_debt=sum(loan.current_debt for loan in loans),
+        active_emi_sum=sum(loan.monthly_payment for loan in loans if loan.is_active),
+    )
+
+
+class CreditProfileTests(TestCase):
+
+    def setUp(self):
+        score_cache.clear()
+        self.customer = create_customer()
+
+    def test_profile_matches_per_loan_totals(self):
+        loans = create_loan_history(self.customer)
+
+        self.assertEqual(CustomerCreditProfile.for_customer(self.customer), expected_profile(loans))
+
+    def test_customer_without_loans_has_an_empty_profile(self):
+        self.assertEqual(CustomerCreditProfile.for_customer(self.customer), CustomerCreditProfile())
+
+    def test_scoring_query_count_does_not_grow_with_loan_history(self):
+        create_loan_history(self.customer)
+        CustomerCreditAggregate.objects.all().delete()
+        with self.assertNumQueries(2):
+            CreditScoring(1).check_eligibility(100000, 12, 12)
+
+        for _ in range(10):
+            create_loan(self.customer, timezone.now() - timedelta(days=100))
+        CustomerCreditAggregate.objects.all().delete()
+        score_cache.clear()
+        with self.assertNumQueries(2):
+            CreditScoring(1).check_eligibility(100000, 12, 12)
+
+
+class CreditAggregateTests(TestCase):
+
+    def setUp(self):
+        score_cache.clear()
+        self.customer = create_customer()
+
+    def assertAggregateIsCurrent(self, customer):
+        aggregate = CustomerCreditAggregate.objects.get(customer=customer)
+        self.assertEqual(aggregate.computed_on, timezone.localdate())
+        self.assertEqual(
+            CustomerCreditProfile.from_aggregate(aggregate), CustomerCreditProfile.for_customer(customer)
+        )
+        customer.refresh_from_db()
+        self.assertEqual(customer.current_debt, aggregate.active_debt)
+
+    def test_new_loans_are_added_to_the_aggregate(self):
+        create_loan_history(self.customer)
+
+        self.assertAggregateIsCurrent(self.customer)
+
+    def test_saved_and_deleted_loans_refresh_the_aggregate(self):
+        loan, *_ = create_loan_history(self.customer)
+        loan.emis_paid_on_time = 3
+        loan.save()
+        self.assertAggregateIsCurrent(self.customer)
+
+        loan.delete()
+        self.assertAggregateIsCurrent(self.customer)
+
+    def test_queryset_update_and_delete_refresh_the_aggregate(self):
+        create_loan_history(self.customer)
+        other = create_customer(2)
+        create_loan(other, timezone.now() - timedelta(days=10))
+
+        Loan.objects.filter(customer=self.customer).update(emis_paid_on_time=1)
+        self.assertAggregateIsCurrent(self.customer)
+
+        Loan.objects.filter(customer=self.customer, tenure=6).update(customer=other)
+        self.assertAggregateIsCurrent(self.customer)
+        self.assertAggregateIsCurrent(other)
+
+        Loan.objects.filter(customer=other).delete()
+        self.assertAggregateIsCurrent(other)
+
+    def test_rebuild_matches_a_live_query(self):
+        create_loan_history(self.customer)
+        other = create_customer(2)
+        CustomerCreditAggregate.objects.all().delete()
+        Loan.objects.bulk_create([
+            Loan(
+                customer=other, loan_amount=Decimal('80000'), tenure=12, interest_rate=Decimal('10.00'),
+                monthly_payment=Decimal('7033.27'), emis_paid_on_time=2,
+                start_date=timezone.now() - timedelta(days=70), end_date=timezone.now() + timedelta(days=290),
+            )
+        ])
+
+        self.assertEqual(rebuild_all_credit_aggregates(batch_size=1), {'customers': 2})
+
+        self.assertAggregateIsCurrent(self.customer)
+        self.assertAggregateIsCurrent(other)
+
+    def test_stale_aggregate_is_recomputed_for_the_read_only(self):
+        loans = create_loan_history(self.customer)
+        yesterday = timezone.localdate() - timedelta(days=1)
+        CustomerCreditAggregate.objects.update(computed_on=yesterday, active_debt=0, loan_count=0)
+        customer = Customer.objects.select_related('credit_aggregate').get(customer_id=1)
+
+        self.assertEqual(load_credit_profile(customer), expected_profile(loans))
+        aggregate = CustomerCreditAggregate.objects.get(customer=customer)
+        self.assertEqual((aggregate.computed_on, aggregate.loan_count), (yesterday, 0))
+
+
+class ScoreCacheTests(TestCase):
+
+    def setUp(self):
+        score_cache.clear()
+        self.customer = create_customer()
+
+    def score(self):
+        return CreditScoring(1).calculate_credit_score()
+
+    def test_loan_write_invalidates_the_cached_score(self):
+        score = self.score()
+        self.assertEqual(self.score(), score)
+        self.assertEqual((score_cache.hits, score_cache.misses), (1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_loan(self.customer, timezone.now() - timedelta(days=10), Decimal('3000000'), tenure=120)
+
+        self.assertEqual(self.score(), 0)
+        self.assertEqual(score_cache.misses, 2)
+
+    def test_score_read_before_an_invalidation_is_not_served_after_it(self):
+        cache = ScoreCache(LocalScoreBackend(ttl=300, maxsize=100))
+        generation = cache.generations([1])[1]
+        with self.captureOnCommitCallbacks(execute=True):
+            cache.invalidate(1)
+
+        cache.get_or_compute(1, lambda: 10, generation)
+
+        self.assertEqual(cache.get_or_compute(1, lambda: 20), 20)
+
+    def test_missing_generation_is_a_miss(self):
+        cache = ScoreCache(LocalScoreBackend(ttl=300, maxsize=100))
+        cache.get_or_compute(1, lambda: 10)
+        cache.backend._generations.clear()
+
+        self.assertEqual(cache.get_or_compute(1, lambda: 20), 20)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_local_generations_are_bounded(self):
+        cache = ScoreCache(LocalScoreBackend(ttl=300, maxsize=2))
+        with self.captureOnCommitCallbacks(execute=True):
+            cache.invalidate(*range(1, 6))
+
+        self.assertEqual(len(cache.backend._generations), 2)
+
+    def test_django_backend_keeps_the_first_generation_added(self):
+        cache = ScoreCache(DjangoScoreBackend('default', 300))
+        cache.backend.clear()
+
+        first = cache.generations([1])[1]
+
+        self.assertEqual(cache.generations([1])[1], first)
+        self.assertEqual(cache.get_or_compute(1, lambda: 10), 10)
+        self.assertEqual(cache.get_or_compute(1, lambda: 20), 10)
+
+    def test_hits_and_misses_are_exported(self):
+        self.score()
+        self.score()
+
+        rendered = metrics_registry.render_prometheus()
+
+        self.assertIn('credit_score_cache_hits_total{backend="LocalScoreBackend"} 1', rendered)
+        self.assertIn('credit_score_cache_misses_total{backend="LocalScoreBackend"} 1', rendered)
+
+
+def customer_rows(count, salary=50000):
+    return [
+        {
+            'Customer ID': customer_id,
+            'First Name': 'Asha',
+            'Last Name': 'Rao',
+            'Age': 30,
+            'Phone Number': 9000000000 + customer_id,
+            'Monthly Salary': salary,
+            'Approved Limit': 36 * salary,
+        }
+        for customer_id in range(1, count + 1)
+    ]
+
+
+def loan_row(loan_id, customer_id, loan_amount=100000, tenure=24, emis_paid_on_time=0, approved='2024-01-15'):
+    return {
+        'Customer ID': customer_id,
+        'Loan ID': loan_id,
+        'Loan Amount': loan_amount,
+        'Tenure': tenure,
+        'Interest Rate': 12.0,
+        'Monthly payment': None,
+        'EMIs paid on Time': emis_paid_on_time,
+        'Date of Approval': approved,
+        'End Date': None,
+    }
+
+
+class DataFileTestCase(TestCase):
+
+    def setUp(self):
+        score_cache.clear()
+        self.data_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_path)
+        settings_override = override_settings(DATA_PATH=self.data_path)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def write_rows(self, file_name, rows, columns):
+        file_path = os.path.join(self.data_path, file_name)
+        pd.DataFrame(rows, columns=list(columns)).to_csv(file_path, index=False)
+        return file_path
+
+
+class ChunkedIngestTests(DataFileTestCase):
+
+    def test_repeated_customer_ids_keep_their_last_row(self):
+        rows = customer_rows(4)
+        rows.append({**rows[1], 'Monthly Salary': 80000})
+        file_path = self.write_rows('customers.csv', rows, CUSTOMER_COLUMNS)
+
+        result = ingest_file(file_path, ingest_customer_chunk, Customer, 10, columns=CUSTOMER_COLUMNS)
+
+        self.assertEqual(
+            (result['created'], result['duplicates'], result['errors'], result['total_processed']), (4, 1, 0, 5)
+        )
+        self.assertEqual(Customer.objects.get(customer_id=2).monthly_salary, 80000)
+
+    def test_chunks_are_written_independently(self):
+        rows = customer_rows(5)
+        rows[3]['Age'] = 'unknown'
+        file_path = self.write_rows('customers.csv', rows, CUSTOMER_COLUMNS)
+
+        result = ingest_file(file_path, ingest_customer_chunk, Customer, 2)
+
+        self.assertEqual((result['chunks'], result['created'], result['errors']), (3, 4, 1))
+        self.assertEqual(sorted(Customer.objects.values_list('customer_id', flat=True)), [1, 2, 3, 5])
+
+    def test_loans_are_loaded_with_their_credit_aggregates(self):
+        for row in customer_rows(2):
+            ingest_customer_chunk(pd.DataFrame([row]))
+        file_path = self.write_rows('loans.csv', [
+            loan_row(1, 1, emis_paid_on_time=24),
+            loan_row(2, 1, loan_amount=50000, tenure=12, emis_paid_on_time=12),
+            loan_row(3, 2),
+            loan_row(4, 9),
+        ], LOAN_COLUMNS)
+
+        result = ingest_file(file_path, ingest_loan_chunk, Loan, 2, columns=LOAN_COLUMNS)
+
+        self.assertEqual((result['created'], result['errors']), (3, 1))
+        for customer in Customer.objects.all():
+            aggregate = CustomerCreditAggregate.objects.get(customer=customer)
+            self.assertEqual(
+                CustomerCreditProfile.from_aggregate(aggregate), CustomerCreditProfile.for_customer(customer)
+            )
+        self.assertEqual(Loan.objects.get(loan_id=2).end_date.date().isoformat(), '2025-01-15')
+
+
+class PartitionedLoadTests(DataFileTestCase):
+
+    def test_partitions_committing_in_reverse_keep_the_last_rows(self):
+        customers = customer_rows(4)
+        customers.append({**customers[1], 'Monthly Salary': 80000, 'Approved Limit': 2900000})
+        self.write_rows(f'{CUSTOMER_FILE}.csv', customers, CUSTOMER_COLUMNS)
+        self.write_rows(f'{LOAN_FILE}.csv', [
+            loan_row(1, 1), loan_row(2, 2), loan_row(1, 3, loan_amount=70000), loan_row(3, 4),
+        ], LOAN_COLUMNS)
+
+        workflow, _ = build_partitioned_load(2)
+        loan_partitions, fingerprints = workflow.body.args
+        customer_results = [partition.apply().get() for partition in reversed(workflow.tasks)]
+        loan_results = [signature(partition).apply().get() for partition in reversed(loan_partitions)]
+        result = finish_partitioned_load(loan_results, customer_results, fingerprints)
+
+        self.assertEqual(result['loan_data']['created'], 3)
+        self.assertEqual(sum(partition['duplicates'] for partition in customer_results), 1)
+        self.assertEqual(Customer.objects.get(customer_id=2).monthly_salary, 80000)
+        self.assertEqual(Loan.objects.get(loan_id=1).customer_id, 3)
+        for customer in Customer.objects.all():
+            aggregate = CustomerCreditAggregate.objects.filter(customer=customer).first()
+            profile = CustomerCreditProfile() if aggregate is None else CustomerCreditProfile.from_aggregate(aggregate)
+            self.assertEqual(profile, CustomerCreditProfile.for_customer(customer))
+
+
+CONNECTION_ENVIRON = (
+    'DB_POOL', 'DB_CONN_MAX_AGE', 'DB_CONN_HEALTH_CHECKS',
+    'DB_POOL_MIN_SIZE', 'DB_POOL_MAX_SIZE', 'DB_POOL_TIMEOUT', 'DB_POOL_MAX_IDLE',
+)
+
+
+def database_settings(**environ):
+    with mock.patch.dict(os.environ, environ):
+        for name in CONNECTION_ENVIRON:
+            if name not in environ:
+                os.environ.pop(name, None)
+        return runpy.run_path(os.path.join(settings.BASE_DIR, 'credit_system', 'settings.py'))['DATABASES']['default']
+
+
+class ConnectionSettingsTests(SimpleTestCase):
+
+    def test_connections_persist_by_default(self):
+        database = database_settings()
+
+        self.assertEqual(database['CONN_MAX_AGE'], 60)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+        self.assertNotIn('pool', database['OPTIONS'])
+
+    def test_pool_disables_persistent_connections(self):
+        database = database_settings(DB_POOL='true', DB_CONN_MAX_AGE='300', DB_POOL_MAX_SIZE='4')
+
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertEqual(database['OPTIONS']['pool'], {'min_size': 2, 'max_size': 4, 'timeout': 10.0, 'max_idle': 600.0})
+
+    def test_latency_summary(self):
+        summary = summarize_latencies([index / 1000 for index in range(100, 0, -1)], elapsed=2)
+
+        self.assertEqual(
+            {key: summary[key] for key in ('requests', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'throughput_rps')},
+            {'requests': 100, 'p50_ms': 50.0, 'p95_ms': 95.0, 'p99_ms': 99.0, 'max_ms': 100.0, 'throughput_rps': 50.0},
+        )
+
+
+@override_settings(IDEMPOTENCY_KEY_TTL=3600)
+class IdempotencyKeyPurgeTests(TestCase):
+
+    def test_only_expired_keys_are_deleted(self):
+        now = timezone.now()
+        for index, age in enumerate((7200, 3601, 3500, 0)):
+            IdempotencyKey.objects.create(
+                scope='create-loan', key=f'key-{index}', request_hash='x', created_at=now - timedelta(seconds=age)
+            )
+
+        self.assertEqual(purge_idempotency_keys(batch_size=1), {'deleted': 2})
+        self.assertEqual(sorted(IdempotencyKey.objects.values_list('key', flat=True)), ['key-2', 'key-3'])
+
+
+class SyntheticDataTests(TestCase):
+
+    def test_generated_book_is_consistent(self):
+        create_customer(1)
+
+        # A loan generated to end exactly "now" is only active at that instant.
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now()):
+            result = generate_synthetic_data(30, loans_per_customer=3, seed=7, batch_size=8)
+
+            self.assertEqual((result['customers'], result['first_customer_id']), (30, 2))
+            self.assertEqual(Customer.objects.count(), 31)
+            self.assertEqual(Loan.objects.count(), result['loans'])
+            for customer in Customer.objects.filter(customer_id__gt=1).select_related('credit_aggregate'):
+                self.assertEqual(
+                    CustomerCreditProfile.from_aggregate(customer.credit_aggregate),
+                    CustomerCreditProfile.for_customer(customer),
+                )
+
+    def test_loan_count_distributions(self):
+        generator = np.random.default_rng(0)
+
+        self.assertEqual(sample_loan_counts(generator, 4, 2.6, 'fixed').tolist(), [3, 3, 3, 3])
+        self.assertAlmostEqual(sample_loan_counts(generator, 20000, 4, 'poisson').mean(), 4, delta=0.1)
+        self.assertAlmostEqual(sample_loan_counts(generator, 20000, 4, 'geometric').mean(), 4, delta=0.2)
+        with self.assertRaises(ValueError):
+            sample_loan_counts(generator, 4, 2, 'normal')
+
+
+class BenchmarkRegressionTests(SimpleTestCase):
+
+    def test_increases_beyond_the_tolerance_are_reported(self):
+        baseline = {
+            'check-eligibility': {'p95_ms': 10.0, 'queries_per_request': 2},
+            'view-loan': {'p95_ms': 5.0, 'queries_per_request': 1},
+        }
+        results = {
+            'check-eligibility': {'p95_ms': 11.5, 'queries_per_request': 3},
+            'view-loan': {'p95_ms': 7.0, 'queries_per_request': 1},
+            'register': {'p95_ms': 50.0, 'queries_per_request': 2},
+        }
+
+        self.assertEqual(find_regressions(baseline, results, tolerance=0.2), [
+            'check-eligibility: queries_per_request 2 -> 3',
+            'view-loan: p95_ms 5.0 -> 7.0',
+        ])
+
+
+@override_settings(SERVER_TIMING_HEADER=True, METRICS_ENABLED=True, METRICS_TOKEN='scrape-token')
+class RequestInstrumentationTests(TestCase):
+
+    def setUp(self):
+        metrics_registry.reset()
+        self.loan = create_loan(create_customer(), timezone.now())
+
+    def test_server_timing_reports_the_request_queries(self):
+        response = self.client.get(f'/view-loan/{self.loan.loan_id}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[0-9.]+;desc="[0-9]+ queries"')
+        self.assertNotIn('X-Query-Budget-Exceeded', response)
+
+    def test_requests_over_their_query_budget_are_flagged(self):
+        with override_settings(QUERY_BUDGETS={'default': 10, 'view-loan/<int:loan_id>/': 0}):
+            response = self.client.get(f'/view-loan/{self.loan.loan_id}/')
+
+        self.assertIn(f'desc="{response["X-Query-Budget-Exceeded"]} queries"', response['Server-Timing'])
+        self.assertIn(
+            'credit_query_budget_exceeded_total{endpoint="view-loan/<int:loan_id>/",method="GET"} 1',
+            metrics_registry.render_prometheus(),
+        )
+
+    def test_metrics_require_the_scrape_token(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer scrape-token').status_code, 200)
+        with override_settings(METRICS_ENABLED=False):
+            self.assertEqual(
+                self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer scrape-token').status_code, 404
+            )
+
+
+def rule_table(**changes):
+    table = copy.deepcopy(DEFAULT_RULES)
+    table.update(changes)
+    return table
+
+
+class ScoringRulesTests(TestCase):
+
+    def tearDown(self):
+        rule_registry.reset()
+
+    def test_invalid_tables_are_rejected(self):
+        bands = copy.deepcopy(DEFAULT_RULES['bands'])
+        bands['loan_count']['upper_bounds'] = [5, 2, 0, 10]
+        invalid = [
+            rule_table(weights={'payment_history': 1.0}),
+            rule_table(bands=bands),
+            rule_table(rate_slabs={'upper_bounds': [10, 30], 'min_rates': [None, 16.0, 12.0, 0.0]}),
+        ]
+        for table in invalid:
+            with self.subTest(table=table), self.assertRaises(RuleTableError):
+                compile_rules(table)
+
+        with self.assertRaises(ValidationError):
+            ScoringRuleSet(name='broken', rules=invalid[0]).clean()
+
+    def test_array_scores_match_scalar_scores(self):
+        rules = compile_rules()
+        generator = np.random.default_rng(0)
+        size = 2000
+        total_tenure = generator.integers(0, 200, size)
+        features = (
+            total_tenure,
+            np.minimum(generator.integers(0, 200, size), total_tenure),
+            generator.integers(0, 15, size),
+            generator.integers(0, 5, size),
+            generator.integers(0, 5000000, size),
+            generator.integers(0, 4000000, size),
+            generator.choice([0, 1000000, 3600000], size),
+        )
+
+        scores = rules.score_array(*features)
+
+        expected = [rules.score(*[int(column[row]) for column in features]) for row in range(size)]
+        self.assertEqual(scores.tolist(), expected)
+
+    @override_settings(CREDIT_SCORING_RULES={'SOURCE': 'db', 'RELOAD_SECONDS': 0})
+    def test_reloading_changed_rules_bumps_the_score_cache_version(self):
+        rule_registry.reset()
+        default_version = rule_registry.get().version
+        self.assertEqual(score_cache.version, default_version)
+
+        ScoringRuleSet.objects.create(name='strict', rules=rule_table(max_emi_ratio=0.4), is_active=True)
+        rules = rule_registry.get()
+
+        self.assertEqual(rules.max_emi_ratio, 0.4)
+        self.assertNotEqual(rules.version, default_version)
+        self.assertEqual(score_cache.version, rules.version)
+        self.assertIs(rule_registry.get(), rules)
+
+
+class PortfolioScoringTests(TestCase):
+
+    def setUp(self):
+        score_cache.clear()
+        now = timezone.now()
+        create_loan_history(create_customer(1))
+        create_customer(2)
+        create_loan(create_customer(3, monthly_salary=5000), now - timedelta(days=30), Decimal('900000'), tenure=60)
+        for customer_id in range(4, 9):
+            customer = create_customer(customer_id, monthly_salary=20000 * customer_id)
+            for months in range(customer_id - 3):
+                create_loan(customer, now - timedelta(days=90 * months), emis_paid_on_time=months)
+        # A stale aggregate must not leak into the book scores.
+        CustomerCreditAggregate.objects.filter(customer_id=4).update(
+            computed_on=timezone.localdate() - timedelta(days=1), loan_count=40
+        )
+        self.expected = {
+            customer_id: CreditScoring(customer_id).calculate_credit_score() for customer_id in range(1, 9)
+        }
+
+    def test_snapshots_match_scalar_scoring(self):
+        result = rescore_portfolio(batch_size=3)
+
+        self.assertEqual((result['customers'], result['batches']), (8, 3))
+        self.assertEqual(result['loans'], Loan.objects.count())
+        self.assertEqual(
+            dict(CreditScoreSnapshot.objects.values_list('customer_id', 'credit_score')), self.expected
+        )
+
+    def test_score_book_matches_scalar_scoring(self):
+        stdout = io.StringIO()
+        call_command('score_book', batch_size=3, stdout=stdout)
+
+        summary = json.loads(stdout.getvalue())
+        histogram = {bucket: count for bucket, count in summary['score_histogram'].items() if count}
+        expected = {}
+        for score in self.expected.values():
+            bucket = '100' if score == 100 else f'{score // 10 * 10}-{score // 10 * 10 + 9}'
+            expected[bucket] = expected.get(bucket, 0) + 1
+        self.assertEqual(summary['customers'], 8)
+        self.assertEqual(histogram, expected)
+
+
+class SimulateLoanTests(SimpleTestCase):
+
+    def test_no_events_reproduces_the_baseline(self):
+        result = simulate_loan(500000, 12, 60)
+
+        self.assertEqual(result['tenure_months'], 60)
+        self.assertEqual(result['months_saved'], 0)
+        self.assertEqual(result['interest_saved'], 0)
+        self.assertAlmostEqual(result['total_payment'] - result['total_interest'], 500000, places=2)
+
+    def test_prepayment_shortens_the_tenure_by_default(self):
+        result = simulate_loan(500000, 12, 60, prepayments=[{'month': 12, 'amount': 100000}])
+
+        self.assertGreater(result['months_saved'], 0)
+        self.assertGreater(result['interest_saved'], 0)
+        self.assertEqual(result['total_prepaid'], 100000)
+        self.assertEqual(len(result['segments']), 2)
+
+    def test_prepayment_can_lower_the_emi_instead(self):
+        result = simulate_loan(
+            500000, 12, 60, prepayments=[{'month': 12, 'amount': 100000, 'strategy': REDUCE_EMI}]
+        )
+
+        self.assertEqual(result['tenure_months'], 60)
+        first, second = result['segments']
+        self.assertLess(second['monthly_installment'], first['monthly_installment'])
+
+    def test_rate_change_keeps_the_tenure(self):
+        result = simulate_loan(500000, 12, 60, rate_changes=[{'month': 24, 'interest_rate': 9}])
+
+        self.assertEqual(result['tenure_months'], 60)
+        self.assertGreater(result['interest_saved'], 0)
+
+    def test_tenure_ending_before_the_event_is_an_error(self):
+        with self.assertRaises(SimulationError):
+            simulate_loan(500000, 12, 60, tenure_changes=[{'month': 24, 'tenure': 12}])
+
+    def test_events_before_the_paid_months_are_an_error(self):
+        with self.assertRaises(SimulationError):
+            simulate_loan(500000, 12, 60, prepayments=[{'month': 3, 'amount': 1000}], months_paid=6)
+
+    def test_events_after_the_last_instalment_are_an_error(self):
+        with self.assertRaises(SimulationError):
+            simulate_loan(500000, 12, 60, prepayments=[{'month': 60, 'amount': 1000}])
+        with self.assertRaises(SimulationError):
+            simulate_loan(500000, 12, 60, rate_changes=[{'month': 72, 'interest_rate': 9}])
+
+    def test_events_in_an_extended_tenure_are_applied(self):
+        result = simulate_loan(
+            500000, 12, 60,
+            tenure_changes=[{'month': 12, 'tenure': 84}],
+            prepayments=[{'month': 70, 'amount': 1000}],
+        )
+
+        self.assertEqual(result['tenure_months'], 84)
+        self.assertEqual(result['total_prepaid'], 1000)
+        self.assertEqual(result['skipped_events'], [])
+
+    def test_events_after_an_early_payoff_are_skipped(self):
+        result = simulate_loan(
+            500000, 12, 60,
+            prepayments=[{'month': 6, 'amount': 600000}, {'month': 30, 'amount': 1000}],
+            rate_changes=[{'month': 40, 'interest_rate': 9}],
+        )
+
+        self.assertEqual(result['tenure_months'], 6)
+        self.assertEqual(result['skipped_events'], [
+            {'type': 'prepayment', 'month': 30, 'amount': 1000},
+            {'type': 'rate_change', 'month': 40, 'interest_rate': 9},
+        ])
+
+
+class ReimportTests(DataFileTestCase):
+
+    def write_customers(self, rows):
+        self.write_rows(f'{CUSTOMER_FILE}.csv', rows, CUSTOMER_COLUMNS)
+
+    def test_unchanged_file_is_skipped(self):
+        self.write_customers(customer_rows(3))
+
+        first = load_customer_data()
+        second = load_customer_data()
+
+        self.assertEqual(first['created'], 3)
+        self.assertEqual(second['status'], 'skipped')
+
+    def test_changed_file_only_rewrites_changed_rows(self):
+        rows = customer_rows(3)
+        self.write_customers(rows)
+        load_customer_data()
+        rows[1]['Monthly Salary'] = 80000
+        self.write_customers(rows)
+
+        result = load_customer_data()
+
+        self.assertEqual((result['created'], result['updated'], result['skipped']), (0, 1, 2))
+        self.assertEqual(Customer.objects.get(customer_id=2).monthly_salary, 80000)
+
+    def test_force_rewrites_every_row(self):
+        self.write_customers(customer_rows(3))
+        load_customer_data()
+
+        result = load_customer_data(force=True)
+
+        self.assertEqual((result['updated'], result['skipped']), (3, 0))
+
+    def test_new_customers_make_rejected_loans_loadable(self):
+        self.write_customers(customer_rows(1))
+        self.write_rows(f'{LOAN_FILE}.csv', [loan_row(1, 1), loan_row(2, 2)], LOAN_COLUMNS)
+        load_customer_data()
+        self.assertEqual(load_loan_data()['created'], 1)
+
+        self.write_customers(customer_rows(2))
+        load_customer_data()
+        result = load_loan_data()
+
+        self.assertEqual(result['created'], 1)
+        self.assertEqual(sorted(Loan.objects.values_list('loan_id', flat=True)), [1, 2])
+
+
+class DataFileFormatTests(DataFileTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.csv_path = self.write_rows(f'{CUSTOMER_FILE}.csv', customer_rows(9), CUSTOMER_COLUMNS)
+        self.parquet_path = os.path.join(self.data_path, f'{CUSTOMER_FILE}.parquet')
+
+    def test_fastest_copy_is_read_unless_another_is_newer(self):
+        self.assertEqual(find_data_file(self.data_path, CUSTOMER_FILE), self.csv_path)
+        convert_file(self.csv_path, self.parquet_path, CUSTOMER_COLUMNS, 4)
+        self.assertEqual(find_data_file(self.data_path, CUSTOMER_FILE), self.parquet_path)
+
+        newer = os.path.getmtime(self.parquet_path) + 60
+        os.utime(self.csv_path, (newer, newer))
+
+        self.assertEqual(find_data_file(self.data_path, CUSTOMER_FILE), self.csv_path)
+        with self.assertRaises(FileNotFoundError):
+            find_data_file(self.data_path, LOAN_FILE)
+
+    def test_formats_yield_the_same_chunks(self):
+        rows = convert_file(self.csv_path, self.parquet_path, CUSTOMER_COLUMNS, 4)
+        untyped_path = os.path.join(self.data_path, 'customers')
+        shutil.copy(self.parquet_path, untyped_path)
+
+        self.assertEqual(rows, 9)
+        self.assertEqual(pq.ParquetFile(self.parquet_path).num_row_groups, 3)
+        self.assertEqual(detect_format(untyped_path), 'parquet')
+        self.assertEqual(count_rows(self.parquet_path), count_rows(self.csv_path))
+        for start_row, stop_row in ((0, None), (3, 7), (8, 20)):
+            csv_chunks = list(iter_chunks(self.csv_path, 2, start_row, stop_row, CUSTOMER_COLUMNS))
+            parquet_chunks = list(iter_chunks(self.parquet_path, 2, start_row, stop_row, CUSTOMER_COLUMNS))
+            pd.testing.assert_frame_equal(
+                coerce_columns(pd.concat(parquet_chunks), CUSTOMER_COLUMNS),
+                coerce_columns(pd.concat(csv_chunks), CUSTOMER_COLUMNS),
+            )
+
+    def test_switching_formats_rewrites_nothing(self):
+        self.assertEqual(load_customer_data()['created'], 9)
+        convert_file(self.csv_path, self.parquet_path, CUSTOMER_COLUMNS, 4)
+
+        result = load_customer_data()
+
+        self.assertEqual((result['created'], result['updated'], result['skipped']), (0, 0, 9))
+
+
+class RequestLoaderTests(TestCase):
+
+    def setUp(self):
+        score_cache.clear()
+        self.customer = create_customer(1)
+        self.loans = create_loan_history(self.customer)
+        create_customer(2)
+
+    def test_rows_are_fetched_once_per_request(self):
+        with request_loader() as loader:
+            self.assertIs(get_loader(), loader)
+            with self.assertNumQueries(1):
+                customers = loader.customers([1, 2, 99])
+            loan_ids = [loan.loan_id for loan in self.loans]
+            with self.assertNumQueries(1):
+                loans = loader.loans(loan_ids)
+            with self.assertNumQueries(0):
+                self.assertEqual(set(customers), {1, 2})
+                self.assertIs(loader.customer(1), customers[1])
+                self.assertIs(loans[loan_ids[0]].customer, customers[1])
+                self.assertIs(loader.loan(loan_ids[0]), loans[loan_ids[0]])
+                with self.assertRaises(Customer.DoesNotExist):
+                    loader.customer(99)
+                CreditScoring(1).calculate_credit_score()
+        self.assertIsNot(get_loader(), loader)
+
+    def test_forgotten_customers_are_read_again(self):
+        with request_loader() as loader:
+            loader.customer(1)
+            Customer.objects.filter(customer_id=1).update(monthly_salary=120000)
+            self.assertEqual(loader.customer(1).monthly_salary, 100000)
+
+            loader.forget_customer(1)
+
+            with self.assertNumQueries(1):
+                self.assertEqual(loader.customer(1).monthly_salary, 120000)
+
+    def test_score_generation_is_read_before_the_customer(self):
+        loader = RequestLoader()
+        loader.prime(Customer.objects.get(customer_id=2))
+        loader.customer(1)
+        generation = loader.score_generation(1)
+
+        self.assertEqual(generation, score_cache.generations([1])[1])
+        self.assertIsNone(loader.score_generation(2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            score_cache.invalidate(1)
+        self.assertEqual(loader.score_generation(1), generation)
+        loader.forget_customer(1)
+        loader.customer(1)
+        self.assertNotEqual(loader.score_generation(1), generation)
+
+
+class ORJSONRendererTests(SimpleTestCase):
+
+    def test_output_matches_the_stock_json_renderer(self):
+        data = {
+            'loan_id': 7,
+            'loan_amount': Decimal('250000.50'),
+            'interest_rate': Decimal('12.00'),
+            'start_date': datetime(2024, 1, 15, 9, 30, 0, 120000, tzinfo=dt_timezone.utc),
+            'approved_on': date(2024, 1, 15),
+            'request_id': uuid.UUID(int=1),
+            'scores': {1: 74, 2: None},
+            'name': 'Asha Rão',
+            'repayments': [{'month': 1, 'emi': 4707.35}],
+        }
+
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_indented_output_uses_the_stock_renderer(self):
+        data = {'loan_amount': Decimal('100.00')}
+
+        rendered = ORJSONRenderer().render(data, 'application/json; indent=2')
+
+        self.assertEqual(rendered, JSONRenderer().render(data, 'application/json; indent=2'))
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+class CopyUpsertTests(TestCase):
+
+    def customer(self, customer_id, salary):
+        return Customer(
+            customer_id=customer_id,
+            first_name='Asha',
+            last_name='Rao',
+            age=30,
+            phone_number=9000000000 + customer_id,
+            monthly_salary=salary,
+            approved_limit=36 * salary,
+        )
+
+    def test_inserts_then_updates_by_primary_key(self):
+        copy_upsert(Customer, [self.customer(1, 50000), self.customer(2, 60000)], CUSTOMER_UPDATE_FIELDS)
+        # The staging table is dropped, so a second merge in the same transaction works.
+        copy_upsert(Customer, [self.customer(2, 70000), self.customer(3, 40000)], CUSTOMER_UPDATE_FIELDS)
+
+        self.assertEqual(
+            dict(Customer.objects.values_list('customer_id', 'monthly_salary')),
+            {1: 50000, 2: 70000, 3: 40000},
+        )
+
+    def test_empty_batch_is_a_no_op(self):
+        copy_upsert(Customer, [], CUSTOMER_UPDATE_FIELDS)
+
+        self.assertFalse(Customer.objects.exists())
+
+    def test_backends_write_the_same_rows(self):
+        rows = {}
+        for backend in INGEST_BACKENDS:
+            upsert(Customer, [self.customer(1, 50000), self.customer(2, 60000)], CUSTOMER_UPDATE_FIELDS, backend)
+            upsert(Customer, [self.customer(2, 70000)], CUSTOMER_UPDATE_FIELDS, backend)
+            rows[backend] = [
+                {column: value for column, value in row.items() if column not in ('created_at', 'updated_at')}
+                for row in Customer.objects.order_by('customer_id').values()
+            ]
+            Customer.objects.all().delete()
+
+        self.assertEqual(rows['copy'], rows['orm'])
+        self.assertEqual([row['monthly_salary'] for row in rows['copy']], [50000, 70000])
+        with self.assertRaises(ValueError):
+            upsert(Customer, [self.customer(1, 50000)], CUSTOMER_UPDATE_FIELDS, 'rows')
+
+
+@override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=1000)
+class EstimatedCountPaginatorTests(TestCase):
+
+    def setUp(self):
+        create_customer(1)
+
+    @mock.patch('apps.core.paginators.estimated_row_count', return_value=250000)
+    def test_large_unfiltered_table_uses_the_estimate(self, estimate):
+        self.assertEqual(EstimatedCountPaginator(Customer.objects.order_by('customer_id'), 100).count, 250000)
+
+    @mock.patch('apps.core.paginators.estimated_row_count', return_value=250000)
+    def test_filtered_queryset_counts_exactly(self, estimate):
+        paginator = EstimatedCountPaginator(Customer.objects.filter(first_name='Asha').order_by('customer_id'), 100)
+
+        self.assertEqual(paginator.count, 1)
+        estimate.assert_not_called()
+
+    @mock.patch('apps.core.paginators.estimated_row_count', return_value=10)
+    def test_small_table_counts_exactly(self, estimate):
+        self.assertEqual(EstimatedCountPaginator(Customer.objects.order_by('customer_id'), 100).count, 1)
+
+    @mock.patch('apps.core.paginators.estimated_row_count', return_value=None)
+    def test_missing_estimate_counts_exactly(self, estimate):
+        self.assertEqual(EstimatedCountPaginator(Customer.objects.order_by('customer_id'), 100).count, 1)
+
+
+@override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=1000)
+class AdminChangelistTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    @mock.patch('apps.core.paginators.estimated_row_count', return_value=250000)
+    def test_changelists_use_the_estimate_and_a_fixed_number_of_queries(self, estimate):
+        urls = ('/admin/customers/customer/', '/admin/loans/loan/')
+        create_loan_history(create_customer(1))
+        before = {url: self.changelist_queries(url)[1] for url in urls}
+        for customer_id in range(2, 6):
+            create_loan_history(create_customer(customer_id))
+
+        for url in urls:
+            with self.subTest(url=url):
+                response, queries = self.changelist_queries(url)
+
+                self.assertEqual(response.context['cl'].result_count, 250000)
+                self.assertEqual(queries, before[url])
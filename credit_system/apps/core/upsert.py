@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.db import connection, transaction
+
+
+INGEST_BACKENDS = ('orm', 'copy')
+
+
+def _fill_staging(cursor, staging, columns, rows):
+    raw_cursor = cursor.cursor
+    if connection.vendor == 'postgresql' and hasattr(raw_cursor, 'copy'):
+        # psycopg 3
+        with raw_cursor.copy(f'COPY {staging} ({columns}) FROM STDIN') as copy:
+            for row in rows:
+                copy.write_row(row)
+    else:
+        placeholders = ', '.join(['%s'] * len(rows[0]))
+        cursor.executemany(f'INSERT INTO {staging} ({columns}) VALUES ({placeholders})', rows)
+
+
+def copy_upsert(model, objs, update_fields):
+    """
+    Insert or update objs by primary key through a temporary staging table, merged
+    with a single INSERT ... SELECT ... ON CONFLICT DO UPDATE. On PostgreSQL the
+    staging table is filled with COPY FROM STDIN; on SQLite (and psycopg2) with
+    executemany, so the same merge runs locally.
+    """
+    if not objs:
+        return
+    meta = model._meta
+    quote = connection.ops.quote_name
+    fields = meta.concrete_fields
+    columns = ', '.join(quote(field.column) for field in fields)
+    table = quote(meta.db_table)
+    staging = quote(f'{meta.db_table}_staging')
+    assignments = ', '.join(
+        f'{quote(column)} = EXCLUDED.{quote(column)}'
+        for column in (meta.get_field(name).column for name in update_fields)
+    )
+    # pre_save fills auto_now/auto_now_add the same way bulk_create does.
+    rows = [
+        tuple(field.get_db_prep_save(field.pre_save(obj, True), connection) for field in fields)
+        for obj in objs
+    ]
+
+    # DDL is transactional on PostgreSQL and SQLite, so a failed merge also drops the staging table.
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'CREATE TEMPORARY TABLE {staging} AS SELECT {columns} FROM {table} LIMIT 0')
+        _fill_staging(cursor, staging, columns, rows)
+        cursor.execute(
+            f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} WHERE true '
+            f'ON CONFLICT ({quote(meta.pk.column)}) DO UPDATE SET {assignments}'
+        )
+        cursor.execute(f'DROP TABLE {staging}')
+
+
+def upsert(model, objs, update_fields, backend=None):
+    backend = backend or settings.INGEST_BACKEND
+    if backend == 'copy':
+        copy_upsert(model, objs, update_fields)
+    elif backend == 'orm':
+        model.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=[model._meta.pk.name],
+            update_fields=update_fields,
+        )
+    else:
+        raise ValueError(f"Unknown ingest backend {backend!r}, expected one of {', '.join(INGEST_BACKENDS)}")
@@ -1,8 +1,11 @@
 import math
+import numpy as np
+from bisect import bisect_left
 from decimal import Decimal, ROUND_HALF_UP
 from datetime import datetime, timedelta
 from typing import Union, Optional
 from django.core.exceptions import ValidationError
+from .annuity import annuity_balance, monthly_installment
 
 def round_to_nearest_lakh(amount: Union[int, float, Decimal]) -> int:
     if amount <= 0:
@@ -15,10 +18,25 @@ def calculate_emi(principal: float, annual_rate: float, tenure_months: int) -> f
         return 0
     if annual_rate <= 0:
         return principal / tenure_months
-    monthly_rate = annual_rate / (12 * 100)
-    power_term = (1 + monthly_rate) ** tenure_months
-    emi = principal * monthly_rate * power_term / (power_term - 1)
-    return round(emi, 2)
+    return round(monthly_installment(principal, annual_rate, tenure_months), 2)
+
+def _as_loan_arrays(principals, annual_rates, tenures):
+    principals, annual_rates, tenures = np.broadcast_arrays(
+        np.asarray(principals, dtype=float),
+        np.asarray(annual_rates, dtype=float),
+        np.asarray(tenures, dtype=np.int64),
+    )
+    return principals, annual_rates, tenures
+
+def calculate_emi_array(principals, annual_rates, tenures) -> np.ndarray:
+    principals, annual_rates, tenures = _as_loan_arrays(principals, annual_rates, tenures)
+    monthly_rates = annual_rates / (12 * 100)
+    safe_tenures = np.maximum(tenures, 1)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        power_terms = (1 + monthly_rates) ** safe_tenures
+        annuity = np.round(principals * monthly_rates * power_terms / (power_terms - 1), 2)
+        emis = np.where(monthly_rates > 0, annuity, principals / safe_tenures)
+    return np.where((principals <= 0) | (tenures <= 0), 0.0, emis)
 
 def calculate_total_interest(principal: float, emi: float, tenure_months: int) -> float:
     total_payment = emi * tenure_months
@@ -70,25 +88,19 @@ def calculate_debt_to_income_ratio(monthly_debt: float, monthly_income: float) -
         return 100.0
     return min(100.0, (monthly_debt / monthly_income) * 100)
 
+RISK_CATEGORY_BOUNDS = [40, 60, 80]
+RISK_CATEGORIES = ["Very High Risk", "High Risk", "Medium Risk", "Low Risk"]
+
 def get_risk_category(credit_score: int) -> str:
-    if credit_score > 80:
-        return "Low Risk"
-    elif credit_score > 60:
-        return "Medium Risk"
-    elif credit_score > 40:
-        return "High Risk"
-    else:
-        return "Very High Risk"
+    return RISK_CATEGORIES[bisect_left(RISK_CATEGORY_BOUNDS, credit_score)]
+
+def get_risk_category_array(credit_scores) -> np.ndarray:
+    indexes = np.searchsorted(RISK_CATEGORY_BOUNDS, np.asarray(credit_scores), side='left')
+    return np.array(RISK_CATEGORIES, dtype=object)[indexes]
 
 def get_recommended_interest_rate(credit_score: int) -> float:
-    if credit_score > 50:
-        return 10.0
-    elif credit_score > 30:
-        return 12.0
-    elif credit_score > 10:
-        return 16.0
-    else:
-        return 0.0
+    from .scoring_rules import get_rules
+    return get_rules().recommended_interest_rate(credit_score)
 
 def sanitize_string(input_string: str, max_length: int = 100) -> str:
     if not input_string:
@@ -119,35 +131,83 @@ def validate_interest_rate(rate: float, min_rate: float = 0.1, max_rate: float =
         return False
 
 class LoanCalculator:
+    @staticmethod
+    def get_amortization_arrays(principals, annual_rates, tenures) -> dict:
+        principals, annual_rates, tenures = _as_loan_arrays(
+            np.atleast_1d(principals), np.atleast_1d(annual_rates), np.atleast_1d(tenures)
+        )
+        emis = calculate_emi_array(principals, annual_rates, tenures)
+        monthly_rates = annual_rates / (12 * 100)
+        months = np.arange(1, max(int(tenures.max(initial=0)), 0) + 1)
+
+        elapsed = (months - 1)[np.newaxis, :]
+        rates = monthly_rates[:, np.newaxis]
+        growth = (1 + rates) ** elapsed
+        with np.errstate(divide='ignore', invalid='ignore'):
+            opening_balance = np.where(
+                rates > 0,
+                principals[:, np.newaxis] * growth - emis[:, np.newaxis] * (growth - 1) / rates,
+                principals[:, np.newaxis] - emis[:, np.newaxis] * elapsed,
+            )
+        # Interest-free balances step down by the same EMI each month; subtracting it
+        # month by month rounds half-cent balances exactly as the loop did.
+        interest_free = monthly_rates <= 0
+        if interest_free.any():
+            steps = np.empty((int(interest_free.sum()), len(months) + 1))
+            steps[:, 0] = principals[interest_free]
+            steps[:, 1:] = emis[interest_free, np.newaxis]
+            opening_balance[interest_free] = np.subtract.accumulate(steps, axis=1)[:, :-1]
+        interest = opening_balance * rates
+        principal = emis[:, np.newaxis] - interest
+        balance = np.maximum(opening_balance - principal, 0)
+
+        in_tenure = months[np.newaxis, :] <= tenures[:, np.newaxis]
+        return {
+            'month': months,
+            'emi': emis,
+            'principal': np.where(in_tenure, principal, 0.0),
+            'interest': np.where(in_tenure, interest, 0.0),
+            'balance': np.where(in_tenure, balance, 0.0),
+            'mask': in_tenure,
+        }
+
+    @staticmethod
+    def iter_portfolio_schedules(principals, annual_rates, tenures, chunk_size: int = 10000):
+        principals, annual_rates, tenures = _as_loan_arrays(principals, annual_rates, tenures)
+        for start in range(0, len(principals), chunk_size):
+            stop = start + chunk_size
+            yield start, LoanCalculator.get_amortization_arrays(
+                principals[start:stop], annual_rates[start:stop], tenures[start:stop]
+            )
+
     @staticmethod
     def get_amortization_schedule(principal: float, annual_rate: float, tenure_months: int) -> list:
-        emi = calculate_emi(principal, annual_rate, tenure_months)
-        monthly_rate = annual_rate / (12 * 100)
-        balance = principal
-        schedule = []
-        for month in range(1, tenure_months + 1):
-            interest_payment = balance * monthly_rate
-            principal_payment = emi - interest_payment
-            balance -= principal_payment
-            schedule.append({
-                'month': month,
-                'emi': round(emi, 2),
+        if tenure_months <= 0:
+            return []
+        columns = LoanCalculator.get_amortization_arrays(principal, annual_rate, tenure_months)
+        emi = round(float(columns['emi'][0]), 2)
+        return [
+            {
+                'month': int(month),
+                'emi': emi,
                 'principal': round(principal_payment, 2),
                 'interest': round(interest_payment, 2),
-                'balance': round(max(0, balance), 2)
-            })
-        return schedule
+                'balance': round(balance, 2)
+            }
+            for month, principal_payment, interest_payment, balance in zip(
+                columns['month'].tolist(),
+                columns['principal'][0].tolist(),
+                columns['interest'][0].tolist(),
+                columns['balance'][0].tolist(),
+            )
+        ]
     @staticmethod
     def calculate_prepayment_savings(principal: float, annual_rate: float, tenure_months: int, 
                                    prepayment_amount: float, prepayment_month: int) -> dict:
         original_emi = calculate_emi(principal, annual_rate, tenure_months)
         original_total = original_emi * tenure_months
         monthly_rate = annual_rate / (12 * 100)
-        balance = principal
-        for month in range(prepayment_month):
-            interest = balance * monthly_rate
-            principal_part = original_emi - interest
-            balance -= principal_part
+        balance = annuity_balance(principal, monthly_rate, original_emi, prepayment_month)
         new_balance = max(0, balance - prepayment_amount)
         if new_balance <= 0:
             new_tenure = prepayment_month
@@ -1,3 +1,27 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+from .instrumentation import metrics_registry
 
-# Create your views here.
+
+def _may_read_metrics(request):
+    if request.user.is_authenticated and request.user.is_staff:
+        return True
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return bool(settings.METRICS_TOKEN) and scheme.lower() == 'bearer' and constant_time_compare(
+        token.strip(), settings.METRICS_TOKEN
+    )
+
+
+@require_GET
+def metrics(request):
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    if not _may_read_metrics(request):
+        raise PermissionDenied
+    return HttpResponse(
+        metrics_registry.render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
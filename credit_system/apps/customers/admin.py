@@ -1,9 +1,45 @@
 from django.contrib import admin
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from apps.core.paginators import EstimatedCountPaginator
+from apps.loans.models import Loan
 from .models import Customer
 
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
-    list_display = ['customer_id', 'first_name', 'last_name', 'phone_number', 'monthly_salary', 'approved_limit']
+    list_display = ['customer_id', 'first_name', 'last_name', 'phone_number', 'monthly_salary', 'approved_limit', 'loan_count', 'outstanding_debt']
     list_filter = ['monthly_salary', 'approved_limit']
     search_fields = ['first_name', 'last_name', 'phone_number']
-    ordering = ['customer_id']
\ No newline at end of file
+    ordering = ['customer_id']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def get_queryset(self, request):
+        # Correlated subqueries, so the page is one query and the changelist count ignores them.
+        loans = Loan.objects.filter(customer=OuterRef('pk')).order_by()
+        return super().get_queryset(request).annotate(
+            loans_total=Coalesce(
+                Subquery(
+                    loans.values('customer').annotate(total=Count('pk')).values('total'),
+                    output_field=IntegerField()
+                ),
+                Value(0)
+            ),
+            outstanding_total=Coalesce(
+                Subquery(
+                    loans.with_repayment_state().values('customer')
+                    .annotate(total=Sum('outstanding_debt')).values('total'),
+                    output_field=DecimalField(max_digits=18, decimal_places=2)
+                ),
+                Value(0),
+                output_field=DecimalField(max_digits=18, decimal_places=2)
+            ),
+        )
+    
+    def loan_count(self, obj):
+        return obj.loans_total
+    loan_count.admin_order_field = 'loans_total'
+    
+    def outstanding_debt(self, obj):
+        return obj.outstanding_total
+    outstanding_debt.admin_order_field = 'outstanding_total'
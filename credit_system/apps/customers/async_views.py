@@ -0,0 +1,39 @@
+from django.db import IntegrityError
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework import status
+from apps.core.http import InvalidJSONBody, json_response, parse_json_body
+from .models import Customer
+from .serializers import (
+    CustomerRegistrationSerializer,
+    CustomerRegistrationResponseSerializer)
+from .views import DUPLICATE_PHONE_ERROR
+
+
+@csrf_exempt
+@require_POST
+async def register_customer(request):
+    try:
+        serializer = CustomerRegistrationSerializer(data=parse_json_body(request))
+
+        if not serializer.is_valid():
+            return json_response({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The unique constraint on phone_number rejects duplicates (IntegrityError below).
+        customer = await Customer.objects.acreate(**serializer.validated_data)
+
+        response_serializer = CustomerRegistrationResponseSerializer(customer)
+        return json_response(response_serializer.data, status=status.HTTP_201_CREATED)
+
+    except InvalidJSONBody as e:
+        return json_response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except IntegrityError:
+        return json_response(
+            {'error': DUPLICATE_PHONE_ERROR},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except Exception as e:
+        return json_response(
+            {'error': f'An error occurred: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
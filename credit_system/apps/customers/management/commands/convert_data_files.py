@@ -0,0 +1,53 @@
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.core.ingest import CUSTOMER_COLUMNS, LOAN_COLUMNS, convert_file, find_data_file
+
+
+DATA_SETS = {
+    'customer_data': CUSTOMER_COLUMNS,
+    'loan_data': LOAN_COLUMNS,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Convert the customer and loan spreadsheets to Parquet (or CSV) once so later loads skip Excel parsing; '
+        'the loaders prefer .parquet over .csv over .xlsx when several copies exist, unless a spreadsheet '
+        'was modified after its conversion'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['parquet', 'csv'], default='parquet', help='Target format')
+        parser.add_argument('--source-dir', help='Directory holding the source files (defaults to DATA_PATH)')
+        parser.add_argument('--output-dir', help='Directory to write to (defaults to DATA_PATH)')
+        parser.add_argument(
+            '--row-group-size',
+            type=int,
+            help='Rows per Parquet row group or CSV write (defaults to INGEST_CHUNK_SIZE)'
+        )
+
+    def handle(self, *args, **options):
+        source_dir = options['source_dir'] or settings.DATA_PATH
+        output_dir = options['output_dir'] or settings.DATA_PATH
+        chunk_size = options['row_group_size'] or settings.INGEST_CHUNK_SIZE
+        os.makedirs(output_dir, exist_ok=True)
+
+        for name, columns in DATA_SETS.items():
+            excel_path = os.path.join(source_dir, f'{name}.xlsx')
+            try:
+                source_path = excel_path if os.path.exists(excel_path) else find_data_file(source_dir, name)
+            except FileNotFoundError as e:
+                raise CommandError(str(e))
+
+            target_path = os.path.join(output_dir, f"{name}.{options['format']}")
+            if os.path.abspath(source_path) == os.path.abspath(target_path):
+                raise CommandError(f"{source_path} is already in {options['format']} format")
+
+            started = time.perf_counter()
+            rows = convert_file(source_path, target_path, columns, chunk_size)
+            self.stdout.write(self.style.SUCCESS(
+                f'{source_path} -> {target_path}: {rows} rows in {time.perf_counter() - started:.2f}s '
+                f'({os.path.getsize(source_path) / 1e6:.1f} MB -> {os.path.getsize(target_path) / 1e6:.1f} MB)'
+            ))
@@ -1,18 +1,93 @@
+import time
+from celery.result import AsyncResult
 from django.core.management.base import BaseCommand
 from apps.core.tasks import load_all_data
+from apps.core.upsert import INGEST_BACKENDS
 
 
 class Command(BaseCommand):
-    help = 'Load customer and loan data from Excel files using background tasks'
+    help = 'Load customer and loan data from Parquet, CSV or Excel files using background tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--partitions',
+            type=int,
+            default=1,
+            help='Split each file into this many row ranges and load them in parallel across workers'
+        )
+        parser.add_argument(
+            '--detach',
+            action='store_true',
+            help='Return as soon as the tasks are dispatched instead of reporting progress'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-read files even if they are unchanged since the last import'
+        )
+        parser.add_argument(
+            '--backend',
+            choices=INGEST_BACKENDS,
+            help='How rows are written: orm (bulk INSERT ... ON CONFLICT) or copy (COPY into a staging '
+                 'table, then one merge per chunk). Defaults to INGEST_BACKEND'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds between progress reports'
+        )
 
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Starting background data loading...'))
-        
-        task = load_all_data.delay()
-        
+
+        partitions = options['partitions']
+        task = load_all_data.delay(partitions=partitions, force=options['force'], backend=options['backend'])
+
         self.stdout.write(
             self.style.SUCCESS(
                 f'Data loading task started with ID: {task.id}\n'
                 'You can monitor the progress in Celery logs or Django admin.'
             )
-        )
\ No newline at end of file
+        )
+
+        if partitions <= 1 or options['detach']:
+            return
+
+        dispatch = task.get()
+        if 'error' in dispatch:
+            self.stdout.write(self.style.ERROR(dispatch['error']))
+            return
+        if 'result_id' not in dispatch:
+            self.stdout.write(self.style.SUCCESS(f'Data loading result: {dispatch}'))
+            return
+
+        partition_ids = dispatch['partitions']
+        self.stdout.write(
+            f"Loading {len(partition_ids['customers'])} customer and "
+            f"{len(partition_ids['loans'])} loan partitions"
+        )
+
+        final = AsyncResult(dispatch['result_id'])
+        all_partitions = partition_ids['customers'] + partition_ids['loans']
+        total_rows = sum(rows for _, rows in all_partitions)
+
+        while not final.ready():
+            processed = 0
+            finished = 0
+            for partition_id, rows in all_partitions:
+                partition = AsyncResult(partition_id)
+                if partition.state == 'SUCCESS':
+                    processed += rows
+                    finished += 1
+                elif partition.state == 'PROGRESS':
+                    processed += partition.info.get('processed', 0)
+
+            percent = 100 * processed / total_rows if total_rows else 100
+            self.stdout.write(
+                f'Progress: {processed}/{total_rows} rows ({percent:.1f}%), '
+                f'{finished}/{len(all_partitions)} partitions finished'
+            )
+            time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Data loading result: {final.get()}'))
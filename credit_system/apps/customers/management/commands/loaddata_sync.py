@@ -1,17 +1,31 @@
 from django.core.management.base import BaseCommand
 from apps.core.tasks import load_customer_data, load_loan_data
+from apps.core.upsert import INGEST_BACKENDS
 
 
 class Command(BaseCommand):
-    help = 'Load customer and loan data from Excel files synchronously'
+    help = 'Load customer and loan data from Parquet, CSV or Excel files synchronously'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-read files even if they are unchanged since the last import'
+        )
+        parser.add_argument(
+            '--backend',
+            choices=INGEST_BACKENDS,
+            help='How rows are written: orm (bulk INSERT ... ON CONFLICT) or copy (COPY into a staging '
+                 'table, then one merge per chunk). Defaults to INGEST_BACKEND'
+        )
 
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Loading customer data...'))
-        customer_result = load_customer_data()
+        customer_result = load_customer_data(force=options['force'], backend=options['backend'])
         self.stdout.write(self.style.SUCCESS(f'Customer data result: {customer_result}'))
         
         self.stdout.write(self.style.SUCCESS('Loading loan data...'))
-        loan_result = load_loan_data()
+        loan_result = load_loan_data(force=options['force'], backend=options['backend'])
         self.stdout.write(self.style.SUCCESS(f'Loan data result: {loan_result}'))
         
         self.stdout.write(self.style.SUCCESS('Data loading completed!'))
\ No newline at end of file
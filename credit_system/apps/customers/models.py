@@ -3,6 +3,7 @@ from django.db import models
 # Create your models here.
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
+import numpy as np
 
 
 class Customer(models.Model):
@@ -16,15 +17,20 @@ class Customer(models.Model):
     monthly_salary = models.PositiveIntegerField()
     approved_limit = models.PositiveIntegerField()
     current_debt = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Fingerprint of the spreadsheet row this customer was last imported from
+    source_hash = models.CharField(max_length=32, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'customers'
         indexes = [
-            models.Index(fields=['phone_number']),
             models.Index(fields=['customer_id']),
         ]
+        constraints = [
+            # Also the index behind the phone number duplicate checks.
+            models.UniqueConstraint(fields=['phone_number'], name='customers_phone_number_unique'),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} (ID: {self.customer_id})"
@@ -37,6 +43,11 @@ class Customer(models.Model):
         limit = 36 * self.monthly_salary
         return round(limit / 100000) * 100000
 
+    @staticmethod
+    def approved_limits(monthly_salaries):
+        limits = np.round(36 * np.asarray(monthly_salaries, dtype=np.int64) / 100000) * 100000
+        return limits.astype(np.int64).tolist()
+
     def save(self, *args, **kwargs):
         if not self.approved_limit:
             self.approved_limit = self.calculate_approved_limit()
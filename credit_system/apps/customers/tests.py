@@ -1,3 +1,106 @@
+import json
+from unittest import mock
 from django.test import TestCase
+from .models import Customer
+from .views import DUPLICATE_PHONE_ERROR, create_customers
 
-# Create your tests here.
+
+def registration(phone_number, monthly_income=50000):
+    return {
+        'first_name': 'Asha',
+        'last_name': 'Rao',
+        'age': 30,
+        'monthly_income': monthly_income,
+        'phone_number': phone_number,
+    }
+
+
+class AsyncRegisterCustomerTests(TestCase):
+
+    async def apost_json(self, url, payload):
+        return await self.async_client.post(url, json.dumps(payload), content_type='application/json')
+
+    async def test_matches_the_sync_endpoint(self):
+        expected = await self.apost_json('/register/', registration(9000000001))
+        response = await self.apost_json('/async/register/', registration(9000000002))
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            {key: value for key, value in response.json().items() if key not in ('customer_id', 'phone_number')},
+            {key: value for key, value in expected.json().items() if key not in ('customer_id', 'phone_number')},
+        )
+        self.assertEqual(await Customer.objects.acount(), 2)
+
+    async def test_duplicate_and_invalid_registrations_match_the_sync_endpoint(self):
+        await self.apost_json('/register/', registration(9000000001))
+
+        for payload in (registration(9000000001), registration(123), {'first_name': 'Asha'}):
+            expected = await self.apost_json('/register/', payload)
+            response = await self.apost_json('/async/register/', payload)
+            self.assertEqual(response.status_code, expected.status_code)
+            self.assertEqual(response.json(), expected.json())
+
+
+class RegisterCustomersBatchTests(TestCase):
+
+    def setUp(self):
+        Customer.objects.create(
+            first_name='Ravi', last_name='Iyer', age=40,
+            phone_number=9000000001, monthly_salary=60000, approved_limit=2200000,
+        )
+
+    def post(self, items):
+        return self.client.post('/register/batch/', json.dumps(items), content_type='application/json')
+
+    def test_duplicates_are_reported_per_item_in_request_order(self):
+        response = self.post([
+            registration(9000000002),
+            registration(9000000001),
+            registration(9000000002),
+            registration(123),
+            registration(9000000003, monthly_income=100000),
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['created'], 2)
+        created, existing, repeated, invalid, second = body['results']
+        self.assertEqual(created['phone_number'], 9000000002)
+        self.assertEqual(created['approved_limit'], 1800000)
+        self.assertEqual(existing, {'phone_number': 9000000001, 'error': DUPLICATE_PHONE_ERROR})
+        self.assertEqual(repeated, {'phone_number': 9000000002, 'error': 'Phone number repeated in this batch'})
+        self.assertIn('phone_number', invalid['errors'])
+        self.assertEqual(second['approved_limit'], 3600000)
+        self.assertEqual(Customer.objects.count(), 3)
+
+    def test_empty_batch_is_a_bad_request(self):
+        self.assertEqual(self.post([]).status_code, 400)
+
+
+class CreateCustomersRaceTests(TestCase):
+
+    def test_rows_taken_by_concurrent_registrations_are_reported(self):
+        registrations = {
+            phone_number: {
+                'first_name': 'Asha', 'last_name': 'Rao', 'age': 30,
+                'phone_number': phone_number, 'monthly_salary': 50000,
+            }
+            for phone_number in (9000000001, 9000000002, 9000000003)
+        }
+        # Each attempt loses one phone number to a registration that commits
+        # between the duplicate check and the insert.
+        racing = iter((9000000001, 9000000002))
+        approved_limits = Customer.approved_limits
+
+        def register_concurrently(salaries):
+            phone_number = next(racing, None)
+            if phone_number is not None:
+                Customer.objects.create(approved_limit=1800000, **registrations[phone_number])
+            return approved_limits(salaries)
+
+        with mock.patch.object(Customer, 'approved_limits', side_effect=register_concurrently):
+            created, taken = create_customers(registrations)
+
+        self.assertEqual([customer.phone_number for customer in created], [9000000003])
+        self.assertEqual(taken, {9000000001, 9000000002})
+        self.assertEqual(Customer.objects.count(), 3)
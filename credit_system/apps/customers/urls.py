@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import register_customer
+from .views import register_customer, register_customers_batch
 
 urlpatterns = [
     path('register/', register_customer, name='register_customer'),
+    path('register/batch/', register_customers_batch, name='register_customers_batch'),
 ] 
\ No newline at end of file
@@ -3,12 +3,17 @@ from django.shortcuts import render
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from django.db import IntegrityError
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from .models import Customer
 from .serializers import (
     CustomerRegistrationSerializer, 
     CustomerRegistrationResponseSerializer)
 
+
+DUPLICATE_PHONE_ERROR = 'Customer with this phone number already exists'
+
+
 @api_view(['POST'])
 def register_customer(request):
 
@@ -21,25 +26,107 @@ def register_customer(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        phone_number = serializer.validated_data['phone_number']
-        if Customer.objects.filter(phone_number=phone_number).exists():
-            return Response(
-                {'error': 'Customer with this phone number already exists'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        customer = Customer.objects.create(**serializer.validated_data)
+        # The unique constraint on phone_number rejects duplicates (IntegrityError below).
+        with transaction.atomic():
+            customer = Customer.objects.create(**serializer.validated_data)
         
         response_serializer = CustomerRegistrationResponseSerializer(customer)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
         
     except IntegrityError:
         return Response(
-            {'error': 'Customer with this phone number already exists'}, 
+            {'error': DUPLICATE_PHONE_ERROR}, 
             status=status.HTTP_400_BAD_REQUEST
         )
     except Exception as e:
         return Response(
             {'error': f'An error occurred: {str(e)}'}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+
+
+def create_customers(registrations):
+    """
+    Insert validated registrations (keyed by phone number) with one duplicate
+    check and one bulk_create. Returns the created customers and the phone numbers
+    that were already registered. If a concurrent registration wins the race for a
+    phone number, the unique constraint aborts the insert and it is retried once;
+    should that race again, the rows are inserted one savepoint at a time so only
+    the conflicting ones are reported.
+    """
+    registrations = dict(registrations)
+    taken = set()
+    for attempt in range(2):
+        taken |= set(
+            Customer.objects.filter(phone_number__in=registrations).values_list('phone_number', flat=True)
+        )
+        pending = [data for phone_number, data in registrations.items() if phone_number not in taken]
+        limits = Customer.approved_limits([data['monthly_salary'] for data in pending])
+        customers = [Customer(approved_limit=limit, **data) for data, limit in zip(pending, limits)]
+        try:
+            with transaction.atomic():
+                Customer.objects.bulk_create(customers)
+        except IntegrityError:
+            continue
+        return customers, taken
+
+    created = []
+    for customer in customers:
+        try:
+            with transaction.atomic():
+                customer.save(force_insert=True)
+        except IntegrityError:
+            taken.add(customer.phone_number)
+        else:
+            created.append(customer)
+    return created, taken
+
+
+@api_view(['POST'])
+def register_customers_batch(request):
+    try:
+        items = request.data
+        
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'error': 'Expected a non-empty list of registrations'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if len(items) > settings.MAX_REGISTRATION_BATCH_SIZE:
+            return Response(
+                {'error': f'A batch can contain at most {settings.MAX_REGISTRATION_BATCH_SIZE} items'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        results = [None] * len(items)
+        registrations = {}
+        positions = {}
+        for index, item in enumerate(items):
+            serializer = CustomerRegistrationSerializer(data=item)
+            if not serializer.is_valid():
+                results[index] = {'errors': serializer.errors}
+                continue
+            
+            phone_number = serializer.validated_data['phone_number']
+            if phone_number in registrations:
+                results[index] = {'phone_number': phone_number, 'error': 'Phone number repeated in this batch'}
+                continue
+            registrations[phone_number] = serializer.validated_data
+            positions[phone_number] = index
+        
+        customers, taken = create_customers(registrations) if registrations else ([], set())
+        
+        for phone_number in taken:
+            results[positions[phone_number]] = {'phone_number': phone_number, 'error': DUPLICATE_PHONE_ERROR}
+        response_serializer = CustomerRegistrationResponseSerializer(customers, many=True)
+        for customer, data in zip(customers, response_serializer.data):
+            results[positions[customer.phone_number]] = data
+        
+        return Response({'created': len(customers), 'results': results}, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response(
+            {'error': f'An error occurred: {str(e)}'}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
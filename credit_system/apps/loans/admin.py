@@ -1,14 +1,30 @@
 from django.contrib import admin
+from apps.core.paginators import EstimatedCountPaginator
 from .models import Loan
 
 @admin.register(Loan)
 class LoanAdmin(admin.ModelAdmin):
-    list_display = ['loan_id', 'customer', 'loan_amount', 'interest_rate', 'tenure', 'start_date', 'is_active']
+    list_display = ['loan_id', 'customer', 'loan_amount', 'interest_rate', 'tenure', 'start_date', 'is_active', 'repayments_left', 'current_debt']
     list_filter = ['interest_rate', 'tenure', 'start_date', 'end_date']
     search_fields = ['customer__first_name', 'customer__last_name', 'loan_id']
     raw_id_fields = ['customer']
     ordering = ['-start_date']
+    list_select_related = ['customer']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_repayment_state()
     
     def is_active(self, obj):
         return obj.is_active
-    is_active.boolean = True
\ No newline at end of file
+    is_active.boolean = True
+    is_active.admin_order_field = 'active_now'
+    
+    def repayments_left(self, obj):
+        return obj.repayments_left
+    repayments_left.admin_order_field = 'repayments_remaining'
+    
+    def current_debt(self, obj):
+        return obj.current_debt
+    current_debt.admin_order_field = 'outstanding_debt'
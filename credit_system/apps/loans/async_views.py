@@ -0,0 +1,144 @@
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from apps.core.compression import compress_response
+from apps.core.credit_scoring import CreditScoring
+from apps.core.http import InvalidJSONBody, json_response, parse_json_body
+from apps.core.idempotency import idempotent
+from apps.core.instrumentation import timed
+from apps.core.renderers import dumps
+from apps.customers.models import Customer
+from .models import Loan
+from .pagination import LoanKeysetPagination
+from .serializers import (
+    LoanEligibilityRequestSerializer,
+    LoanCreateRequestSerializer,
+    LoanDetailSerializer,
+    LoanListSerializer
+)
+from .responses import eligibility_response
+from .views import originate_loan
+
+
+def _error_response(e):
+    if isinstance(e, InvalidJSONBody):
+        return json_response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return json_response(
+        {'error': f'An error occurred: {str(e)}'},
+        status=status.HTTP_500_INTERNAL_SERVER_ERROR
+    )
+
+
+@csrf_exempt
+@require_POST
+async def check_loan_eligibility(request):
+    try:
+        serializer = LoanEligibilityRequestSerializer(data=parse_json_body(request))
+
+        if not serializer.is_valid():
+            return json_response({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        customer_id = serializer.validated_data['customer_id']
+        loan_amount = serializer.validated_data['loan_amount']
+        interest_rate = serializer.validated_data['interest_rate']
+        tenure = serializer.validated_data['tenure']
+
+        try:
+            credit_scorer = await CreditScoring.acreate(customer_id)
+        except Customer.DoesNotExist:
+            return json_response({'error': 'Customer not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        eligibility = await credit_scorer.acheck_eligibility(loan_amount, interest_rate, tenure)
+        return json_response(
+            eligibility_response(customer_id, interest_rate, tenure, eligibility),
+            status=status.HTTP_200_OK
+        )
+
+    except Exception as e:
+        return _error_response(e)
+
+
+@csrf_exempt
+@require_POST
+@idempotent('create-loan')
+async def create_loan(request):
+    try:
+        serializer = LoanCreateRequestSerializer(data=parse_json_body(request))
+
+        if not serializer.is_valid():
+            return json_response({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        customer_id = serializer.validated_data['customer_id']
+        loan_amount = serializer.validated_data['loan_amount']
+        interest_rate = serializer.validated_data['interest_rate']
+        tenure = serializer.validated_data['tenure']
+
+        try:
+            response_data = await sync_to_async(originate_loan)(customer_id, loan_amount, interest_rate, tenure)
+        except Customer.DoesNotExist:
+            return json_response({'error': 'Customer not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        return json_response(response_data, status=status.HTTP_201_CREATED)
+
+    except Exception as e:
+        return _error_response(e)
+
+
+@require_GET
+async def view_loan_details(request, loan_id):
+    try:
+        try:
+            loan = await Loan.objects.select_related('customer').aget(loan_id=loan_id)
+        except Loan.DoesNotExist:
+            return json_response({'detail': 'No Loan matches the given query.'}, status=status.HTTP_404_NOT_FOUND)
+
+        serializer = LoanDetailSerializer(loan)
+        with timed('serialize'):
+            data = serializer.data
+        return json_response(data, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return _error_response(e)
+
+
+async def _astream_loans_ndjson(loans):
+    serializer = LoanListSerializer()
+    async for loan in loans:
+        yield dumps(serializer.to_representation(loan)) + b'\n'
+
+
+@compress_response
+@require_GET
+async def view_customer_loans(request, customer_id):
+    try:
+        if not await Customer.objects.filter(customer_id=customer_id).aexists():
+            return json_response({'detail': 'No Customer matches the given query.'}, status=status.HTTP_404_NOT_FOUND)
+
+        loans = Loan.objects.filter(customer_id=customer_id).with_repayment_state()
+
+        if request.GET.get('stream') in ('1', 'true', 'ndjson'):
+            return StreamingHttpResponse(
+                _astream_loans_ndjson(loans.order_by(*LoanKeysetPagination.ordering)),
+                content_type='application/x-ndjson'
+            )
+
+        paginator = LoanKeysetPagination()
+        if paginator.is_requested(request):
+            page = await paginator.apaginate_queryset(loans, request)
+            serializer = LoanListSerializer(page, many=True)
+            with timed('serialize'):
+                data = serializer.data
+            return json_response(paginator.get_paginated_data(data), status=status.HTTP_200_OK)
+
+        serializer = LoanListSerializer([loan async for loan in loans], many=True)
+        with timed('serialize'):
+            data = serializer.data
+        return json_response(data, status=status.HTTP_200_OK)
+
+    except ValidationError as e:
+        return json_response({'errors': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return _error_response(e)
@@ -1,10 +1,74 @@
 from django.db import models
+from django.db.models import F, Q, Sum, Value, Case, When, ExpressionWrapper
+from django.db.models.functions import ExtractYear, ExtractMonth, Greatest
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 from apps.customers.models import Customer
-from datetime import datetime, timedelta
+from apps.core.annuity import monthly_installment
 from dateutil.relativedelta import relativedelta
 
 
+class LoanQuerySet(models.QuerySet):
+
+    def active(self, now=None):
+        now = now or timezone.now()
+        return self.filter(start_date__lte=now, end_date__gte=now)
+
+    def with_repayment_state(self, now=None):
+        now = now or timezone.now()
+        is_active = Q(start_date__lte=now, end_date__gte=now)
+        months_elapsed = (
+            (Value(now.year) - ExtractYear('start_date')) * 12
+            + (Value(now.month) - ExtractMonth('start_date'))
+            - Case(When(start_date__day__gt=now.day, then=Value(1)), default=Value(0))
+        )
+        return self.annotate(
+            active_now=Case(
+                When(is_active, then=Value(True)),
+                default=Value(False),
+                output_field=models.BooleanField()
+            ),
+            months_elapsed=ExpressionWrapper(months_elapsed, output_field=models.IntegerField()),
+            repayments_remaining=Case(
+                When(is_active, then=Greatest(F('tenure') - F('months_elapsed'), Value(0))),
+                default=Value(0),
+                output_field=models.IntegerField()
+            ),
+            outstanding_debt=ExpressionWrapper(
+                F('monthly_payment') * F('repayments_remaining'),
+                output_field=models.DecimalField(max_digits=18, decimal_places=2)
+            ),
+        )
+
+    def _rebuild_aggregates(self, customer_ids):
+        from apps.core.credit_aggregates import rebuild_credit_aggregates
+        if customer_ids:
+            rebuild_credit_aggregates(sorted(customer_ids))
+
+    def update(self, **kwargs):
+        customer_ids = set(self.order_by().values_list('customer_id', flat=True))
+        rows = super().update(**kwargs)
+        new_customer = kwargs.get('customer', kwargs.get('customer_id'))
+        if rows and new_customer is not None:
+            customer_ids.add(getattr(new_customer, 'pk', new_customer))
+        self._rebuild_aggregates(customer_ids if rows else ())
+        return rows
+
+    def delete(self):
+        customer_ids = set(self.order_by().values_list('customer_id', flat=True))
+        result = super().delete()
+        self._rebuild_aggregates(customer_ids)
+        return result
+
+    def outstanding_by_customer(self, now=None):
+        return (
+            self.with_repayment_state(now)
+            .values('customer_id')
+            .annotate(total_outstanding=Sum('outstanding_debt'))
+            .order_by('customer_id')
+        )
+
+
 class Loan(models.Model):
     loan_id = models.AutoField(primary_key=True)
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='loans')
@@ -19,9 +83,13 @@ class Loan(models.Model):
     emis_paid_on_time = models.PositiveIntegerField(default=0)
     start_date = models.DateTimeField()
     end_date = models.DateTimeField()
+    # Fingerprint of the spreadsheet row this loan was last imported from
+    source_hash = models.CharField(max_length=32, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = LoanQuerySet.as_manager()
+
     class Meta:
         db_table = 'loans'
         indexes = [
@@ -35,15 +103,19 @@ class Loan(models.Model):
 
     @property
     def is_active(self):
-        now = datetime.now()
+        if 'active_now' in self.__dict__:
+            return self.active_now
+        now = timezone.now()
         return self.start_date <= now <= self.end_date
 
     @property
     def repayments_left(self):
+        if 'repayments_remaining' in self.__dict__:
+            return self.repayments_remaining
         if not self.is_active:
             return 0
         
-        now = datetime.now()
+        now = timezone.now()
         months_passed = (now.year - self.start_date.year) * 12 + (now.month - self.start_date.month)
         
         if now.day < self.start_date.day:
@@ -54,20 +126,16 @@ class Loan(models.Model):
 
     @property
     def current_debt(self):
+        if 'outstanding_debt' in self.__dict__:
+            return self.outstanding_debt
         if not self.is_active:
             return 0
         return self.monthly_payment * self.repayments_left
 
     def calculate_monthly_payment(self):
-        principal = float(self.loan_amount)
-        rate = float(self.interest_rate) / (12 * 100) 
-        n = self.tenure
-        
-        if rate == 0:
-            return principal / n
-        
-        emi = principal * rate * (1 + rate) ** n / ((1 + rate) ** n - 1)
-        return round(emi, 2)
+        if float(self.interest_rate) == 0:
+            return float(self.loan_amount) / self.tenure
+        return round(monthly_installment(self.loan_amount, self.interest_rate, self.tenure), 2)
 
     def save(self, *args, **kwargs):
         if not self.monthly_payment:
@@ -76,4 +144,15 @@ class Loan(models.Model):
         if not self.end_date and self.start_date:
             self.end_date = self.start_date + relativedelta(months=self.tenure)
         
-        super().save(*args, **kwargs)
\ No newline at end of file
+        created = self._state.adding
+        super().save(*args, **kwargs)
+        
+        from apps.core.credit_aggregates import record_loan_saved
+        record_loan_saved(self, created)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        
+        from apps.core.credit_aggregates import record_loan_deleted
+        record_loan_deleted(self)
+        return result
\ No newline at end of file
@@ -0,0 +1,82 @@
+import base64
+import json
+from datetime import datetime
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class LoanKeysetPagination(BasePagination):
+    ordering = ('start_date', 'loan_id')
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def _params(self, request):
+        return getattr(request, 'query_params', request.GET)
+
+    def is_requested(self, request):
+        params = self._params(request)
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def encode_cursor(self, loan):
+        position = json.dumps([loan.start_date.isoformat(), loan.loan_id])
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            start_date, loan_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return datetime.fromisoformat(start_date), int(loan_id)
+        except (TypeError, ValueError):
+            raise ValidationError('Invalid cursor')
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(self._params(request).get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def _page_queryset(self, queryset, request):
+        self.request = request
+        self.page_size_used = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = self._params(request).get(self.cursor_query_param)
+        if cursor:
+            start_date, loan_id = self.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(start_date__gt=start_date) | Q(start_date=start_date, loan_id__gt=loan_id)
+            )
+        return queryset[:self.page_size_used + 1]
+
+    def _finish_page(self, page):
+        self.has_next = len(page) > self.page_size_used
+        page = page[:self.page_size_used]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._finish_page(list(self._page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        return self._finish_page([loan async for loan in self._page_queryset(queryset, request)])
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'next_cursor': self.next_cursor,
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
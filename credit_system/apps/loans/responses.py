@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+
+CENTS = Decimal('0.01')
+
+
+def money(value):
+    """Render value the way a DecimalField(decimal_places=2) does."""
+    return '{:f}'.format(Decimal(str(value)).quantize(CENTS))
+
+
+# The builders below produce the final representation of LoanEligibilityResponseSerializer
+# and LoanCreateResponseSerializer directly. Their inputs are computed by us, so running
+# them back through serializer(data=...).is_valid() only re-parsed our own Decimals.
+
+def eligibility_response(customer_id, interest_rate, tenure, eligibility):
+    return {
+        'customer_id': customer_id,
+        'approval': eligibility['approved'],
+        'interest_rate': money(interest_rate),
+        'corrected_interest_rate': money(eligibility['corrected_interest_rate']),
+        'tenure': tenure,
+        'monthly_installment': money(round(float(eligibility['monthly_installment']), 2))
+    }
+
+
+def loan_rejected_response(customer_id, eligibility):
+    return {
+        'loan_id': None,
+        'customer_id': customer_id,
+        'loan_approved': False,
+        'message': eligibility.get('reason', 'Loan not approved based on credit score'),
+        'monthly_installment': money(round(float(eligibility['monthly_installment']), 2))
+    }
+
+
+def loan_approved_response(customer_id, loan):
+    return {
+        'loan_id': loan.loan_id,
+        'customer_id': customer_id,
+        'loan_approved': True,
+        'message': 'Loan approved successfully',
+        'monthly_installment': money(round(float(loan.monthly_payment), 2))
+    }
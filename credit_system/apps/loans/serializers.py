@@ -66,4 +66,27 @@ class LoanListSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Loan
-        fields = ['loan_id', 'loan_amount', 'interest_rate', 'monthly_installment', 'repayments_left']
\ No newline at end of file
+        fields = ['loan_id', 'loan_amount', 'interest_rate', 'monthly_installment', 'repayments_left']
+
+class PrepaymentSerializer(serializers.Serializer):
+    month = serializers.IntegerField(min_value=1, max_value=600)
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=1)
+    strategy = serializers.ChoiceField(choices=['reduce_tenure', 'reduce_emi'], default='reduce_tenure')
+
+
+class RateChangeSerializer(serializers.Serializer):
+    month = serializers.IntegerField(min_value=1, max_value=600)
+    interest_rate = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=0, max_value=100)
+    strategy = serializers.ChoiceField(choices=['keep_tenure', 'keep_emi'], default='keep_tenure')
+
+
+class TenureChangeSerializer(serializers.Serializer):
+    month = serializers.IntegerField(min_value=1, max_value=600)
+    tenure = serializers.IntegerField(min_value=1, max_value=600)
+
+
+class LoanScenarioSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=100, required=False)
+    prepayments = PrepaymentSerializer(many=True, required=False, default=list)
+    rate_changes = RateChangeSerializer(many=True, required=False, default=list)
+    tenure_changes = TenureChangeSerializer(many=True, required=False, default=list)
@@ -1,3 +1,342 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from decimal import Decimal
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from apps.core.instrumentation import query_budget
+from apps.core.score_cache import score_cache
+from apps.customers.models import Customer
+from .models import Loan
+from .pagination import LoanKeysetPagination
+from .views import originate_loan
+
+
+def create_customer(customer_id=1, monthly_salary=100000):
+    return Customer.objects.create(
+        customer_id=customer_id,
+        first_name='Asha',
+        last_name='Rao',
+        age=30,
+        phone_number=9000000000 + customer_id,
+        monthly_salary=monthly_salary,
+        approved_limit=36 * monthly_salary,
+    )
+
+
+def create_loan(customer, start_date, loan_amount=Decimal('100000'), tenure=24):
+    return Loan.objects.create(
+        customer=customer,
+        loan_amount=loan_amount,
+        tenure=tenure,
+        interest_rate=Decimal('12.00'),
+        emis_paid_on_time=0,
+        start_date=start_date,
+    )
+
+
+def post_json(client, url, payload, **headers):
+    return client.post(url, json.dumps(payload), content_type='application/json', **headers)
+
+
+class CheckEligibilityBatchTests(TestCase):
+
+    def setUp(self):
+        score_cache.clear()
+        create_customer(1)
+        create_customer(2, monthly_salary=20000)
+        create_loan(Customer.objects.get(customer_id=2), timezone.now() - timedelta(days=30), Decimal('200000'))
+
+    def test_results_match_the_single_endpoint_in_request_order(self):
+        applications = [
+            {'customer_id': 1, 'loan_amount': 100000, 'interest_rate': 8, 'tenure': 12},
+            {'customer_id': 2, 'loan_amount': 100000, 'interest_rate': 14, 'tenure': 12},
+            {'customer_id': 1, 'loan_amount': 900000, 'interest_rate': 12, 'tenure': 6},
+        ]
+
+        response = post_json(self.client, '/check-eligibility/batch/', applications)
+
+        self.assertEqual(response.status_code, 200)
+        expected = [post_json(self.client, '/check-eligibility/', item).json() for item in applications]
+        self.assertEqual(response.json()['results'], expected)
+
+    def test_invalid_and_unknown_items_fail_individually(self):
+        response = post_json(self.client, '/check-eligibility/batch/', [
+            {'customer_id': 1, 'loan_amount': 100000, 'interest_rate': 12, 'tenure': 12},
+            {'customer_id': 1, 'loan_amount': 100000},
+            {'customer_id': 99, 'loan_amount': 100000, 'interest_rate': 12, 'tenure': 12},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        approved, invalid, unknown = response.json()['results']
+        self.assertTrue(approved['approval'])
+        self.assertEqual(set(invalid['errors']), {'interest_rate', 'tenure'})
+        self.assertEqual(unknown, {'customer_id': 99, 'error': 'Customer not found'})
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        item = {'customer_id': 1, 'loan_amount': 100000, 'interest_rate': 12, 'tenure': 12}
+        for customer_id in range(3, 13):
+            create_customer(customer_id)
+        items = [{**item, 'customer_id': customer_id} for customer_id in range(1, 13)]
+
+        # One customer query, plus one profile query for the customers without an aggregate row.
+        with self.assertNumQueries(2):
+            post_json(self.client, '/check-eligibility/batch/', items)
+
+    @override_settings(MAX_ELIGIBILITY_BATCH_SIZE=2)
+    def test_empty_and_oversized_batches_are_rejected(self):
+        item = {'customer_id': 1, 'loan_amount': 100000, 'interest_rate': 12, 'tenure': 12}
+
+        self.assertEqual(post_json(self.client, '/check-eligibility/batch/', []).status_code, 400)
+        self.assertEqual(post_json(self.client, '/check-eligibility/batch/', item).status_code, 400)
+        self.assertEqual(post_json(self.client, '/check-eligibility/batch/', [item] * 3).status_code, 400)
+
+
+class LoanKeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        customer = create_customer()
+        start = timezone.now() - timedelta(days=100)
+        # Two loans share a start date, so the loan_id tie-breaker decides their order.
+        self.loans = [create_loan(customer, start + timedelta(days=offset)) for offset in (3, 0, 1, 1, 2)]
+        self.expected = [
+            loan.loan_id for loan in sorted(self.loans, key=lambda loan: (loan.start_date, loan.loan_id))
+        ]
+
+    def test_cursors_walk_every_loan_once_in_order(self):
+        seen = []
+        url = '/view-loans/1/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            self.assertLessEqual(len(page['results']), 2)
+            seen.extend(loan['loan_id'] for loan in page['results'])
+            url = page['next']
+
+        self.assertEqual(seen, self.expected)
+
+    def test_cursor_round_trips(self):
+        pagination = LoanKeysetPagination()
+        loan = self.loans[0]
+
+        self.assertEqual(pagination.decode_cursor(pagination.encode_cursor(loan)), (loan.start_date, loan.loan_id))
+
+    def test_invalid_cursor_is_a_bad_request(self):
+        response = self.client.get('/view-loans/1/?cursor=not-a-cursor')
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_stream_returns_one_loan_per_line_in_order(self):
+        response = self.client.get('/view-loans/1/?stream=1')
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual([json.loads(line)['loan_id'] for line in lines], self.expected)
+
+
+class LoanRepaymentStateTests(TestCase):
+
+    def test_database_annotations_match_the_python_properties(self):
+        customer = create_customer()
+        now = timezone.now()
+        for days_ago, tenure in ((800, 12), (400, 36), (45, 6), (0, 12), (-30, 12)):
+            create_loan(customer, now - timedelta(days=days_ago), tenure=tenure)
+
+        annotated = Loan.objects.with_repayment_state().order_by('loan_id')
+        for loan, plain in zip(annotated, Loan.objects.order_by('loan_id')):
+            self.assertEqual(loan.is_active, plain.is_active)
+            self.assertEqual(loan.repayments_left, plain.repayments_left)
+            self.assertEqual(loan.current_debt, plain.current_debt)
+
+    def test_outstanding_by_customer_sums_active_loans(self):
+        customer = create_customer()
+        now = timezone.now()
+        loans = [create_loan(customer, now - timedelta(days=days_ago)) for days_ago in (60, 900)]
+
+        row, = Loan.objects.outstanding_by_customer()
+
+        self.assertEqual(row['customer_id'], 1)
+        self.assertEqual(row['total_outstanding'], sum(Loan.objects.get(pk=loan.pk).current_debt for loan in loans))
+
+
+class AsyncEndpointParityTests(TestCase):
+
+    def setUp(self):
+        score_cache.clear()
+        customer = create_customer()
+        create_customer(2, monthly_salary=20000)
+        now = timezone.now()
+        self.loans = [create_loan(customer, now - timedelta(days=days_ago)) for days_ago in (40, 400, 900)]
+
+    async def apost_json(self, url, payload):
+        return await self.async_client.post(url, json.dumps(payload), content_type='application/json')
+
+    async def test_eligibility_matches_the_sync_endpoint(self):
+        for payload in (
+            {'customer_id': 1, 'loan_amount': 100000, 'interest_rate': 8, 'tenure': 12},
+            {'customer_id': 2, 'loan_amount': 900000, 'interest_rate': 12, 'tenure': 6},
+            {'customer_id': 99, 'loan_amount': 100000, 'interest_rate': 12, 'tenure': 12},
+            {'customer_id': 1},
+        ):
+            expected = await self.apost_json('/check-eligibility/', payload)
+            response = await self.apost_json('/async/check-eligibility/', payload)
+            self.assertEqual(response.status_code, expected.status_code)
+            self.assertEqual(response.json(), expected.json())
+
+    async def test_loan_views_match_the_sync_endpoints(self):
+        for path in (
+            f'view-loan/{self.loans[0].loan_id}/',
+            'view-loan/999/',
+            'view-loans/1/',
+            'view-loans/1/?page_size=2',
+            'view-loans/99/',
+        ):
+            expected = await self.async_client.get(f'/{path}')
+            response = await self.async_client.get(f'/async/{path}')
+            self.assertEqual(response.status_code, expected.status_code, path)
+            # Cursor links point back at the endpoint that served the page.
+            self.assertEqual(json.loads(response.content.replace(b'/async/', b'/')), expected.json(), path)
+
+    async def test_create_loan_is_idempotent(self):
+        payload = {'customer_id': 1, 'loan_amount': 100000, 'interest_rate': 12, 'tenure': 12}
+        headers = {'headers': {'Idempotency-Key': 'async-1'}}
+
+        first = await self.async_client.post(
+            '/async/create-loan/', json.dumps(payload), content_type='application/json', **headers
+        )
+        second = await self.async_client.post(
+            '/async/create-loan/', json.dumps(payload), content_type='application/json', **headers
+        )
+
+        self.assertEqual(first.status_code, 201)
+        self.assertTrue(first.json()['loan_approved'])
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(await Loan.objects.filter(customer_id=1).acount(), 4)
+
+
+class OriginateLoanTests(TestCase):
+
+    def setUp(self):
+        score_cache.clear()
+        self.customer = create_customer()
+
+    def test_approved_loan_is_created_and_aggregated(self):
+        response = originate_loan(1, Decimal('100000'), Decimal('12.00'), 12)
+
+        self.assertTrue(response['loan_approved'])
+        loan = Loan.objects.get(loan_id=response['loan_id'])
+        self.assertEqual(loan.monthly_payment, Decimal(response['monthly_installment']))
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.credit_aggregate.loan_count, 1)
+        self.assertEqual(self.customer.credit_aggregate.active_emi_sum, loan.monthly_payment)
+
+    def test_loan_over_the_emi_limit_is_rejected_without_a_row(self):
+        response = originate_loan(1, Decimal('5000000'), Decimal('12.00'), 12)
+
+        self.assertFalse(response['loan_approved'])
+        self.assertIsNone(response['loan_id'])
+        self.assertFalse(Loan.objects.exists())
+
+    def test_unknown_customer_raises(self):
+        with self.assertRaises(Customer.DoesNotExist):
+            originate_loan(99, Decimal('100000'), Decimal('12.00'), 12)
+
+
+class CreateLoanIdempotencyTests(TestCase):
+
+    def setUp(self):
+        score_cache.clear()
+        create_customer()
+
+    def post(self, payload, key):
+        return post_json(self.client, '/create-loan/', payload, HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_repeated_key_replays_the_stored_response(self):
+        payload = {'customer_id': 1, 'loan_amount': 100000, 'interest_rate': 12, 'tenure': 12}
+
+        first = self.post(payload, 'loan-1')
+        second = self.post(payload, 'loan-1')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Loan.objects.count(), 1)
+
+    def test_key_reused_with_a_different_request_is_rejected(self):
+        self.post({'customer_id': 1, 'loan_amount': 100000, 'interest_rate': 12, 'tenure': 12}, 'loan-1')
+        response = self.post({'customer_id': 1, 'loan_amount': 200000, 'interest_rate': 12, 'tenure': 12}, 'loan-1')
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Loan.objects.count(), 1)
+
+
+@override_settings(SERVER_TIMING_HEADER=True)
+class CreateLoanQueryBudgetTests(TransactionTestCase):
+    # A TransactionTestCase, so the queries counted include the request's own
+    # transaction statements rather than TestCase's surrounding savepoints.
+
+    def setUp(self):
+        score_cache.clear()
+        create_loan(create_customer(), timezone.now())
+
+    def assertWithinBudget(self, url, route, **headers):
+        payload = {'customer_id': 1, 'loan_amount': 100000, 'interest_rate': 12, 'tenure': 12}
+
+        response = post_json(self.client, url, payload, **headers)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('X-Query-Budget-Exceeded', response)
+        queries = int(response['Server-Timing'].split('desc="')[1].split(' ')[0])
+        self.assertLessEqual(queries, query_budget(route))
+        return queries
+
+    def test_keyed_create_loan_stays_within_budget(self):
+        for url, route in (('/create-loan/', 'create-loan/'), ('/async/create-loan/', 'async/create-loan/')):
+            with self.subTest(url=url):
+                plain = self.assertWithinBudget(url, route)
+                keyed = self.assertWithinBudget(url, route, HTTP_IDEMPOTENCY_KEY=f'budget{url}')
+                self.assertLess(plain, keyed)
+
+
+class SimulateLoanScenariosTests(TestCase):
+
+    def setUp(self):
+        self.loan = create_loan(create_customer(), timezone.now() - timedelta(days=200))
+
+    def post(self, loan_id, scenarios):
+        return self.client.post(
+            f'/simulate-loan/{loan_id}/', json.dumps({'scenarios': scenarios}), content_type='application/json'
+        )
+
+    def test_unknown_loan_is_not_found(self):
+        response = self.post(999, [{}])
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'error': 'Loan not found'})
+
+    def test_events_before_the_paid_months_are_rejected(self):
+        response = self.post(self.loan.loan_id, [
+            {'name': 'past', 'prepayments': [{'month': 1, 'amount': 1000}]},
+            {'name': 'future', 'prepayments': [{'month': 12, 'amount': 1000}]},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        past, future = response.json()['results']
+        self.assertIn('error', past)
+        self.assertEqual(future['total_prepaid'], 1000.0)
+        self.assertGreater(future['interest_saved'], 0)
+
+    def test_events_after_the_last_instalment_are_rejected(self):
+        response = self.post(self.loan.loan_id, [
+            {'name': 'late', 'prepayments': [{'month': 30, 'amount': 1000}]},
+            {'name': 'payoff', 'prepayments': [{'month': 12, 'amount': 200000}, {'month': 18, 'amount': 1000}]},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        late, payoff = response.json()['results']
+        self.assertIn('error', late)
+        self.assertEqual(payoff['tenure_months'], 12)
+        self.assertEqual([event['month'] for event in payoff['skipped_events']], [18])
 
-# Create your tests here.
@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import check_loan_eligibility
+from .views import check_loan_eligibility, check_loan_eligibility_batch
 
 urlpatterns = [
     path('check-eligibility/', check_loan_eligibility, name='check_loan_eligibility'),
+    path('check-eligibility/batch/', check_loan_eligibility_batch, name='check_loan_eligibility_batch'),
 ] 
\ No newline at end of file
@@ -3,18 +3,29 @@ from django.shortcuts import render
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
-from datetime import datetime
+from django.http import Http404, StreamingHttpResponse
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from .models import Loan
+from .pagination import LoanKeysetPagination
+from .responses import eligibility_response, loan_approved_response, loan_rejected_response
 from apps.customers.models import Customer
+from apps.core.compression import compress_response
 from apps.core.credit_scoring import CreditScoring
+from apps.core.idempotency import idempotent
+from apps.core.instrumentation import timed
+from apps.core.loaders import get_loader
+from apps.core.renderers import dumps
+from apps.core.simulation import SimulationError, simulate_loan
 from .serializers import (
     LoanEligibilityRequestSerializer,
-    LoanEligibilityResponseSerializer,
     LoanCreateRequestSerializer,
-    LoanCreateResponseSerializer,
     LoanDetailSerializer,
-    LoanListSerializer
+    LoanListSerializer,
+    LoanScenarioSerializer
 )
 
 
@@ -35,7 +46,7 @@ def check_loan_eligibility(request):
         tenure = serializer.validated_data['tenure']
         
         try:
-            customer = Customer.objects.get(customer_id=customer_id)
+            get_loader().customer(customer_id)
         except Customer.DoesNotExist:
             return Response(
                 {'error': 'Customer not found'}, 
@@ -45,24 +56,61 @@ def check_loan_eligibility(request):
         credit_scorer = CreditScoring(customer_id)
         eligibility = credit_scorer.check_eligibility(loan_amount, interest_rate, tenure)
         
-        response_data = {
-            'customer_id': customer_id,
-            'approval': eligibility['approved'],
-            'interest_rate': float(interest_rate),
-            'corrected_interest_rate': float(eligibility['corrected_interest_rate']),
-            'tenure': tenure,
-            'monthly_installment': round(float(eligibility['monthly_installment']), 2)
-        }
-        
-        response_serializer = LoanEligibilityResponseSerializer(data=response_data)
-        if response_serializer.is_valid():
-            return Response(response_serializer.data, status=status.HTTP_200_OK)
-        else:
+        return Response(
+            eligibility_response(customer_id, interest_rate, tenure, eligibility),
+            status=status.HTTP_200_OK
+        )
+        
+    except Exception as e:
+        return Response(
+            {'error': f'An error occurred: {str(e)}'}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['POST'])
+def check_loan_eligibility_batch(request):
+    try:
+        items = request.data
+        
+        if not isinstance(items, list) or not items:
             return Response(
-                {'errors': response_serializer.errors}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': 'Expected a non-empty list of eligibility requests'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if len(items) > settings.MAX_ELIGIBILITY_BATCH_SIZE:
+            return Response(
+                {'error': f'A batch can contain at most {settings.MAX_ELIGIBILITY_BATCH_SIZE} items'}, 
+                status=status.HTTP_400_BAD_REQUEST
             )
         
+        results = [None] * len(items)
+        valid_items = []
+        for index, item in enumerate(items):
+            serializer = LoanEligibilityRequestSerializer(data=item)
+            if serializer.is_valid():
+                valid_items.append((index, serializer.validated_data))
+            else:
+                results[index] = {'errors': serializer.errors}
+        
+        scorers = CreditScoring.for_customers({data['customer_id'] for _, data in valid_items})
+        CreditScoring.prime_scores(scorers.values())
+        
+        for index, data in valid_items:
+            customer_id = data['customer_id']
+            credit_scorer = scorers.get(customer_id)
+            
+            if credit_scorer is None:
+                results[index] = {'customer_id': customer_id, 'error': 'Customer not found'}
+                continue
+            
+            eligibility = credit_scorer.check_eligibility(data['loan_amount'], data['interest_rate'], data['tenure'])
+            with timed('serialize'):
+                results[index] = eligibility_response(customer_id, data['interest_rate'], data['tenure'], eligibility)
+        
+        return Response({'results': results}, status=status.HTTP_200_OK)
+        
     except Exception as e:
         return Response(
             {'error': f'An error occurred: {str(e)}'}, 
@@ -70,7 +118,42 @@ def check_loan_eligibility(request):
         )
 
 
+def originate_loan(customer_id, loan_amount, interest_rate, tenure):
+    # The customer row lock serialises check-then-insert per customer. The credit
+    # profile and score are read after the lock is held, so they include every
+    # loan committed by a competing request.
+    loader = get_loader()
+    with transaction.atomic():
+        customer = (
+            Customer.objects.select_for_update(of=('self',))
+            .select_related('credit_aggregate')
+            .get(customer_id=customer_id)
+        )
+        loader.forget_customer(customer_id)
+        loader.prime(customer)
+
+        credit_scorer = CreditScoring(customer_id, customer=customer)
+        credit_scorer.recalculate_credit_score()
+        eligibility = credit_scorer.check_eligibility(loan_amount, interest_rate, tenure)
+
+        if not eligibility['approved']:
+            return loan_rejected_response(customer_id, eligibility)
+
+        loan = Loan.objects.create(
+            customer=customer,
+            loan_amount=loan_amount,
+            tenure=tenure,
+            interest_rate=eligibility['corrected_interest_rate'],
+            start_date=timezone.now(),
+            emis_paid_on_time=0
+        )
+        # The new loan changed this customer's aggregate and loan list.
+        loader.forget_customer(customer_id)
+        return loan_approved_response(customer_id, loan)
+
+
 @api_view(['POST'])
+@idempotent('create-loan')
 def create_loan(request):
     try:
         serializer = LoanCreateRequestSerializer(data=request.data)
@@ -87,50 +170,14 @@ def create_loan(request):
         tenure = serializer.validated_data['tenure']
         
         try:
-            customer = Customer.objects.get(customer_id=customer_id)
+            response_data = originate_loan(customer_id, loan_amount, interest_rate, tenure)
         except Customer.DoesNotExist:
             return Response(
                 {'error': 'Customer not found'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        credit_scorer = CreditScoring(customer_id)
-        eligibility = credit_scorer.check_eligibility(loan_amount, interest_rate, tenure)
-        
-        if not eligibility['approved']:
-            response_data = {
-                'loan_id': None,
-                'customer_id': customer_id,
-                'loan_approved': False,
-                'message': eligibility.get('reason', 'Loan not approved based on credit score'),
-                'monthly_installment': round(float(eligibility['monthly_installment']), 2)
-            }
-        else:
-            loan = Loan.objects.create(
-                customer=customer,
-                loan_amount=loan_amount,
-                tenure=tenure,
-                interest_rate=eligibility['corrected_interest_rate'],
-                start_date=datetime.now(),
-                emis_paid_on_time=0
-            )
-            
-            response_data = {
-                'loan_id': loan.loan_id,
-                'customer_id': customer_id,
-                'loan_approved': True,
-                'message': 'Loan approved successfully',
-                'monthly_installment': round(float(loan.monthly_payment), 2)
-            }
-        
-        response_serializer = LoanCreateResponseSerializer(data=response_data)
-        if response_serializer.is_valid():
-            return Response(response_serializer.data, status=status.HTTP_201_CREATED)
-        else:
-            return Response(
-                {'errors': response_serializer.errors}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        return Response(response_data, status=status.HTTP_201_CREATED)
         
     except Exception as e:
         return Response(
@@ -144,8 +191,12 @@ def view_loan_details(request, loan_id):
     try:
         loan = get_object_or_404(Loan, loan_id=loan_id)
         serializer = LoanDetailSerializer(loan)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        with timed('serialize'):
+            data = serializer.data
+        return Response(data, status=status.HTTP_200_OK)
         
+    except Http404:
+        raise
     except Exception as e:
         return Response(
             {'error': f'An error occurred: {str(e)}'}, 
@@ -153,14 +204,109 @@ def view_loan_details(request, loan_id):
         )
 
 
+@api_view(['POST'])
+def simulate_loan_scenarios(request, loan_id):
+    try:
+        try:
+            loan = Loan.objects.with_repayment_state().get(loan_id=loan_id)
+        except Loan.DoesNotExist:
+            return Response(
+                {'error': 'Loan not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        scenarios = request.data.get('scenarios') if isinstance(request.data, dict) else None
+        
+        if not isinstance(scenarios, list) or not scenarios:
+            return Response(
+                {'error': 'Expected a non-empty list of scenarios'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if len(scenarios) > settings.MAX_SIMULATION_SCENARIOS:
+            return Response(
+                {'error': f'A request can contain at most {settings.MAX_SIMULATION_SCENARIOS} scenarios'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        results = []
+        with timed('simulate'):
+            for scenario in scenarios:
+                serializer = LoanScenarioSerializer(data=scenario)
+                if not serializer.is_valid():
+                    results.append({'errors': serializer.errors})
+                    continue
+                
+                data = serializer.validated_data
+                try:
+                    result = simulate_loan(
+                        loan.loan_amount,
+                        loan.interest_rate,
+                        loan.tenure,
+                        emi=float(loan.monthly_payment),
+                        prepayments=data['prepayments'],
+                        rate_changes=data['rate_changes'],
+                        tenure_changes=data['tenure_changes'],
+                        months_paid=max(loan.months_elapsed, 0),
+                    )
+                except SimulationError as e:
+                    result = {'error': str(e)}
+                if 'name' in data:
+                    result = {'name': data['name'], **result}
+                results.append(result)
+        
+        return Response({
+            'loan_id': loan.loan_id,
+            'loan_amount': loan.loan_amount,
+            'interest_rate': loan.interest_rate,
+            'tenure': loan.tenure,
+            'monthly_installment': loan.monthly_payment,
+            'months_paid': loan.tenure - loan.repayments_left if loan.is_active else None,
+            'results': results,
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response(
+            {'error': f'An error occurred: {str(e)}'}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+def _stream_loans_ndjson(loans, chunk_size=2000):
+    serializer = LoanListSerializer()
+    for loan in loans.iterator(chunk_size=chunk_size):
+        yield dumps(serializer.to_representation(loan)) + b'\n'
+
+
+@compress_response
 @api_view(['GET'])
 def view_customer_loans(request, customer_id):
     try:
         customer = get_object_or_404(Customer, customer_id=customer_id)
-        loans = Loan.objects.filter(customer=customer)
+        loans = Loan.objects.filter(customer=customer).with_repayment_state()
+        
+        if request.query_params.get('stream') in ('1', 'true', 'ndjson'):
+            return StreamingHttpResponse(
+                _stream_loans_ndjson(loans.order_by(*LoanKeysetPagination.ordering)),
+                content_type='application/x-ndjson'
+            )
+        
+        paginator = LoanKeysetPagination()
+        if paginator.is_requested(request):
+            page = paginator.paginate_queryset(loans, request)
+            serializer = LoanListSerializer(page, many=True)
+            with timed('serialize'):
+                data = serializer.data
+            return paginator.get_paginated_response(data)
+        
         serializer = LoanListSerializer(loans, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        with timed('serialize'):
+            data = serializer.data
+        return Response(data, status=status.HTTP_200_OK)
         
+    except ValidationError as e:
+        return Response({'errors': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+    except Http404:
+        raise
     except Exception as e:
         return Response(
             {'error': f'An error occurred: {str(e)}'}, 
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+from celery.schedules import crontab
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -49,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.core.middleware.RequestInstrumentationMiddleware',
+    'apps.core.middleware.RequestLoaderMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -82,6 +85,11 @@ WSGI_APPLICATION = 'credit_system.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connection reuse: DB_POOL=true enables psycopg's connection pool (which requires
+# CONN_MAX_AGE=0), otherwise connections persist for DB_CONN_MAX_AGE seconds.
+# Celery's Django fixup honours the same settings between tasks.
+DB_POOL = os.getenv('DB_POOL', 'false').lower() in ('1', 'true', 'yes')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -90,9 +98,20 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'postgres'),
         'HOST': os.getenv('DB_HOST', 'db'),
         'PORT': os.getenv('DB_PORT', '5432'),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'true').lower() in ('1', 'true', 'yes'),
+        'OPTIONS': {},
     }
 }
 
+if DB_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '600')),
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -138,7 +157,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'apps.core.renderers.ORJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -146,6 +165,31 @@ REST_FRAMEWORK = {
 }
 
 
+# Credit scoring policy: 'default' (built-in table), 'db' (the active ScoringRuleSet)
+# or a path to a JSON rule table. Re-read at most every RELOAD_SECONDS.
+CREDIT_SCORING_RULES = {
+    'SOURCE': os.getenv('CREDIT_SCORING_RULES_SOURCE', 'default'),
+    'RELOAD_SECONDS': int(os.getenv('CREDIT_SCORING_RULES_RELOAD_SECONDS', '60')),
+}
+
+
+# Cache configuration
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+
+# Credit score cache (falls back to an in-process LRU when the default cache is not Redis)
+CREDIT_SCORE_CACHE = {
+    'ALIAS': 'default',
+    'TTL': int(os.getenv('CREDIT_SCORE_CACHE_TTL', '300')),
+    'MAXSIZE': int(os.getenv('CREDIT_SCORE_CACHE_MAXSIZE', '10000')),
+}
+
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True
 
@@ -156,6 +200,83 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+CELERY_BEAT_SCHEDULE = {
+    # Roll the date-dependent aggregate fields (active debt, current-year loans) over to the new day.
+    'nightly-credit-aggregates': {
+        'task': 'apps.core.tasks.rebuild_all_credit_aggregates',
+        'schedule': crontab(
+            hour=int(os.getenv('AGGREGATE_REBUILD_HOUR', '1')),
+            minute=int(os.getenv('AGGREGATE_REBUILD_MINUTE', '0'))
+        ),
+    },
+    'nightly-credit-rescore': {
+        'task': 'apps.core.tasks.rescore_all_customers',
+        'schedule': crontab(
+            hour=int(os.getenv('RESCORE_HOUR', '2')),
+            minute=int(os.getenv('RESCORE_MINUTE', '0'))
+        ),
+    },
+    # Delete Idempotency-Key rows once they are past IDEMPOTENCY_KEY_TTL.
+    'hourly-idempotency-key-purge': {
+        'task': 'apps.core.tasks.purge_idempotency_keys',
+        'schedule': crontab(minute=int(os.getenv('IDEMPOTENCY_PURGE_MINUTE', '30'))),
+    },
+}
 
 # Data files path
-DATA_PATH = os.path.join(BASE_DIR, 'data')
\ No newline at end of file
+DATA_PATH = os.path.join(BASE_DIR, 'data')
+
+# Rows read and written per transaction by the bulk data loaders
+INGEST_CHUNK_SIZE = int(os.getenv('INGEST_CHUNK_SIZE', '5000'))
+
+# How the loaders write each chunk: 'copy' streams rows into a staging table (COPY FROM STDIN
+# on PostgreSQL) and merges them with one INSERT ... ON CONFLICT; 'orm' uses bulk_create.
+INGEST_BACKEND = os.getenv('INGEST_BACKEND', 'copy')
+
+# Maximum number of applications accepted by /check-eligibility/batch/
+MAX_ELIGIBILITY_BATCH_SIZE = int(os.getenv('MAX_ELIGIBILITY_BATCH_SIZE', '10000'))
+
+# Maximum number of registrations accepted by /register/batch/
+MAX_REGISTRATION_BATCH_SIZE = int(os.getenv('MAX_REGISTRATION_BATCH_SIZE', '10000'))
+
+# Maximum number of what-if scenarios accepted per /simulate-loan/ request
+MAX_SIMULATION_SCENARIOS = int(os.getenv('MAX_SIMULATION_SCENARIOS', '100'))
+
+# Seconds a stored Idempotency-Key response is replayed before the key can be reused
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', str(24 * 60 * 60)))
+
+# Compression for serialization-heavy views wrapped in @compress_response (view-loans).
+# Brotli is used when the package is installed and the client accepts it, gzip otherwise.
+RESPONSE_COMPRESSION = {
+    'ENABLED': os.getenv('RESPONSE_COMPRESSION_ENABLED', 'true').lower() in ('1', 'true', 'yes'),
+    'MIN_BYTES': int(os.getenv('RESPONSE_COMPRESSION_MIN_BYTES', '1024')),
+    'BROTLI_QUALITY': int(os.getenv('RESPONSE_COMPRESSION_BROTLI_QUALITY', '4')),
+}
+
+# Per-request instrumentation: Server-Timing headers, /metrics/ and SQL query budgets.
+# The header and the endpoint expose internals, so both are off unless DEBUG or enabled here.
+SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', str(DEBUG)).lower() in ('1', 'true', 'yes')
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', str(DEBUG)).lower() in ('1', 'true', 'yes')
+# /metrics/ answers staff users and scrapers sending "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# Maximum SQL queries per request, keyed by URL route; 'default' applies to the rest.
+# create-loan takes 6 queries, and 7 more with an Idempotency-Key (key lookup, insert,
+# response update and their transaction/savepoint statements).
+QUERY_BUDGETS = {
+    'default': int(os.getenv('QUERY_BUDGET_DEFAULT', '10')),
+    'check-eligibility/': 3,
+    'create-loan/': 13,
+    'async/create-loan/': 13,
+    'view-loan/<int:loan_id>/': 2,
+    'view-loans/<int:customer_id>/': 2,
+}
+
+
+# Admin changelists of unfiltered tables estimated at this many rows or more use the
+# PostgreSQL planner estimate instead of an exact COUNT(*)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(os.getenv('ADMIN_ESTIMATED_COUNT_THRESHOLD', '100000'))
+
+
+# Customers scored per batch by the nightly portfolio re-scoring job
+RESCORE_BATCH_SIZE = int(os.getenv('RESCORE_BATCH_SIZE', '20000'))
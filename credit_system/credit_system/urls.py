@@ -21,8 +21,11 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from django.urls import path
+from apps.core import views as core_views
 from apps.customers import views as customer_views
+from apps.customers import async_views as customer_async_views
 from apps.loans import views as loan_views
+from apps.loans import async_views as loan_async_views
 
 
 schema_view = get_schema_view(
@@ -44,8 +47,17 @@ urlpatterns = [
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
     path('register/', customer_views.register_customer, name='register_customer'),
+    path('register/batch/', customer_views.register_customers_batch, name='register_customers_batch'),
     path('check-eligibility/', loan_views.check_loan_eligibility, name='check_loan_eligibility'),
+    path('check-eligibility/batch/', loan_views.check_loan_eligibility_batch, name='check_loan_eligibility_batch'),
     path('create-loan/', loan_views.create_loan, name='create_loan'),
     path('view-loan/<int:loan_id>/', loan_views.view_loan_details, name='view_loan_details'),
     path('view-loans/<int:customer_id>/', loan_views.view_customer_loans, name='view_customer_loans'),
+    path('simulate-loan/<int:loan_id>/', loan_views.simulate_loan_scenarios, name='simulate_loan_scenarios'),
+    path('metrics/', core_views.metrics, name='metrics'),
+    path('async/register/', customer_async_views.register_customer, name='async_register_customer'),
+    path('async/check-eligibility/', loan_async_views.check_loan_eligibility, name='async_check_loan_eligibility'),
+    path('async/create-loan/', loan_async_views.create_loan, name='async_create_loan'),
+    path('async/view-loan/<int:loan_id>/', loan_async_views.view_loan_details, name='async_view_loan_details'),
+    path('async/view-loans/<int:customer_id>/', loan_async_views.view_customer_loans, name='async_view_customer_loans'),
 ]